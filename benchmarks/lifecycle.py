@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""
+Benchmarks of wolphin's lifecycle operations at fleet scale.
+
+Every operation (create, status, stop, start, revert in a batch and sequentially, terminate) is run
+against the ec2 simulator, with realistic latencies, state transition times and request limits, on
+a virtual clock, and against a fake ssh that becomes ready some time after an instance runs. For
+every fleet size and operation the following is recorded:
+
+ - ``simulated_secs``: the time the operation would have taken against ec2.
+ - ``wall_secs``: the time it actually took to run, i.e. wolphin's own overhead.
+ - ``ec2_calls`` (and ``ec2_calls_by_call``): the ec2 calls made, throttled ones included.
+ - ``throttled``: the ec2 calls that were throttled and retried.
+ - ``readiness_probes``: the ssh readiness checks made.
+ - ``peak_rss_kb``: the peak resident memory of the process running the benchmark so far.
+
+Each fleet size is run in a separate process and the results are compared to a stored baseline:
+
+    python -m benchmarks.lifecycle --sizes 10 100
+    python -m benchmarks.lifecycle --save-baseline
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import resource
+import sys
+from os.path import dirname, join
+from time import time
+
+from gusset.colortable import ColorTable
+from mock import Mock, patch
+
+from wolphin.config import Configuration
+from wolphin.project import WolphinProject
+from wolphin.simulator import SimulatedEC2Connection, VirtualClock, lognormal
+from wolphin.throttle import RateLimiter
+from wolphin.tracing import Tracer
+
+
+SIZES = [10, 100, 1000, 5000]
+
+OPERATIONS = ['create', 'status', 'stop', 'start', 'revert', 'revert_sequential', 'terminate']
+
+# reverting sequentially takes one full revert per instance, beyond this size it is not run.
+MAX_SEQUENTIAL_REVERT_SIZE = 100
+
+DEFAULT_BASELINE = join(dirname(__file__), 'baseline.json')
+
+# relative increase over the baseline considered to be a regression, per metric.
+TOLERANCES = {
+    'simulated_secs': 0.10,
+    'ec2_calls': 0.10,
+    'readiness_probes': 0.10,
+    'wall_secs': 0.50,
+    'peak_rss_kb': 0.25
+}
+
+# absolute increase over the baseline that is always tolerated, per metric, so that the noise of
+# very short runs does not show up as regressions.
+SLACK = {
+    'wall_secs': 0.1,
+    'peak_rss_kb': 4096
+}
+
+
+class FakeSSH(object):
+    """
+    Stands in for ssh logins: an instance becomes ssh-ready a drawn delay after it is first seen
+    running with an ip address, and every check takes some time.
+    """
+
+    def __init__(self, clock, seed, ready_delay=lognormal(15, 0.3), probe_latency=0.3):
+        self.clock = clock
+        self.random = random.Random(seed)
+        self.ready_delay = ready_delay
+        self.probe_latency = probe_latency
+        self.ready_at = dict()
+        self.probes = 0
+
+    def __call__(self, instance):
+        self.probes += 1
+        self.clock.sleep(self.probe_latency)
+        if instance.state != 'running' or not instance.ip_address:
+            self.ready_at.pop(instance.id, None)
+            return False
+        if instance.id not in self.ready_at:
+            self.ready_at[instance.id] = self.clock.time() + self.ready_delay(self.random)
+        return self.clock.time() >= self.ready_at[instance.id]
+
+
+def _make_project(size, clock, seed):
+    config = Configuration(project="bench",
+                           email="bench@example.com",
+                           min_instance_count=size,
+                           max_instance_count=size,
+                           max_wait_tries=100)
+    config.validate = Mock()
+    conn = SimulatedEC2Connection.realistic(clock=clock, seed=seed, instance_limit=size * 3)
+    tracer = Tracer(clock=clock.time)
+    limiter = RateLimiter.from_config(config)
+    for bucket in (limiter.describe, limiter.mutate):
+        bucket.clock, bucket.sleep, bucket.updated = clock.time, clock.sleep, clock.time()
+    limiter.sleep = clock.sleep
+    return WolphinProject(config, conn, tracer=tracer, rate_limiter=limiter)
+
+
+def _measure(project, clock, ssh, operation):
+    project.tracer.clear()
+    throttled, probes = project.rate_limiter.throttled, ssh.probes
+    simulated, wall = clock.time(), time()
+
+    operation()
+
+    calls = dict()
+    for record in project.tracer.summary():
+        calls[record.call] = calls.get(record.call, 0) + record.count
+    return dict(simulated_secs=round(clock.time() - simulated, 3),
+                wall_secs=round(time() - wall, 3),
+                ec2_calls=sum(calls.itervalues()),
+                ec2_calls_by_call=calls,
+                throttled=project.rate_limiter.throttled - throttled,
+                readiness_probes=ssh.probes - probes,
+                peak_rss_kb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def run_benchmark(size, seed=1):
+    """Runs every operation on a fleet of ``size`` instances; returns the metrics per operation"""
+
+    random.seed(seed)
+    clock = VirtualClock()
+    ssh = FakeSSH(clock, seed)
+    project = _make_project(size, clock, seed)
+
+    operations = [('create', project.create),
+                  ('status', project.status),
+                  ('stop', project.stop),
+                  ('start', project.start),
+                  ('revert', project.revert),
+                  ('revert_sequential', lambda: project.revert(sequential=True)),
+                  ('terminate', project.terminate)]
+
+    results = dict()
+    with patch('wolphin.project.sleep', clock.sleep), \
+            patch.object(WolphinProject, '_check_if_ssh_ready',
+                         lambda project, instance: ssh(instance)):
+        for name, operation in operations:
+            if name == 'revert_sequential' and size > MAX_SEQUENTIAL_REVERT_SIZE:
+                continue
+            results[name] = _measure(project, clock, ssh, operation)
+    return results
+
+
+def compare(results, baseline, tolerances=TOLERANCES, slack=SLACK):
+    """
+    Compares the ``results`` to the ``baseline``; returns one (size, operation, metric, baseline,
+    result) tuple per regression.
+    """
+
+    regressions = []
+    for size, operations in sorted(results.iteritems(), key=lambda item: int(item[0])):
+        for operation, metrics in sorted(operations.iteritems()):
+            baseline_metrics = baseline.get(str(size), {}).get(operation)
+            if not baseline_metrics:
+                continue
+            for metric, tolerance in sorted(tolerances.iteritems()):
+                expected = baseline_metrics.get(metric)
+                if expected is None:
+                    continue
+                if metrics[metric] > expected * (1 + tolerance) + slack.get(metric, 0):
+                    regressions.append((size, operation, metric, expected, metrics[metric]))
+    return regressions
+
+
+def print_results(results, baseline):
+
+    color_table = ColorTable('Size', 'Operation', 'Simulated', 'Wall', 'EC2Calls', 'Throttled',
+                             'Probes', 'PeakRSS')
+
+    def _cell(size, operation, metric, value):
+        expected = baseline.get(str(size), {}).get(operation, {}).get(metric)
+        return "{} ({})".format(value, expected) if expected is not None else str(value)
+
+    for size, operations in sorted(results.iteritems(), key=lambda item: int(item[0])):
+        for operation in OPERATIONS:
+            if operation not in operations:
+                continue
+            metrics = operations[operation]
+            color_table.add(Size=str(size),
+                            Operation=operation,
+                            Simulated=_cell(size, operation, 'simulated_secs',
+                                            metrics['simulated_secs']),
+                            Wall=_cell(size, operation, 'wall_secs', metrics['wall_secs']),
+                            EC2Calls=_cell(size, operation, 'ec2_calls', metrics['ec2_calls']),
+                            Throttled=str(metrics['throttled']),
+                            Probes=_cell(size, operation, 'readiness_probes',
+                                         metrics['readiness_probes']),
+                            PeakRSS=_cell(size, operation, 'peak_rss_kb',
+                                          metrics['peak_rss_kb']))
+
+    print color_table
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmarks wolphin's lifecycle operations at "
+                                                 "fleet scale against the ec2 simulator.")
+
+    parser.add_argument("--sizes",
+                        nargs='+',
+                        type=int,
+                        default=SIZES,
+                        help="Fleet sizes to benchmark.")
+
+    parser.add_argument("--baseline",
+                        default=DEFAULT_BASELINE,
+                        help="The stored baseline to compare the results with.")
+
+    parser.add_argument("--save-baseline",
+                        dest="save_baseline",
+                        action="store_true",
+                        help="Store the results as the baseline, in place of comparing them.")
+
+    parser.add_argument("--output",
+                        type=argparse.FileType('w'),
+                        help="Also write the results as JSON to this file.")
+
+    args = parser.parse_args()
+
+    # a fresh process per fleet size, so that peak memory is measured per size.
+    pool = multiprocessing.Pool(processes=1, maxtasksperchild=1)
+    results = dict((str(size), result)
+                   for size, result in zip(args.sizes, pool.map(run_benchmark, args.sizes)))
+    pool.close()
+
+    if args.output:
+        json.dump(results, args.output, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        try:
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        except IOError:
+            baseline = dict()
+        baseline.update(results)
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+        print_results(results, {})
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    print_results(results, baseline)
+
+    regressions = compare(results, baseline)
+    for size, operation, metric, expected, result in regressions:
+        print "REGRESSION: {} on {} instances: {} went from {} to {}".format(operation, size,
+                                                                           metric, expected,
+                                                                           result)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ from wolphin.config import Configuration
 from wolphin.generator import wolphin_project
 from wolphin.exceptions import WolphinException
 from wolphin.selector import InstanceNumberBasedSelector
+from wolphin.tracing import Tracer, print_trace_summary
 
 
 def controller():
@@ -68,6 +69,12 @@ def controller():
                         help="Used with the 'create' and 'start' commands to indicate that "
                              "wolphin should not wait for the project's instances to be ssh-ready.")
 
+    parser.add_argument("--trace",
+                        dest="trace_file",
+                        type=argparse.FileType('w'),
+                        help="Trace the ec2 calls made by wolphin, write them as Chrome "
+                             "trace-event JSON to this file and print a summary of them.")
+
     parser.add_argument("--log",
                         dest="logging_level",
                         default='INFO',
@@ -104,6 +111,10 @@ def controller():
     except WolphinException as ex:
         print ex
         sys.exit(1)
+    finally:
+        if project.tracer is not None:
+            project.tracer.write_chrome_trace(args.trace_file)
+            print_trace_summary(project.tracer.summary())
 
 
 def _make_project(args):
@@ -114,7 +125,7 @@ def _make_project(args):
     _configure_logging(args, config)
 
     # make a new project
-    project = WolphinProject.new(config)
+    project = WolphinProject.new(config, tracer=Tracer() if args.trace_file else None)
 
     return project
 
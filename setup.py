@@ -12,17 +12,23 @@ setup(name='wolphin',
       author='Location Labs',
       author_email='info@locationlabs.com',
       url='http://www.locationlabs.com',
-      packages=find_packages(exclude=['*.tests']),
+      packages=find_packages(exclude=['*.tests', 'benchmarks']),
       setup_requires=[
           'nose>=1.0',
       ],
       install_requires=[
-          'boto>=2.19.0',
+          'boto>=2.31.1',
           'Fabric>=1.8.0',
           'gusset>=1.3',
+          'paramiko>=1.10',
       ],
       tests_require=[
           'mock>=1.0.1'
       ],
       test_suite='wolphin.tests',
+      entry_points={
+          'console_scripts': [
+              'wolphin = wolphin.cli:main',
+          ],
+      },
       )
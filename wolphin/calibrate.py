@@ -0,0 +1,234 @@
+"""
+Calibrating the instances of a wolphin project before a test: instances of the same type do not
+perform the same (noisy neighbours, degraded hosts), and a slow load generator skews a whole test.
+
+Every host runs the same short micro-benchmarks, all the hosts concurrently:
+
+ - cpu: hashing ``BENCHMARK_BYTES`` with sha256, on one core;
+ - memory: writing ``MEMORY_BYTES`` through a 64MB buffer;
+ - network: downloading ``BENCHMARK_BYTES`` over http from the next host, by private address, the
+   hosts making a ring so that every one of them serves and downloads once.
+
+Scores are in MB per second. A host is an outlier when one of its scores is slower than the
+fleet's median by more than ``threshold`` median absolute deviations, and by more than
+``MIN_DEFICIT`` of the median, so that a fleet that performs evenly has none.
+"""
+
+import pipes
+import re
+from collections import namedtuple
+from time import time
+
+from gusset.colortable import ColorTable
+
+from wolphin.deploy import serve_command, stop_serving
+from wolphin.exceptions import SSHError
+
+
+BENCHMARKS = ('cpu', 'memory', 'network')
+
+BENCHMARK_BYTES = 256 * 1024 * 1024
+
+MEMORY_BYTES = 16 * BENCHMARK_BYTES
+
+# the port the hosts serve the network benchmark's file to each other on.
+CALIBRATION_PORT = 8701
+
+# the median absolute deviations from the median beyond which a score is an outlier.
+OUTLIER_THRESHOLD = 3.5
+
+# the least fraction of the median an outlier's score is below it by.
+MIN_DEFICIT = 0.2
+
+# the tag each score is stored in on the instances, by benchmark.
+SCORE_TAG = "WolphinScore.{}"
+
+_STAGING = "/tmp/wolphin-calibrate"
+
+# the scores of a host by benchmark, of the benchmarks it ran.
+HostCalibration = namedtuple('HostCalibration', ['host', 'scores', 'error'])
+
+
+def _timed(name, command):
+    """The command printing ``name``, then the times ``command`` started and ended at"""
+    return "s=$(date +%s.%N); {}; e=$(date +%s.%N); echo {} $s $e".format(command, name)
+
+
+def _local_command(serve, port, address):
+    """
+    The command of the cpu and memory benchmarks, staging the network one at ``address`` if
+    ``serve``.
+    """
+
+    commands = [_timed('cpu', "head -c {} /dev/zero | sha256sum > /dev/null"
+                              .format(BENCHMARK_BYTES)),
+                _timed('memory', "dd if=/dev/zero of=/dev/null bs=64M count={} 2> /dev/null"
+                                 .format(MEMORY_BYTES // (64 * 1024 * 1024)))]
+    if serve:
+        commands.append("mkdir -p {staging} && head -c {size} /dev/zero > {staging}/benchmark && "
+                        "{serve}".format(staging=_STAGING, size=BENCHMARK_BYTES,
+                                         serve=serve_command(_STAGING, port, address)))
+    return "; ".join(commands)
+
+
+def _network_command(source, port):
+    return ("curl -sf -o /dev/null -w '%{{size_download}} %{{time_total}}' "
+            "http://{}:{}/benchmark".format(source, port))
+
+
+def robust_outliers(scores, threshold=OUTLIER_THRESHOLD):
+    """
+    Returns the keys of the ``scores`` that are outliers on the slow side: slower than their
+    median by more than ``threshold`` scaled median absolute deviations, and by ``MIN_DEFICIT``.
+    """
+
+    values = sorted(scores.itervalues())
+    if len(values) < 3:
+        return []
+    median = _median(values)
+    # scaled to estimate the standard deviation of normally distributed scores.
+    deviation = 1.4826 * _median(sorted(abs(value - median) for value in values))
+    return sorted(key for key, value in scores.iteritems()
+                  if median - value > max(threshold * deviation, MIN_DEFICIT * median))
+
+
+class CalibrationReport(object):
+    """The scores of every host and the outliers among them, with their slow benchmarks"""
+
+    def __init__(self, calibrations, duration, threshold=OUTLIER_THRESHOLD):
+        self.calibrations = calibrations
+        self.duration = duration
+        self.replaced = []
+
+        self.outliers = dict()
+        for benchmark in BENCHMARKS:
+            for host in robust_outliers(self.scores(benchmark), threshold):
+                self.outliers.setdefault(host, []).append(benchmark)
+
+    def scores(self, benchmark):
+        """Returns the score of every host at ``benchmark``, by host, of those that ran it"""
+
+        return dict((host, calibration.scores[benchmark])
+                    for host, calibration in self.calibrations.iteritems()
+                    if calibration.scores.get(benchmark) is not None)
+
+    def median(self, benchmark):
+        scores = sorted(self.scores(benchmark).itervalues())
+        return _median(scores) if scores else None
+
+    def tags(self, host):
+        """Returns the tags of the scores of ``host``, to store on its instance"""
+
+        return dict((SCORE_TAG.format(benchmark), "{:.1f}".format(score))
+                    for benchmark, score in self.calibrations[host].scores.iteritems()
+                    if score is not None)
+
+    @property
+    def failed(self):
+        return dict((host, calibration.error) for host, calibration in self.calibrations.iteritems()
+                    if calibration.error is not None)
+
+    def as_dict(self):
+        return dict(duration=self.duration,
+                    medians=dict((benchmark, self.median(benchmark)) for benchmark in BENCHMARKS),
+                    outliers=self.outliers,
+                    replaced=self.replaced,
+                    hosts=[dict(calibration._asdict(),
+                                error=str(calibration.error) if calibration.error else None)
+                           for _, calibration in sorted(self.calibrations.iteritems())])
+
+    def __str__(self):
+        table = ColorTable('host', *(BENCHMARKS + ('outlier',)))
+        for host, calibration in sorted(self.calibrations.iteritems()):
+            row = dict((benchmark, _score(calibration.scores.get(benchmark)))
+                       for benchmark in BENCHMARKS)
+            table.add(host=host, outlier=", ".join(self.outliers.get(host, [])) or "-", **row)
+        lines = [str(table)]
+        lines.extend("[{}] error: {}".format(host, error)
+                     for host, error in sorted(self.failed.iteritems()))
+        lines.append("{} hosts, medians {}, {} outliers{} in {:.1f}s"
+                     .format(len(self.calibrations),
+                             ", ".join("{} {}".format(benchmark, _score(self.median(benchmark)))
+                                       for benchmark in BENCHMARKS),
+                             len(self.outliers),
+                             " ({} replaced)".format(len(self.replaced)) if self.replaced else "",
+                             self.duration))
+        return "\n".join(lines)
+
+
+def calibrate(ssh, hosts, port=CALIBRATION_PORT, threshold=OUTLIER_THRESHOLD, clock=time):
+    """
+    Benchmarks all the ``hosts`` concurrently through the `class:wolphin.ssh.SSHPool` ``ssh``;
+    returns a `class:wolphin.calibrate.CalibrationReport`.
+
+    :param hosts: a dict of the addresses wolphin reaches the hosts at, to the (private) addresses
+     their peers reach them at, which must be allowed to connect to ``port``.
+    """
+
+    started = clock()
+    network = len(hosts) > 1
+    results = ssh.map(lambda host: _run_local_benchmarks(ssh, host, hosts[host], network, port),
+                      hosts)
+    scores = dict((host, result) for host, result in results.iteritems()
+                  if not isinstance(result, Exception))
+    calibrations = dict((host, HostCalibration(host, dict(), result))
+                        for host, result in results.iteritems() if isinstance(result, Exception))
+
+    try:
+        if network and len(scores) > 1:
+            ring = sorted(scores)
+            sources = dict(zip(ring, ring[1:] + ring[:1]))
+            downloads = ssh.map(lambda host: _download(ssh, host, hosts[sources[host]], port),
+                                ring)
+            for host, result in downloads.iteritems():
+                if isinstance(result, Exception):
+                    calibrations[host] = HostCalibration(host, scores[host], result)
+                else:
+                    scores[host]['network'] = result
+    finally:
+        if network:
+            ssh.map(lambda host: stop_serving(ssh, host, _STAGING), hosts)
+
+    calibrations.update((host, HostCalibration(host, host_scores, None))
+                        for host, host_scores in scores.iteritems() if host not in calibrations)
+    return CalibrationReport(calibrations, clock() - started, threshold)
+
+
+def _run_local_benchmarks(ssh, host, address, serve, port):
+    """
+    Returns the cpu and memory scores of ``host``, once it serves the network benchmark at its
+    ``address``.
+    """
+
+    result = ssh.run(host, _local_command(serve, port, address))
+    timings = dict((fields[0], float(fields[2]) - float(fields[1]))
+                   for fields in (line.split() for line in result.stdout.splitlines())
+                   if len(fields) == 3 and fields[0] in BENCHMARKS)
+    if not result.succeeded or len(timings) < 2:
+        raise SSHError("{}: could not run the benchmarks: {}".format(host, result.stderr.strip()))
+    return dict(cpu=_megabytes_per_second(BENCHMARK_BYTES, timings['cpu']),
+                memory=_megabytes_per_second(MEMORY_BYTES, timings['memory']))
+
+
+def _download(ssh, host, source, port):
+    """Returns the network score of ``host``, downloading from its peer at ``source``"""
+
+    result = ssh.run(host, _network_command(pipes.quote(source), port))
+    measured = re.match(r"^(\d+) ([\d.]+)$", result.stdout.strip())
+    if not result.succeeded or not measured:
+        raise SSHError("{}: could not download from {}: {}".format(host, source,
+                                                                  result.stderr.strip()))
+    return _megabytes_per_second(int(measured.group(1)), float(measured.group(2)))
+
+
+def _megabytes_per_second(size, seconds):
+    return size / (1024.0 * 1024) / max(seconds, 1e-6)
+
+
+def _median(values):
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def _score(score):
+    return "{:.1f}".format(score) if score is not None else "-"
@@ -0,0 +1,430 @@
+"""
+The ``wolphin`` command.
+
+Only what a command needs is imported, when it runs: boto, fabric and gusset are slow to import
+and e.g. ``wolphin --help`` needs none of them. The ec2 connection is made on first use too.
+"""
+
+import argparse
+import logging
+import sys
+
+
+COMMANDS = [
+    'status',
+    'create',
+    'start',
+    'stop',
+    'reboot',
+    'terminate',
+    'revert',
+    'info',
+    'exec',
+    'deploy',
+    'collect',
+    'tail',
+    'latency',
+    'launch',
+    'telemetry',
+    'calibrate',
+    'watch',
+    'daemon'
+]
+
+# commands that can be served by a wolphin daemon.
+DAEMON_COMMANDS = ['status', 'start', 'stop', 'exec']
+
+
+def _parser():
+
+    parser = argparse.ArgumentParser(prog='wolphin',
+                                     description='Wolphin uses its cousin Boto, to manage the '
+                                                 'Amazon ec2 instances for your projects.')
+
+    parser.add_argument("command", choices=COMMANDS)
+
+    parser.add_argument("-p", "--project",
+                        dest="project",
+                        help="A unique name for your project.")
+
+    parser.add_argument("--email",
+                        dest="email",
+                        help="Email of the project owner.")
+
+    parser.add_argument("-c", "--config",
+                        nargs='+',
+                        dest="config_files",
+                        default=[],
+                        type=argparse.FileType('r'),
+                        help="Path to the file(s) containing overrides for the default wolphin "
+                             "project configuration.")
+
+    parser.add_argument("-i", "--instance",
+                        nargs='*',
+                        dest="project_instances",
+                        help="Host(Instance) number (XXX of wolphin.<project.XXX>) of the wolphin "
+                             "project instance to execute any of the wolphin commands.")
+
+    parser.add_argument("-r", "--role",
+                        dest="role",
+                        help="The role group of the project (see the role.<name>.* configuration) "
+                             "to execute any of the wolphin commands on, instead of all of them.")
+
+    parser.add_argument("-s", "--sequential",
+                        dest="sequential",
+                        action="store_true",
+                        help="Used with the 'revert' command to indicate that reverting "
+                             "should be done sequentially: instance by instance and not in "
+                             "a batch.")
+
+    parser.add_argument("--no-wait-ssh",
+                        dest="wait_for_ssh",
+                        action="store_false",
+                        default=True,
+                        help="Used with the 'create' and 'start' commands to indicate that "
+                             "wolphin should not wait for the project's instances to be "
+                             "ssh-ready.")
+
+    parser.add_argument("--cached",
+                        dest="cached",
+                        action="store_true",
+                        help="Used with the 'status' command to show the last known statuses of "
+                             "the project's instances from its snapshot (see the snapshot_dir "
+                             "configuration) without asking ec2.")
+
+    parser.add_argument("--fields",
+                        nargs='+',
+                        dest="fields",
+                        help="Used with the 'status' command to print only these fields of every "
+                             "instance, tab separated, e.g. '--fields name public_ip_address'.")
+
+    parser.add_argument("--no-wait",
+                        dest="wait",
+                        action="store_false",
+                        default=True,
+                        help="Used with the 'start', 'stop' and 'terminate' commands to exit once "
+                             "the instances are requested to transition, without waiting for "
+                             "them to.")
+
+    parser.add_argument("-x", "--execute",
+                        dest="execute",
+                        help="The shell command to run on the project's running instances with the "
+                             "'exec' and 'launch' commands.")
+
+    parser.add_argument("--paths",
+                        nargs='+',
+                        dest="deploy_paths",
+                        help="The local files and directories to copy to the project's running "
+                             "instances with the 'deploy' command.")
+
+    parser.add_argument("--remote-dir",
+                        dest="remote_dir",
+                        help="The directory of the instances to deploy to with the 'deploy' "
+                             "command.")
+
+    parser.add_argument("--peer-to-peer",
+                        dest="peer_to_peer",
+                        action="store_true",
+                        help="Used with the 'deploy' command to upload the files to one instance "
+                             "only, which passes them on to the others, which pass them on in "
+                             "turn, over their private ip addresses.")
+
+    parser.add_argument("--remote-glob",
+                        dest="remote_glob",
+                        help="The files of the instances to copy with the 'collect' command, e.g. "
+                             "'/opt/test/results/*.csv', the file to follow with the 'tail' "
+                             "command, or the latency histogram log to merge with the 'latency' "
+                             "command.")
+
+    parser.add_argument("--local-dir",
+                        dest="local_dir",
+                        default=".",
+                        help="The directory to collect files in with the 'collect' command, "
+                             "in a subdirectory per instance. Defaults to the current directory.")
+
+    parser.add_argument("--interval",
+                        dest="interval",
+                        type=int,
+                        default=1,
+                        help="Used with the 'latency' command, seconds per interval of the time "
+                             "series of the latency percentiles. Defaults to 1.")
+
+    parser.add_argument("--max-skew",
+                        dest="max_skew",
+                        type=float,
+                        default=0.5,
+                        help="Used with the 'launch' command, the largest offset, in seconds, of "
+                             "an instance's clock from the local one. Defaults to 0.5.")
+
+    parser.add_argument("--replace-outliers",
+                        dest="replace_outliers",
+                        action="store_true",
+                        help="Used with the 'calibrate' command to revert the instances much "
+                             "slower than the others at a benchmark.")
+
+    parser.add_argument("--socket",
+                        dest="socket_path",
+                        help="With the 'daemon' command, the unix socket to serve the project on, "
+                             "defaults to ~/.wolphin/<project>.sock. With the 'status', 'start', "
+                             "'stop' and 'exec' commands, have the daemon serving on this socket "
+                             "run the command.")
+
+    parser.add_argument("--refresh-interval",
+                        dest="refresh_interval",
+                        type=float,
+                        default=30,
+                        help="Used with the 'daemon' and 'watch' commands, seconds between "
+                             "refreshes of the project's instance inventory, and with the "
+                             "'telemetry' command, seconds between samples.")
+
+    parser.add_argument("--report",
+                        dest="report_file",
+                        type=argparse.FileType('w'),
+                        help="Write the timing report of the lifecycle operation as JSON to this "
+                             "file.")
+
+    parser.add_argument("--trace",
+                        dest="trace_file",
+                        type=argparse.FileType('w'),
+                        help="Trace the ec2 calls made by wolphin, write them as Chrome "
+                             "trace-event JSON to this file and print a summary of them.")
+
+    parser.add_argument("--progress",
+                        dest="progress",
+                        action="store_true",
+                        help="Print a one line summary of the progress of the instances, e.g. to "
+                             "be running, every time wolphin checks on them.")
+
+    parser.add_argument("--log",
+                        dest="logging_level",
+                        default='INFO',
+                        help="Set the logging level, e.g. '--log DEBUG' to set the level to DEBUG.")
+
+    return parser
+
+
+def main(argv=None):
+
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.command in ("exec", "launch") and not args.execute:
+        parser.error("the '{}' command needs a shell command to run, see --execute"
+                     .format(args.command))
+    if args.command == "deploy" and not (args.deploy_paths and args.remote_dir):
+        parser.error("the 'deploy' command needs files to deploy and where, see --paths and "
+                     "--remote-dir")
+    if args.command in ("collect", "tail", "latency") and not args.remote_glob:
+        parser.error("the '{}' command needs the files of the instances, see --remote-glob"
+                     .format(args.command))
+    if args.interval <= 0:
+        parser.error("--interval should be a positive number of seconds")
+
+    from wolphin.exceptions import WolphinException
+
+    try:
+        if args.socket_path and args.command in DAEMON_COMMANDS:
+            _run_through_daemon(args)
+            return
+
+        project = _make_project(args)
+        try:
+            _run(project, args)
+        finally:
+            _write_diagnostics(project, args)
+    except WolphinException as ex:
+        print ex
+        sys.exit(1)
+
+
+def _run(project, args):
+
+    from wolphin.selector import InstanceNumberBasedSelector
+
+    selector = InstanceNumberBasedSelector(instance_numbers=args.project_instances)
+
+    if args.command == "info":
+        from fabric.api import run
+        from wolphin.generator import wolphin_project
+
+        for _ in wolphin_project(project, selector=selector):
+            run("uname -a; users")
+        return
+
+    if args.command == "exec":
+        running = project.get_instances_in_states([project.STATES['running']], selector=selector)
+        _print_exec_results(project.ssh.run_all([instance.ip_address for instance in running],
+                                                args.execute))
+        return
+
+    if args.command == "deploy":
+        print project.deploy(args.deploy_paths, args.remote_dir, selector=selector,
+                             peer_to_peer=args.peer_to_peer)
+        return
+
+    if args.command == "collect":
+        print project.collect(args.remote_glob, args.local_dir, selector=selector)
+        return
+
+    if args.command == "latency":
+        print project.latency(args.remote_glob, selector=selector, interval=args.interval)
+        return
+
+    if args.command == "launch":
+        print project.launch(args.execute, selector=selector, max_skew=args.max_skew)
+        return
+
+    if args.command == "calibrate":
+        print project.calibrate(selector=selector, replace_outliers=args.replace_outliers)
+        return
+
+    if args.command == "telemetry":
+        from wolphin.telemetry import print_saturated
+
+        telemetry = project.telemetry(selector=selector, on_saturated=print_saturated)
+        try:
+            for _ in telemetry.watch(args.refresh_interval):
+                print telemetry
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.command == "tail":
+        try:
+            for host, line in project.tail(args.remote_glob, selector=selector):
+                print "[{}] {}".format(host, line)
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.command == "watch":
+        from wolphin.watch import StatusWatcher, print_changes
+
+        watcher = StatusWatcher(project, selector=selector)
+        try:
+            for changes in watcher.watch(args.refresh_interval):
+                print_changes(changes, watcher.summary())
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if args.command == "daemon":
+        from wolphin.daemon import WolphinDaemon
+
+        WolphinDaemon(project, args.socket_path, refresh_interval=args.refresh_interval).serve()
+        return
+
+    if args.command == "status" and args.fields:
+        for status in project.status(selector=selector, cached=args.cached, fields=args.fields):
+            print "\t".join(str(value) for value in status)
+        return
+
+    if args.command == "status":
+        status_info = project.status(selector=selector, cached=args.cached)
+    elif args.command == "create":
+        status_info = project.create(wait_for_ssh=args.wait_for_ssh)
+    elif args.command == "start":
+        status_info = project.start(selector=selector, wait_for_ssh=args.wait_for_ssh,
+                                    wait=args.wait)
+    elif args.command == "stop":
+        status_info = project.stop(selector=selector, wait=args.wait)
+    elif args.command == "reboot":
+        status_info = project.reboot(selector=selector)
+    elif args.command == "terminate":
+        status_info = project.terminate(selector=selector, wait=args.wait)
+    elif args.command == "revert":
+        status_info = project.revert(sequential=args.sequential, selector=selector)
+
+    if not args.wait and args.command in ("start", "stop", "terminate"):
+        print "Requested to {} {} instances.".format(args.command, len(status_info.instances))
+        return
+
+    from wolphin.status import print_status
+    print_status(status_info)
+
+
+def _run_through_daemon(args):
+
+    from wolphin.daemon import DaemonClient
+    from wolphin.status import print_status
+
+    client = DaemonClient(args.socket_path)
+    instance_numbers = args.project_instances
+    if args.command == "status":
+        print_status(client.status(instance_numbers))
+    elif args.command == "start":
+        print_status(client.start(instance_numbers, wait_for_ssh=args.wait_for_ssh))
+    elif args.command == "stop":
+        print_status(client.stop(instance_numbers))
+    elif args.command == "exec":
+        _print_exec_results(client.execute(args.execute, instance_numbers))
+
+
+def _print_exec_results(results):
+    for host, result in sorted(results.iteritems()):
+        if isinstance(result, Exception) or 'error' in result:
+            print "[{}] error: {}".format(host, result if isinstance(result, Exception)
+                                          else result['error'])
+            continue
+        result = result if isinstance(result, dict) else result.as_dict()
+        for line in (result['stdout'] + result['stderr']).splitlines():
+            print "[{}] {}".format(host, line)
+        print "[{}] exit status: {}".format(host, result['exit_status'])
+
+
+def _write_diagnostics(project, args):
+
+    if args.report_file and project.last_report is not None:
+        args.report_file.write(project.last_report.to_json(indent=2))
+
+    if args.trace_file:
+        from wolphin.tracing import print_trace_summary
+
+        project.tracer.write_chrome_trace(args.trace_file)
+        print_trace_summary(project.tracer.summary())
+
+
+def _make_project(args):
+
+    from wolphin.project import WolphinProject
+
+    config = _make_config(args)
+    _configure_logging(args, config)
+
+    tracer = None
+    if args.trace_file:
+        from wolphin.tracing import Tracer
+        tracer = Tracer()
+
+    project = WolphinProject.new(config, tracer=tracer, connect=False)
+    if args.progress:
+        project.progress_sink = _print_progress
+    if args.role:
+        project = project.role(args.role)
+    return project
+
+
+def _print_progress(progress):
+    sys.stderr.write("{}\n".format(progress))
+
+
+def _make_config(args):
+
+    from wolphin.config import Configuration
+
+    config = Configuration.create(*args.config_files)
+    config.email = args.email or config.email
+    config.project = args.project or config.project
+    return config
+
+
+def _configure_logging(args, config):
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('wolphin.{}'.format(config.project))
+    logger.setLevel(getattr(logging, args.logging_level.upper()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Collecting files from the instances of a wolphin project, e.g. the results of a load test, and
+following their logs while it runs.
+
+Every host compresses the files matching a glob into an archive, which is downloaded into a
+per-host subdirectory as soon as it is ready, from all the hosts concurrently with the bounded
+parallelism of the project's `class:wolphin.ssh.SSHPool`. The archive is kept on the host until it
+is collected, so that a collection that was interrupted resumes where it left off, unless a file
+matching the glob changed since: the archive is then made again. The download is resumed from a
+partial download of the same archive only, by its sha256.
+"""
+
+import Queue
+import hashlib
+import os
+import pipes
+import tarfile
+import threading
+from collections import namedtuple
+from glob import glob
+from os.path import exists, getsize, join, realpath
+from time import time
+
+from wolphin.deploy import file_sha256
+from wolphin.exceptions import SSHError
+
+
+_CHUNK_SIZE = 1024 * 1024
+
+HostCollection = namedtuple('HostCollection',
+                            ['host', 'bytes_received', 'resumed_from', 'seconds', 'directory',
+                             'error'])
+
+
+class CollectReport(object):
+    """The outcome of a collection: what was received from each host and how long it took"""
+
+    def __init__(self, collections, duration):
+        self.collections = collections
+        self.duration = duration
+
+    @property
+    def bytes_received(self):
+        return sum(collection.bytes_received for collection in self.collections.itervalues())
+
+    @property
+    def failed(self):
+        return dict((host, collection.error) for host, collection in self.collections.iteritems()
+                    if collection.error is not None)
+
+    def as_dict(self):
+        return dict(bytes_received=self.bytes_received,
+                    duration=self.duration,
+                    hosts=[dict(collection._asdict(),
+                                error=str(collection.error) if collection.error else None)
+                           for _, collection in sorted(self.collections.iteritems())])
+
+    def __str__(self):
+        lines = []
+        for host, collection in sorted(self.collections.iteritems()):
+            if collection.error is not None:
+                lines.append("[{}] error: {}".format(host, collection.error))
+                continue
+            resumed = (" (resumed from {})".format(collection.resumed_from)
+                       if collection.resumed_from else "")
+            lines.append("[{}] {} bytes in {:.1f}s{} to {}".format(host,
+                                                                  collection.bytes_received,
+                                                                  collection.seconds,
+                                                                  resumed,
+                                                                  collection.directory))
+        lines.append("{} hosts, {} failed, {} bytes received in {:.1f}s"
+                     .format(len(self.collections),
+                             len(self.failed),
+                             self.bytes_received,
+                             self.duration))
+        return "\n".join(lines)
+
+
+def collect(ssh, hosts, remote_glob, local_dir, clock=time):
+    """
+    Collects the files matching ``remote_glob`` (expanded by the hosts' shell) from all the
+    ``hosts`` concurrently, each into its own ``local_dir/<host>`` subdirectory; returns a
+    `class:wolphin.collect.CollectReport`.
+    """
+
+    started = clock()
+    archive = remote_archive(remote_glob)
+    # made once, as the hosts are collected from concurrently.
+    if not exists(local_dir):
+        os.makedirs(local_dir)
+    results = ssh.map(lambda host: _collect_from_host(ssh, host, remote_glob, archive, local_dir,
+                                                      clock),
+                      hosts)
+    collections = dict((host, result if not isinstance(result, Exception)
+                        else HostCollection(host, 0, 0, 0, None, result))
+                       for host, result in results.iteritems())
+    return CollectReport(collections, clock() - started)
+
+
+def remote_archive(remote_glob):
+    """The archive the hosts compress the files matching ``remote_glob`` into"""
+    return "/tmp/wolphin-collect-{}.tar.gz".format(hashlib.sha1(remote_glob).hexdigest()[:12])
+
+
+def _collect_from_host(ssh, host, remote_glob, archive, local_dir, clock):
+    started = clock()
+
+    # compressed on the host, unless an interrupted collection already did and none of the files
+    # changed since.
+    result = ssh.run(host, "test -f {archive} && "
+                           "test -z \"$(find {glob} -newer {archive} 2>/dev/null | head -n 1)\" || "
+                           "(tar -czf {archive}.part {glob} && mv {archive}.part {archive}) && "
+                           "sha256sum {archive}".format(archive=pipes.quote(archive),
+                                                        glob=remote_glob))
+    if not result.succeeded:
+        raise SSHError("{}: could not archive {}: {}".format(host, remote_glob,
+                                                             result.stderr.strip()))
+    sha256 = result.stdout.split()[0]
+
+    # named after the archive, so that only a partial download of the same one is resumed.
+    partial = join(local_dir, "{}.{}.tar.gz.part".format(host, sha256[:12]))
+    for stale in glob(join(local_dir, "{}.*.tar.gz.part".format(host))):
+        if stale != partial:
+            os.remove(stale)
+    resumed_from = getsize(partial) if exists(partial) else 0
+    received = _download(ssh, host, archive, partial, resumed_from)
+    if file_sha256(partial) != sha256:
+        os.remove(partial)
+        raise SSHError("{}: the archive of {} did not match its sha256".format(host, remote_glob))
+
+    directory = join(local_dir, host)
+    with tarfile.open(partial) as downloaded:
+        unsafe = _unsafe_member(downloaded, directory)
+        if unsafe is not None:
+            os.remove(partial)
+            raise SSHError("{}: the archive of {} has a member outside of its directory: {}"
+                           .format(host, remote_glob, unsafe))
+        downloaded.extractall(directory)
+    os.remove(partial)
+    ssh.run(host, "rm -f {}".format(pipes.quote(archive)))
+    return HostCollection(host, received, resumed_from, clock() - started, directory, None)
+
+
+def _unsafe_member(archive, directory):
+    """
+    Returns the name of the first member of ``archive`` that would be extracted outside of
+    ``directory``, or links outside of it, or is neither a file, a directory nor a link; None if
+    there is none.
+    """
+
+    root = realpath(directory)
+
+    def _inside(path):
+        path = realpath(path)
+        return path == root or path.startswith(root + os.sep)
+
+    for member in archive.getmembers():
+        path = join(root, member.name)
+        if not _inside(path):
+            return member.name
+        if member.issym() and not _inside(join(os.path.dirname(path), member.linkname)):
+            return member.name
+        if member.islnk() and not _inside(join(root, member.linkname)):
+            return member.name
+        if not (member.isfile() or member.isdir() or member.issym() or member.islnk()):
+            return member.name
+    return None
+
+
+def _download(ssh, host, remote_path, local_path, offset):
+    """Appends what follows ``offset`` in ``remote_path`` to ``local_path``; returns its size"""
+
+    received = 0
+    sftp = ssh.open_sftp(host)
+    try:
+        remote_file = sftp.open(remote_path, "rb")
+        try:
+            remote_file.seek(offset)
+            with open(local_path, "ab") as local_file:
+                for chunk in iter(lambda: remote_file.read(_CHUNK_SIZE), ""):
+                    local_file.write(chunk)
+                    received += len(chunk)
+        finally:
+            remote_file.close()
+    finally:
+        sftp.close()
+    return received
+
+
+def tail(ssh, hosts, remote_path, lines=10):
+    """
+    Follows ``remote_path`` on all the ``hosts`` at once, e.g. a log; yields ``(host, line)`` as
+    the lines arrive, starting with the last ``lines`` of every host, until every host's stream
+    ends or the generator is closed.
+    """
+
+    hosts = list(hosts)
+    queue = Queue.Queue()
+    channels = []
+    command = "tail -n {} -F {}".format(int(lines), pipes.quote(remote_path))
+
+    def _follow(host):
+        try:
+            _, stdout, _ = ssh.client(host).exec_command(command)
+            channels.append(stdout.channel)
+            for line in stdout:
+                queue.put((host, line.rstrip("\n")))
+        except Exception as error:
+            ssh.logger.warning("Stopped following {} on {}: {}".format(remote_path, host, error))
+        finally:
+            queue.put((host, None))
+
+    for host in hosts:
+        thread = threading.Thread(target=_follow, args=(host,), name="wolphin-tail-" + host)
+        thread.daemon = True
+        thread.start()
+
+    following = len(hosts)
+    try:
+        while following:
+            try:
+                # a timeout, so that the wait can be interrupted.
+                host, line = queue.get(timeout=1)
+            except Queue.Empty:
+                continue
+            if line is None:
+                following -= 1
+            else:
+                yield host, line
+    finally:
+        for channel in channels:
+            channel.close()
@@ -1,7 +1,9 @@
+from copy import copy
 from os.path import expanduser, abspath, exists, join
 import re
 
 from wolphin.exceptions import InvalidWolphinConfiguration
+from wolphin.readiness import READINESS_CHANNELS
 
 
 class Configuration(object):
@@ -20,6 +22,33 @@ class Configuration(object):
     DEFAULT_MAX_WAIT_TRIES = 12
     DEFAULT_MAX_WAIT_DURATION = 10
 
+    # ec2's own request rate limits for describe and mutating calls.
+    DEFAULT_EC2_DESCRIBE_RATE = 20
+    DEFAULT_EC2_DESCRIBE_BURST = 100
+    DEFAULT_EC2_MUTATE_RATE = 5
+    DEFAULT_EC2_MUTATE_BURST = 200
+    DEFAULT_EC2_MAX_RETRIES = 8
+
+    # attributes that may be left unset, to leave the features they configure off.
+    OPTIONAL_ATTRIBUTES = frozenset(['snapshot_dir',
+                                     'user_data_file',
+                                     'boot_marker',
+                                     'readiness',
+                                     'readiness_url',
+                                     'straggler_factor',
+                                     'roles',
+                                     'role'])
+
+    # attributes a role group can set for itself, see ``roles``.
+    ROLE_ATTRIBUTES = frozenset(['ami_id',
+                                 'instance_type',
+                                 'instance_availabilityzone',
+                                 'instance_securitygroup',
+                                 'min_instance_count',
+                                 'max_instance_count',
+                                 'user_data_file',
+                                 'boot_marker'])
+
     def __init__(self,
                  project=None,
                  email=None,
@@ -37,7 +66,19 @@ class Configuration(object):
                  aws_access_key_id=None,
                  aws_secret_key=None,
                  max_wait_tries=DEFAULT_MAX_WAIT_TRIES,
-                 max_wait_duration=DEFAULT_MAX_WAIT_DURATION):
+                 max_wait_duration=DEFAULT_MAX_WAIT_DURATION,
+                 ec2_describe_rate=DEFAULT_EC2_DESCRIBE_RATE,
+                 ec2_describe_burst=DEFAULT_EC2_DESCRIBE_BURST,
+                 ec2_mutate_rate=DEFAULT_EC2_MUTATE_RATE,
+                 ec2_mutate_burst=DEFAULT_EC2_MUTATE_BURST,
+                 ec2_max_retries=DEFAULT_EC2_MAX_RETRIES,
+                 snapshot_dir=None,
+                 user_data_file=None,
+                 boot_marker=None,
+                 readiness=None,
+                 readiness_url=None,
+                 straggler_factor=None,
+                 roles=None):
         """
         Initialize a wolphin configuration from defaults and any provided parameters.
 
@@ -62,6 +103,35 @@ class Configuration(object):
         :param max_wait_tries: maximum number of retries to make.
         :param max_wait_duration: maximum duration in seconds, to wait during instance state
          transition, for each try.
+        :param ec2_describe_rate: describe calls per second wolphin limits itself to.
+        :param ec2_describe_burst: describe calls wolphin allows itself in a burst.
+        :param ec2_mutate_rate: mutating calls (run, start, stop, tag etc.) per second wolphin
+         limits itself to.
+        :param ec2_mutate_burst: mutating calls wolphin allows itself in a burst.
+        :param ec2_max_retries: maximum number of times to retry an ec2 call throttled by amazon.
+        :param snapshot_dir: (optional) directory to keep a snapshot of the project's instance
+         inventory in, see `class:wolphin.snapshot.InventorySnapshot`. No snapshot is kept if
+         not set.
+        :param user_data_file: (optional) a script or cloud-init file to send as user data with the
+         reservation of instances, templated with the project name and instance number, see
+         `mod:wolphin.user_data`.
+        :param boot_marker: (optional) a file the instances create once they are done
+         provisioning themselves with their user data, e.g.
+         /var/lib/cloud/instance/boot-finished, for create to wait for.
+        :param readiness: (optional) how the instances are known to be ready: 'ssh' (the default)
+         polls them over ssh, 'tag' and 'http' wait for them to signal it themselves, see
+         `mod:wolphin.readiness`.
+        :param readiness_url: (optional) the url, reachable from the instances, of the collector
+         wolphin runs for them to signal that they are ready to, with 'http' readiness.
+        :param straggler_factor: (optional) once 90% of the instances being created or started
+         are ready, the instances not ready after ``straggler_factor`` times as long as that took
+         are replaced speculatively, keeping whichever of an instance and its replacement is ready
+         first, see `mod:wolphin.stragglers`. Stragglers are waited for if not set.
+        :param roles: (optional) the role groups of the project, e.g. load generators and a
+         coordinator, as a dict of each role's name to the attributes it sets for itself (any of
+         ``ROLE_ATTRIBUTES``, the others are the project's), e.g.
+         ``dict(generator=dict(instance_type='c3.large', max_instance_count=20))``. In a config
+         file, they are set as ``role.<name>.<attribute> = value``.
         """
 
         self.project = project
@@ -81,6 +151,20 @@ class Configuration(object):
         self.aws_secret_key = aws_secret_key
         self.max_wait_tries = max_wait_tries
         self.max_wait_duration = max_wait_duration
+        self.ec2_describe_rate = ec2_describe_rate
+        self.ec2_describe_burst = ec2_describe_burst
+        self.ec2_mutate_rate = ec2_mutate_rate
+        self.ec2_mutate_burst = ec2_mutate_burst
+        self.ec2_max_retries = ec2_max_retries
+        self.snapshot_dir = snapshot_dir
+        self.user_data_file = user_data_file
+        self.boot_marker = boot_marker
+        self.readiness = readiness
+        self.readiness_url = readiness_url
+        self.straggler_factor = straggler_factor
+        self.roles = roles
+        # the role of the group this configuration is for, see `func:for_role`.
+        self.role = None
 
     @classmethod
     def create(cls, *config_files):
@@ -120,12 +204,30 @@ class Configuration(object):
         if property_file:
             self.__dict__.update(_as_dict(property_file))
 
+        # role attributes are set as role.<name>.<attribute>.
+        for key in [key for key in self.__dict__ if key.startswith("role.")]:
+            _, role, attribute = key.split(".", 2)
+            self.roles = self.roles or dict()
+            self.roles.setdefault(role, dict())[attribute] = self.__dict__.pop(key)
+        for attributes in (self.roles or dict()).itervalues():
+            for integer_attribute in ['min_instance_count', 'max_instance_count']:
+                if integer_attribute in attributes:
+                    attributes[integer_attribute] = int(attributes[integer_attribute])
+
         # convert the values that must be numeric from string to int.
         for integer_attribute in ['min_instance_count',
                                   'max_instance_count',
                                   'max_wait_tries',
-                                  'max_wait_duration']:
+                                  'max_wait_duration',
+                                  'ec2_describe_burst',
+                                  'ec2_mutate_burst',
+                                  'ec2_max_retries']:
             setattr(self, integer_attribute, int(getattr(self, integer_attribute)))
+        for float_attribute in ['ec2_describe_rate',
+                                'ec2_mutate_rate']:
+            setattr(self, float_attribute, float(getattr(self, float_attribute)))
+        if self.straggler_factor:
+            self.straggler_factor = float(self.straggler_factor)
 
     @property
     def ssh_key_file(self):
@@ -136,11 +238,23 @@ class Configuration(object):
         for key, value in kwargs.iteritems():
             setattr(self, key, value)
 
+    def for_role(self, role):
+        """Returns the configuration of the ``role`` group of the project"""
+
+        if role not in (self.roles or dict()):
+            raise InvalidWolphinConfiguration("Unknown role: '{}', the roles are: {}."
+                                              .format(role, ", ".join(sorted(self.roles or []))))
+        config = copy(self)
+        config.update(**self.roles[role])
+        config.roles = None
+        config.role = role
+        return config
+
     def validate(self):
         """Validates this configuration object"""
 
         for k, v in self.__dict__.iteritems():
-            if not v:
+            if not v and k not in self.OPTIONAL_ATTRIBUTES:
                 raise InvalidWolphinConfiguration("{} is missing or None.".format(k))
 
         # some basic email validation.
@@ -153,6 +267,34 @@ class Configuration(object):
                                               " such that 0 < min_instance_count <="
                                               " max_instance_count.")
 
+        # is the user data available?
+        if self.user_data_file and not exists(expanduser(self.user_data_file)):
+            raise InvalidWolphinConfiguration("user_data_file {} could not be found."
+                                              .format(self.user_data_file))
+
+        # can the instances signal that they are ready?
+        if self.readiness and self.readiness not in READINESS_CHANNELS:
+            raise InvalidWolphinConfiguration("readiness must be one of {}, not {}."
+                                              .format(", ".join(READINESS_CHANNELS),
+                                                      self.readiness))
+        if self.readiness == 'http' and not self.readiness_url:
+            raise InvalidWolphinConfiguration("readiness_url is needed for http readiness.")
+
+        # stragglers are slower than the others.
+        if self.straggler_factor is not None and self.straggler_factor <= 1:
+            raise InvalidWolphinConfiguration("straggler_factor should be more than 1.")
+
+        # are the roles valid groups of their own?
+        for role, attributes in sorted((self.roles or dict()).iteritems()):
+            if not re.match(r"^[\w-]+$", role):
+                raise InvalidWolphinConfiguration("role '{}' should only have letters, digits, "
+                                                  "'_' and '-'.".format(role))
+            unknown = sorted(set(attributes) - self.ROLE_ATTRIBUTES)
+            if unknown:
+                raise InvalidWolphinConfiguration("role '{}' cannot set {}."
+                                                  .format(role, ", ".join(unknown)))
+            self.for_role(role).validate()
+
         # is the .pem available?
         if not exists(self.ssh_key_file):
             raise InvalidWolphinConfiguration(".pem file {} could not be found."
@@ -0,0 +1,86 @@
+"""Interception of the calls wolphin makes to ec2, through boto connection and instance objects"""
+
+
+class InterceptedConnection(object):
+    """
+    Wraps an ec2 connection so that every call made through it, or through the instances it
+    returns, goes through an ``interceptor``.
+
+    An interceptor is a callable ``interceptor(call, instance_ids, func, args, kwargs)`` that must
+    return the result of ``func(*args, **kwargs)``, where ``call`` is the name of the boto call
+    (e.g. 'run_instances' or 'Instance.update') and ``instance_ids`` the ids of the instances it
+    concerns, if known.
+    """
+
+    def __init__(self, conn, interceptor):
+        self._conn = conn
+        self._interceptor = interceptor
+
+    def __getattr__(self, name):
+        attribute = getattr(self._conn, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def intercepted(*args, **kwargs):
+            return self._wrap(self._interceptor(name,
+                                                _instance_ids(args, kwargs),
+                                                attribute,
+                                                args,
+                                                kwargs))
+        return intercepted
+
+    def _wrap(self, result):
+        """Wraps the instances in ``result`` so that the calls made through them are intercepted"""
+
+        if hasattr(result, 'instances'):
+            # a reservation.
+            result.instances = [self._wrap(instance) for instance in result.instances]
+        elif isinstance(result, list):
+            # a list of reservations or instances, boto result sets are lists too.
+            result[:] = [self._wrap(item) for item in result]
+        elif hasattr(result, 'update') and hasattr(result, 'state'):
+            return InterceptedInstance(result, self._interceptor)
+        return result
+
+
+class InterceptedInstance(object):
+    """
+    Wraps an ec2 instance so that the calls made through it (update, start, stop, etc.) go through
+    an ``interceptor``. All other attributes are read from and written to the wrapped instance.
+    """
+
+    def __init__(self, instance, interceptor):
+        self.__dict__['_instance'] = instance
+        self.__dict__['_interceptor'] = interceptor
+
+    def __getattr__(self, name):
+        attribute = getattr(self._instance, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+
+        def intercepted(*args, **kwargs):
+            return self._interceptor("Instance.{}".format(name),
+                                     [self._instance.id],
+                                     attribute,
+                                     args,
+                                     kwargs)
+        return intercepted
+
+    def __setattr__(self, name, value):
+        setattr(self._instance, name, value)
+
+    def __repr__(self):
+        return repr(self._instance)
+
+
+def _instance_ids(args, kwargs):
+    """Best effort extraction of the instance ids a connection call concerns."""
+
+    candidates = [kwargs.get('instance_ids'), kwargs.get('resource_ids'), kwargs.get('instance_id')]
+    candidates.extend(args[:1])
+    for candidate in candidates:
+        if isinstance(candidate, basestring) and candidate.startswith('i-'):
+            return [candidate]
+        if isinstance(candidate, (list, tuple)) and candidate:
+            return list(candidate)
+    return []
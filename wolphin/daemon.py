@@ -0,0 +1,265 @@
+"""
+A long running wolphin daemon, serving commands for one project over a local unix socket.
+
+The daemon keeps the project's ec2 connection, its instance inventory and ssh connections to its
+instances warm, and refreshes the inventory in the background, so that the thin clients talking to
+it (see `class:wolphin.daemon.DaemonClient`) get answers from warm state in milliseconds instead of
+reconnecting and rediscovering everything on every command.
+
+Requests and responses are single lines of JSON: ``{"command": "status", "args": {...}}`` is
+answered with ``{"ok": true, "result": ...}`` or ``{"ok": false, "error": "..."}``.
+"""
+
+import SocketServer
+import errno
+import json
+import logging
+import os
+import socket
+import threading
+from os.path import dirname, exists, expanduser, join
+from time import time
+
+from wolphin.attribute_dict import AttributeDict
+from wolphin.exceptions import DaemonError, WolphinException
+from wolphin.selector import InstanceNumberBasedSelector
+from wolphin.status import instance_status
+
+
+DEFAULT_REFRESH_INTERVAL = 30
+
+
+def default_socket_path(project_name):
+    """Returns the default socket path of the daemon of the project named ``project_name``"""
+    return expanduser(join("~", ".wolphin", "{}.sock".format(project_name)))
+
+
+class _RequestHandler(SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # e.g. another daemon probing whether this one still serves, which does not wait for
+            # an answer.
+            return
+        try:
+            request = json.loads(line)
+            response = dict(ok=True, result=self.server.dispatch(request.get("command"),
+                                                                 request.get("args") or {}))
+        except WolphinException as error:
+            response = dict(ok=False, error=str(error))
+        except Exception as error:
+            self.server.logger.exception("Failed to serve a request")
+            response = dict(ok=False, error="{}: {}".format(type(error).__name__, error))
+        self.wfile.write(json.dumps(response) + "\n")
+
+
+class WolphinDaemon(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    """
+    Serves status, start, stop, exec, refresh and shutdown commands for a
+    `class:wolphin.project.WolphinProject` over a unix socket.
+
+    Status is answered from the inventory, refreshed every ``refresh_interval`` seconds and after
+    every operation. Operations that change the project, and refreshes, are run one at a time, as
+    they share the project's ec2 connection.
+    """
+
+    daemon_threads = True
+
+    COMMANDS = ('status', 'start', 'stop', 'exec', 'refresh', 'shutdown')
+
+    def __init__(self, project, socket_path=None, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.project = project
+        self.socket_path = socket_path or default_socket_path(project.config.project)
+        self.refresh_interval = refresh_interval
+        self.inventory = []
+        self.refreshed = None
+        self.operation_lock = threading.RLock()
+        self.stopped = threading.Event()
+        self.logger = logging.getLogger('wolphin.{}.daemon'.format(project.config.project))
+        self.refresh()
+
+        _remove_stale_socket(self.socket_path)
+        # only the owner may talk to the daemon.
+        umask = os.umask(0o077)
+        try:
+            SocketServer.UnixStreamServer.__init__(self, self.socket_path, _RequestHandler)
+        finally:
+            os.umask(umask)
+
+    def serve(self):
+        """Serves requests until shut down"""
+
+        refresher = threading.Thread(target=self._refresh_periodically, name="wolphin-refresh")
+        refresher.daemon = True
+        refresher.start()
+
+        self.logger.info("Serving project {} on {}".format(self.project.config.project,
+                                                           self.socket_path))
+        try:
+            self.serve_forever(poll_interval=0.2)
+        finally:
+            self.stopped.set()
+            self.server_close()
+            if self.project._ssh is not None:
+                self.project.ssh.close()
+            if exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def stop(self):
+        """Stops serving; must not be called from the thread serving requests"""
+        self.stopped.set()
+        self.shutdown()
+
+    def refresh(self):
+        """Refreshes the inventory of the project's instances from ec2"""
+
+        with self.operation_lock:
+            instances = self.project._get_all_instances()
+            self.inventory, self.refreshed = instances, time()
+        return len(instances)
+
+    def _refresh_periodically(self):
+        while not self.stopped.wait(self.refresh_interval):
+            # an operation refreshes the inventory once it is done anyway.
+            if not self.operation_lock.acquire(False):
+                continue
+            try:
+                self.refresh()
+            except Exception:
+                self.logger.exception("Failed to refresh the inventory, will retry")
+            finally:
+                self.operation_lock.release()
+
+    def dispatch(self, command, args):
+        if command not in self.COMMANDS:
+            raise DaemonError("Unknown command: {}".format(command))
+        return getattr(self, "_{}".format(command))(**args)
+
+    def _selector(self, instance_numbers):
+        return InstanceNumberBasedSelector(instance_numbers=instance_numbers)
+
+    def _status(self, instance_numbers=None):
+        instances = self._selector(instance_numbers).select(self.inventory)
+        return dict(refreshed=self.refreshed,
+                    instances=[_as_serializable(instance_status(instance))
+                               for instance in instances])
+
+    def _operate(self, operation, instance_numbers, **kwargs):
+        with self.operation_lock:
+            operation(selector=self._selector(instance_numbers), **kwargs)
+            self.refresh()
+        return self._status(instance_numbers)
+
+    def _start(self, instance_numbers=None, wait_for_ssh=True):
+        return self._operate(self.project.start, instance_numbers, wait_for_ssh=wait_for_ssh)
+
+    def _stop(self, instance_numbers=None):
+        return self._operate(self.project.stop, instance_numbers)
+
+    def _exec(self, command, instance_numbers=None, timeout=None):
+        hosts = [instance.ip_address
+                 for instance in self._selector(instance_numbers).select(self.inventory)
+                 if instance.state == 'running' and instance.ip_address]
+        results = self.project.ssh.run_all(hosts, command, timeout=timeout)
+        return dict((host, (dict(error=str(result)) if isinstance(result, Exception)
+                            else result.as_dict()))
+                    for host, result in results.iteritems())
+
+    def _refresh(self):
+        return dict(instances=self.refresh())
+
+    def _shutdown(self):
+        # shutting down waits for the serving loop to exit, which cannot be done by a request.
+        threading.Thread(target=self.stop).start()
+        return dict(stopping=True)
+
+
+class DaemonClient(object):
+    """A thin client of a `class:wolphin.daemon.WolphinDaemon`"""
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, command, args=None):
+        """Sends ``command`` with the dict of ``args`` to the daemon; returns the result"""
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(self.timeout)
+        try:
+            client.connect(self.socket_path)
+            client.sendall(json.dumps(dict(command=command, args=args or {})) + "\n")
+            response = client.makefile('r').readline()
+        except socket.error as error:
+            raise DaemonError("Could not talk to the wolphin daemon on {}: {}"
+                              .format(self.socket_path, error))
+        finally:
+            client.close()
+
+        if not response:
+            raise DaemonError("The wolphin daemon on {} closed the connection"
+                              .format(self.socket_path))
+        response = json.loads(response)
+        if not response["ok"]:
+            raise DaemonError(response["error"])
+        return response["result"]
+
+    def status(self, instance_numbers=None):
+        """Returns the statuses of the project's instances like `WolphinProject.status` does"""
+        return _as_status(self.request("status", dict(instance_numbers=instance_numbers)))
+
+    def start(self, instance_numbers=None, wait_for_ssh=True):
+        return _as_status(self.request("start", dict(instance_numbers=instance_numbers,
+                                                     wait_for_ssh=wait_for_ssh)))
+
+    def stop(self, instance_numbers=None):
+        return _as_status(self.request("stop", dict(instance_numbers=instance_numbers)))
+
+    def execute(self, command, instance_numbers=None, timeout=None):
+        """Runs ``command`` on the running instances; returns a dict of host to result"""
+        return self.request("exec", dict(command=command,
+                                         instance_numbers=instance_numbers,
+                                         timeout=timeout))
+
+    def refresh(self):
+        return self.request("refresh")
+
+    def shutdown(self):
+        return self.request("shutdown")
+
+
+def _as_serializable(status):
+    status = AttributeDict(status)
+    status.security_groups = [dict(name=group.name) for group in status.security_groups]
+    return status
+
+
+def _as_status(result):
+    statuses = []
+    for status in result["instances"]:
+        status = AttributeDict(status)
+        status.security_groups = [AttributeDict(group) for group in status.security_groups]
+        statuses.append(status)
+    return statuses
+
+
+def _remove_stale_socket(socket_path):
+    """Removes a socket left behind by a daemon that is gone; fails if the daemon is still there"""
+
+    if not exists(dirname(socket_path)):
+        os.makedirs(dirname(socket_path))
+    if not exists(socket_path):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except socket.error as error:
+        if error.errno in (errno.ECONNREFUSED, errno.ENOENT):
+            os.remove(socket_path)
+            return
+        raise
+    finally:
+        probe.close()
+    raise DaemonError("A wolphin daemon is already serving on {}".format(socket_path))
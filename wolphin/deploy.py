@@ -0,0 +1,350 @@
+"""
+Deploying local files to the instances of a wolphin project.
+
+The files are compressed once into a `class:wolphin.deploy.Bundle`, then either uploaded to all
+the hosts concurrently over their pooled ssh connections (`func:wolphin.deploy.push`), or uploaded
+once to a seed host and passed on from host to host over their private addresses, the number of
+hosts having it doubling every round (`func:wolphin.deploy.distribute`). Every host keeps the
+content hash of what was last deployed to a directory, so that hosts already up to date are
+skipped.
+"""
+
+import hashlib
+import os
+import pipes
+import shutil
+import tarfile
+import tempfile
+from collections import namedtuple
+from os.path import basename, isdir, join, normpath
+from time import time
+
+from wolphin.exceptions import SSHError
+
+
+# the file, in the remote directory, that holds the content hash of what was deployed to it.
+MARKER_FILE = ".wolphin-deploy.sha256"
+
+# the port the hosts having the bundle serve it to their peers on, during a distribution.
+DISTRIBUTION_PORT = 8700
+
+# the rounds a host is tried again in, from another peer, before its distribution fails.
+DISTRIBUTION_ATTEMPTS = 3
+
+_CHUNK_SIZE = 1024 * 1024
+
+# ``source`` is the peer a host got the bundle from, None if it was uploaded to it by wolphin.
+HostDeployment = namedtuple('HostDeployment',
+                            ['host', 'skipped', 'bytes_sent', 'seconds', 'error', 'source'])
+
+
+class Bundle(object):
+    """
+    The ``local_paths`` compressed into a single tar.gz, along with the sha256 of their content
+    (names, modes and bytes, not times), which stays the same as long as the files do, and the
+    sha256 of the tar.gz itself, which the hosts check what they received against. Each path is
+    extracted under its own base name in the remote directory.
+    """
+
+    def __init__(self, local_paths):
+        self.local_paths = [normpath(path) for path in local_paths]
+        self.directory = tempfile.mkdtemp(prefix="wolphin-deploy-")
+        self.path = join(self.directory, "bundle.tar.gz")
+
+        with tarfile.open(self.path, "w:gz") as bundle:
+            for local_path in self.local_paths:
+                bundle.add(local_path, arcname=basename(local_path))
+        self.size = os.path.getsize(self.path)
+        self.sha256 = content_sha256(self.local_paths)
+        self.file_sha256 = file_sha256(self.path)
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def content_sha256(local_paths):
+    """Returns the sha256 of the names, modes and bytes of the files under ``local_paths``"""
+
+    content_hash = hashlib.sha256()
+    for name, path in sorted(_walk(local_paths)):
+        content_hash.update("{}\0{:o}\0".format(name, os.stat(path).st_mode & 0777))
+        if not isdir(path):
+            content_hash.update(file_sha256(path))
+    return content_hash.hexdigest()
+
+
+def file_sha256(path):
+    """Returns the sha256 of the bytes of the file at ``path``"""
+
+    content_hash = hashlib.sha256()
+    with open(path, "rb") as local_file:
+        for chunk in iter(lambda: local_file.read(_CHUNK_SIZE), ""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def _walk(local_paths):
+    """Yields the name in the bundle and the local path of every file and directory"""
+
+    for local_path in local_paths:
+        name = basename(local_path)
+        yield name, local_path
+        for directory, directory_names, file_names in os.walk(local_path):
+            for file_name in directory_names + file_names:
+                path = join(directory, file_name)
+                yield join(name, os.path.relpath(path, local_path)), path
+
+
+class DeployReport(object):
+    """The outcome of a deployment: what was sent to each host and how long it took"""
+
+    def __init__(self, bundle, deployments, duration, rounds=1):
+        self.sha256 = bundle.sha256
+        self.bundle_size = bundle.size
+        self.deployments = deployments
+        self.duration = duration
+        self.rounds = rounds
+
+    @property
+    def bytes_sent(self):
+        return sum(deployment.bytes_sent for deployment in self.deployments.itervalues())
+
+    @property
+    def uploaded(self):
+        """The bytes uploaded by wolphin itself, the others were sent from host to host"""
+        return sum(deployment.bytes_sent for deployment in self.deployments.itervalues()
+                   if deployment.source is None)
+
+    @property
+    def skipped(self):
+        return sorted(host for host, deployment in self.deployments.iteritems()
+                      if deployment.skipped)
+
+    @property
+    def failed(self):
+        return dict((host, deployment.error) for host, deployment in self.deployments.iteritems()
+                    if deployment.error is not None)
+
+    def as_dict(self):
+        return dict(sha256=self.sha256,
+                    bundle_size=self.bundle_size,
+                    bytes_sent=self.bytes_sent,
+                    uploaded=self.uploaded,
+                    duration=self.duration,
+                    rounds=self.rounds,
+                    hosts=[dict(deployment._asdict(),
+                                error=str(deployment.error) if deployment.error else None)
+                           for _, deployment in sorted(self.deployments.iteritems())])
+
+    def __str__(self):
+        lines = []
+        for host, deployment in sorted(self.deployments.iteritems()):
+            if deployment.error is not None:
+                lines.append("[{}] error: {}".format(host, deployment.error))
+            elif deployment.skipped:
+                lines.append("[{}] up to date".format(host))
+            else:
+                source = " from {}".format(deployment.source) if deployment.source else ""
+                lines.append("[{}] {} bytes in {:.1f}s{}".format(host,
+                                                                 deployment.bytes_sent,
+                                                                 deployment.seconds,
+                                                                 source))
+        lines.append("{} hosts, {} up to date, {} failed, {} bytes sent ({} uploaded) in {:.1f}s"
+                     .format(len(self.deployments),
+                             len(self.skipped),
+                             len(self.failed),
+                             self.bytes_sent,
+                             self.uploaded,
+                             self.duration))
+        return "\n".join(lines)
+
+
+def push(ssh, bundle, hosts, remote_dir, clock=time):
+    """
+    Deploys the ``bundle`` to the ``remote_dir`` of all the ``hosts`` concurrently through the
+    `class:wolphin.ssh.SSHPool` ``ssh``; returns a `class:wolphin.deploy.DeployReport`.
+    """
+
+    started = clock()
+    results = ssh.map(lambda host: deploy_to_host(ssh, bundle, host, remote_dir, clock), hosts)
+    deployments = dict((host, result if not isinstance(result, Exception)
+                        else HostDeployment(host, False, 0, 0, result, None))
+                       for host, result in results.iteritems())
+    return DeployReport(bundle, deployments, clock() - started)
+
+
+def deploy_to_host(ssh, bundle, host, remote_dir, clock=time):
+    """Deploys the ``bundle`` to the ``remote_dir`` of ``host``; returns its HostDeployment"""
+
+    started = clock()
+    if _is_up_to_date(ssh, host, remote_dir, bundle.sha256):
+        return HostDeployment(host, True, 0, clock() - started, None, None)
+
+    remote_bundle = "/tmp/wolphin-deploy-{}.tar.gz".format(bundle.sha256)
+    sftp = ssh.open_sftp(host)
+    try:
+        sftp.put(bundle.path, remote_bundle)
+    finally:
+        sftp.close()
+
+    _run_checked(ssh, host, "{} && rm -f {}".format(_extract_command(remote_bundle,
+                                                                     remote_dir,
+                                                                     bundle.sha256),
+                                                    pipes.quote(remote_bundle)))
+    return HostDeployment(host, False, bundle.size, clock() - started, None, None)
+
+
+def distribute(ssh, bundle, hosts, remote_dir, port=DISTRIBUTION_PORT, clock=time):
+    """
+    Deploys the ``bundle`` to the ``remote_dir`` of all the ``hosts`` by uploading it to one of
+    them only, the seed, from which it is passed on from host to host: every round, each host
+    having the bundle serves it to one that does not, over http on ``port``, so that it takes
+    about log2(number of hosts) rounds. Every host checks the bundle it received against its
+    sha256 before serving it in turn.
+
+    :param ssh: the `class:wolphin.ssh.SSHPool` to reach the hosts with.
+    :param hosts: a dict of the addresses wolphin reaches the hosts at, to the (private) addresses
+     their peers reach them at, which must be allowed to connect to ``port``.
+    :returns: a `class:wolphin.deploy.DeployReport`.
+    """
+
+    started = clock()
+    staging = "/tmp/wolphin-distribute-{}".format(bundle.file_sha256)
+    deployments = dict()
+
+    def _done(host, bytes_sent=0, error=None, source=None, skipped=False):
+        deployments[host] = HostDeployment(host, skipped, bytes_sent, clock() - started, error,
+                                           source)
+
+    pending = []
+    up_to_date = ssh.map(lambda host: _is_up_to_date(ssh, host, remote_dir, bundle.sha256), hosts)
+    for host, result in sorted(up_to_date.iteritems()):
+        if isinstance(result, Exception):
+            _done(host, error=result)
+        elif result:
+            _done(host, skipped=True)
+        else:
+            pending.append(host)
+
+    holders = []
+    attempts = dict()
+    rounds = 0
+    try:
+        while pending:
+            rounds += 1
+            if not holders:
+                # one seed at a time, until one of them got the bundle from wolphin.
+                sources = {pending[0]: None}
+            else:
+                sources = dict(zip(pending, holders))
+            results = ssh.map(lambda host: _receive(ssh, bundle, host, hosts[host],
+                                                    hosts.get(sources[host]), staging, remote_dir,
+                                                    port),
+                              sources)
+            for host, result in results.iteritems():
+                attempts[host] = attempts.get(host, 0) + 1
+                if not isinstance(result, Exception):
+                    pending.remove(host)
+                    holders.append(host)
+                    _done(host, bytes_sent=bundle.size, source=sources[host])
+                elif attempts[host] >= DISTRIBUTION_ATTEMPTS:
+                    pending.remove(host)
+                    _done(host, error=result, source=sources[host])
+    finally:
+        # hosts that failed may have gotten as far as serving the bundle too.
+        ssh.map(lambda host: stop_serving(ssh, host, staging), attempts)
+
+    return DeployReport(bundle, deployments, clock() - started, rounds=rounds)
+
+
+def _receive(ssh, bundle, host, address, source, staging, remote_dir, port):
+    """
+    Has ``host`` receive the ``bundle`` into ``staging``, from its peer at the ``source`` address
+    or from wolphin if None, check it, extract it and serve it to its own peers at its ``address``.
+    """
+
+    staged = join(staging, "bundle.tar.gz")
+    if source is None:
+        _run_checked(ssh, host, "mkdir -p {}".format(pipes.quote(staging)))
+        sftp = ssh.open_sftp(host)
+        try:
+            sftp.put(bundle.path, staged)
+        finally:
+            sftp.close()
+        fetch = "true"
+    else:
+        fetch = ("mkdir -p {staging} && curl -sf --retry 3 -o {staged} http://{source}:{port}/"
+                 "bundle.tar.gz".format(staging=pipes.quote(staging),
+                                        staged=pipes.quote(staged),
+                                        source=source,
+                                        port=port))
+
+    _run_checked(ssh, host, " && ".join([fetch,
+                                         "echo {}  {} | sha256sum -c --quiet"
+                                         .format(bundle.file_sha256, pipes.quote(staged)),
+                                         _extract_command(staged, remote_dir, bundle.sha256),
+                                         serve_command(staging, port, address)]))
+
+
+def serve_command(staging, port, address):
+    """
+    The command serving the ``staging`` directory on ``port`` of the (private) ``address`` only,
+    in the background, the pid of the server being written next to it, see
+    `func:wolphin.deploy.stop_serving`; it fails if the server does not come up.
+    """
+
+    # the server is exec'ed by the shell writing its pid, so that the pid is the server's.
+    server = ("echo $$ > {pid_file}; if command -v python3 > /dev/null; "
+              "then exec python3 -m http.server {port} --bind {address}; "
+              "else exec python -c \"import BaseHTTPServer, SimpleHTTPServer; "
+              "BaseHTTPServer.HTTPServer(('{address}', {port}), "
+              "SimpleHTTPServer.SimpleHTTPRequestHandler).serve_forever()\"; fi"
+              .format(pid_file=pipes.quote(_pid_file(staging)), port=port, address=address))
+    url = "http://{}:{}/".format(address, port)
+    return ("(cd {staging} && nohup sh -c {server} > /dev/null 2>&1 < /dev/null &) && "
+            "for i in 1 2 3 4 5 6 7 8 9 10; do "
+            "curl -sf -o /dev/null {url} && break; sleep 0.5; done && "
+            "curl -sf -o /dev/null {url}"
+            .format(staging=pipes.quote(staging), server=pipes.quote(server), url=url))
+
+
+def stop_serving(ssh, host, staging):
+    """Stops the server of the ``staging`` directory of ``host``, then removes the directory"""
+
+    pid_file = pipes.quote(_pid_file(staging))
+    ssh.run(host, "test -f {pid_file} && kill $(cat {pid_file}); rm -rf {staging} {pid_file}"
+                  .format(pid_file=pid_file, staging=pipes.quote(staging)))
+
+
+def _pid_file(staging):
+    return staging.rstrip("/") + ".pid"
+
+
+def _is_up_to_date(ssh, host, remote_dir, sha256):
+    """Returns True if the content deployed to the ``remote_dir`` of ``host`` has the ``sha256``"""
+
+    marker = pipes.quote(join(remote_dir, MARKER_FILE))
+    return ssh.run(host, "cat {} 2>/dev/null".format(marker)).stdout.strip() == sha256
+
+
+def _extract_command(remote_bundle, remote_dir, sha256):
+    """The command extracting the ``remote_bundle`` into ``remote_dir`` and marking it deployed"""
+
+    return ("mkdir -p {directory} && tar -xzf {bundle} -C {directory} && "
+            "echo {sha256} > {marker}".format(directory=pipes.quote(remote_dir),
+                                              bundle=pipes.quote(remote_bundle),
+                                              sha256=sha256,
+                                              marker=pipes.quote(join(remote_dir, MARKER_FILE))))
+
+
+def _run_checked(ssh, host, command):
+    result = ssh.run(host, command)
+    if not result.succeeded:
+        raise SSHError("{}: {} failed: {}".format(host, command.split()[0], result.stderr.strip()))
+    return result
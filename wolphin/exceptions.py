@@ -31,6 +31,14 @@ class EC2InstanceLimitExceeded(WolphinException):
     pass
 
 
+class EC2RequestLimitExceeded(WolphinException):
+    """
+    Raised when ec2 keeps throttling requests even after retrying.
+    """
+
+    pass
+
+
 class InvalidWolphinConfiguration(WolphinException):
     """
     Raised when an invalid wolphin configuration is encountered.
@@ -45,3 +53,70 @@ class SSHTimeoutError(WolphinException):
     """
 
     pass
+
+
+class BootTimeoutError(WolphinException):
+    """
+    Raised when all of a project's instances did not finish provisioning themselves in time.
+    """
+
+    pass
+
+
+class ReadinessTimeoutError(WolphinException):
+    """
+    Raised when all of a project's instances did not signal that they are ready in time.
+    """
+
+    pass
+
+
+class SSHError(WolphinException):
+    """
+    Raised when a command could not be run on an instance over ssh.
+    """
+
+    pass
+
+
+class StepError(WolphinException):
+    """
+    Raised when provisioning steps are invalid, e.g. require an unknown step, or when a step fails
+    on an instance.
+    """
+
+    pass
+
+
+class ClockSkewError(WolphinException):
+    """
+    Raised when the clock of an instance is too far off for a command to be launched on all the
+    instances at the same time.
+    """
+
+    pass
+
+
+class DaemonError(WolphinException):
+    """
+    Raised when a wolphin daemon cannot be reached or fails to serve a request.
+    """
+
+    pass
+
+
+class OperationTimeout(WolphinException):
+    """
+    Raised when a non-blocking operation's instances did not transition in time, or its result was
+    not available within the time asked for.
+    """
+
+    pass
+
+
+class OperationCancelled(WolphinException):
+    """
+    Raised when the result of a cancelled non-blocking operation is asked for.
+    """
+
+    pass
@@ -0,0 +1,219 @@
+"""
+Latency histograms of the hosts of a load test, merged by wolphin into fleet-wide percentiles and
+time series.
+
+Values, e.g. latencies in microseconds, are counted in fixed log-linear buckets: exact up to 127,
+then 64 buckets per power of two, so that any value is known within 1/64th (1.6%) of it. A
+histogram therefore takes as much memory as the buckets it uses, at most ``BUCKET_COUNT``, however
+many values were recorded, and histograms are merged by adding their counts bucket by bucket.
+
+The hosts log one histogram per interval, as one line of text:
+
+    <interval start, seconds since the epoch> <bucket index>:<count> <bucket index>:<count> ....
+
+e.g. with `func:wolphin.histogram.Histogram.to_line`. Lines starting with '#' are ignored.
+"""
+
+import threading
+
+from gusset.colortable import ColorTable
+
+from wolphin.exceptions import WolphinException
+
+
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# values above this are counted as this.
+MAX_VALUE = (1 << 40) - 1
+
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+def bucket_index(value):
+    """Returns the index of the bucket counting ``value``"""
+
+    value = min(max(0, int(value)), MAX_VALUE)
+    if value < 2 * SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+
+def bucket_value(index):
+    """Returns the highest value counted by the bucket at ``index``"""
+
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+BUCKET_COUNT = bucket_index(MAX_VALUE) + 1
+
+
+class Histogram(object):
+    """The counts of values per bucket, only of the buckets that counted any"""
+
+    __slots__ = ('counts', 'count')
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or ())
+        self.count = sum(self.counts.itervalues())
+
+    def record(self, value, count=1):
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        """Adds the counts of the ``other`` histogram to this one; returns this one"""
+
+        counts = self.counts
+        for index, count in other.counts.iteritems():
+            counts[index] = counts.get(index, 0) + count
+        self.count += other.count
+        return self
+
+    @property
+    def max(self):
+        return bucket_value(max(self.counts)) if self.counts else None
+
+    def percentiles(self, percents=DEFAULT_PERCENTILES):
+        """
+        Returns a dict of each of the ``percents`` to the value below which that percentage of the
+        values fall, within the precision of the buckets, with one pass over the buckets.
+        """
+
+        if not self.count:
+            return dict((percent, None) for percent in percents)
+
+        ranks = sorted((max(1, int(round(percent / 100.0 * self.count))), percent)
+                       for percent in percents)
+        values = dict()
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            while ranks and ranks[0][0] <= seen:
+                values[ranks.pop(0)[1]] = bucket_value(index)
+            if not ranks:
+                break
+        return values
+
+    def percentile(self, percent):
+        return self.percentiles([percent])[percent]
+
+    def to_line(self, start):
+        """Returns the line logging this histogram as that of the interval starting at ``start``"""
+        return "{} {}".format(int(start), " ".join("{}:{}".format(index, count)
+                                                  for index, count
+                                                  in sorted(self.counts.iteritems())))
+
+    @classmethod
+    def from_line(cls, line):
+        """Returns the start of the interval logged by ``line`` and its histogram"""
+
+        fields = line.split()
+        return int(fields[0]), cls((int(index), int(count))
+                                   for index, count in (field.split(":") for field in fields[1:]))
+
+
+class FleetLatency(object):
+    """
+    The histograms of all the hosts of a fleet merged into one for the whole test and one per
+    ``interval`` seconds, for time series; hosts can be added concurrently. ``errors`` are those
+    of the hosts whose histograms could not be read, by host.
+    """
+
+    def __init__(self, interval=1):
+        if interval <= 0:
+            raise WolphinException("The interval of the latency time series should be a positive "
+                                   "number of seconds, not {}.".format(interval))
+        self.interval = interval
+        self.total = Histogram()
+        self.intervals = dict()
+        self.hosts = 0
+        self.errors = dict()
+        self.lock = threading.Lock()
+
+    def add(self, start, histogram):
+        """Merges the ``histogram`` of the interval starting at ``start`` of a host"""
+
+        start = int(start) - int(start) % self.interval
+        with self.lock:
+            self.total.merge(histogram)
+            self.intervals.setdefault(start, Histogram()).merge(histogram)
+
+    def add_log(self, lines):
+        """
+        Merges the histograms of every interval logged by a host, as ``lines``, once all of them
+        are read, so that a host whose log cannot be read entirely adds none.
+        """
+
+        host = FleetLatency(self.interval)
+        for line in lines:
+            if line.strip() and not line.startswith("#"):
+                host.add(*Histogram.from_line(line))
+        with self.lock:
+            self.total.merge(host.total)
+            for start, histogram in host.intervals.iteritems():
+                self.intervals.setdefault(start, Histogram()).merge(histogram)
+            self.hosts += 1
+
+    def time_series(self, percents=DEFAULT_PERCENTILES):
+        """Returns the start, count and percentiles of every interval, in order"""
+
+        return [(start, histogram.count, histogram.percentiles(percents))
+                for start, histogram in sorted(self.intervals.iteritems())]
+
+    def as_dict(self, percents=DEFAULT_PERCENTILES):
+        return dict(hosts=self.hosts,
+                    count=self.total.count,
+                    max=self.total.max,
+                    percentiles=self.total.percentiles(percents),
+                    time_series=[dict(start=start, count=count, percentiles=percentiles)
+                                 for start, count, percentiles in self.time_series(percents)])
+
+    def __str__(self):
+        columns = ['start', 'count'] + ["p{}".format(percent) for percent in DEFAULT_PERCENTILES]
+        table = ColorTable(*columns)
+        for start, count, percentiles in self.time_series():
+            row = dict(("p{}".format(percent), str(value)) for percent, value in
+                       percentiles.iteritems())
+            table.add(start=str(start), count=str(count), **row)
+        percentiles = self.total.percentiles()
+        summary = "{}\n{} hosts, {} values, {}, max {}".format(
+            table,
+            self.hosts,
+            self.total.count,
+            ", ".join("p{} {}".format(percent, percentiles[percent])
+                      for percent in DEFAULT_PERCENTILES),
+            self.total.max)
+        return "\n".join([summary] + ["[{}] error: {}".format(host, error)
+                                      for host, error in sorted(self.errors.iteritems())])
+
+
+def pull(ssh, hosts, remote_path, interval=1):
+    """
+    Reads the histograms logged to ``remote_path`` by all the ``hosts`` concurrently, merging those
+    of each host once read into a `class:wolphin.histogram.FleetLatency`, so that the memory used
+    grows with the number of buckets and intervals, not with the number of hosts or values;
+    returns it.
+    """
+
+    fleet = FleetLatency(interval)
+
+    def _pull(host):
+        sftp = ssh.open_sftp(host)
+        try:
+            remote_file = sftp.open(remote_path, "r")
+            try:
+                fleet.add_log(remote_file)
+            finally:
+                remote_file.close()
+        finally:
+            sftp.close()
+
+    fleet.errors = dict((host, result) for host, result in ssh.map(_pull, hosts).iteritems()
+                        if isinstance(result, Exception))
+    return fleet
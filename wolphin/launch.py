@@ -0,0 +1,190 @@
+"""
+Launching a command on the instances of a wolphin project at the same time, e.g. load generators.
+
+A launch has three phases, each run on all the hosts concurrently through the project's
+`class:wolphin.ssh.SSHPool`:
+
+ 1. the clock of every host is compared with the local one, keeping the sample with the shortest
+    round trip, and the launch is refused if a host is off by more than ``max_skew``: the hosts'
+    own timestamps, e.g. those of their latency histograms, would not line up either;
+ 2. every host is armed with the command and a start time, the shared start time translated to its
+    own clock, and waits for it in the background;
+ 3. once the start time is past, every host reports when the command actually started, by its
+    clock, from which its start jitter is measured.
+"""
+
+import pipes
+import time
+from collections import namedtuple
+
+from wolphin.exceptions import ClockSkewError, SSHError
+
+
+# the clock offset, in seconds, beyond which a host is not launched.
+MAX_SKEW = 0.5
+
+# the clock samples taken per host, the one with the shortest round trip being kept.
+SKEW_SAMPLES = 3
+
+# the least time, in seconds, between the arming of the hosts and the start.
+MIN_LEAD = 1.0
+
+# the time, in seconds, the hosts are given past the start before their start times are read.
+SETTLE = 0.5
+
+# what the hosts wait for the start with, busy looping through its last few milliseconds.
+_WAIT_UNTIL = ("import time\n"
+               "start = {start!r}\n"
+               "time.sleep(max(0, start - time.time() - 0.01))\n"
+               "while time.time() < start: pass\n"
+               "print('%.6f' % time.time())")
+
+# ``offset`` is the host's clock minus the local one, ``rtt`` the round trip it was measured in,
+# ``started`` when the command started by the host's clock and ``jitter`` how late it was.
+HostLaunch = namedtuple('HostLaunch', ['host', 'offset', 'rtt', 'started', 'jitter', 'error'])
+
+
+class LaunchReport(object):
+    """The outcome of a launch: the clock offset and start jitter of every host"""
+
+    def __init__(self, start, launches, log_path):
+        self.start = start
+        self.launches = launches
+        self.log_path = log_path
+
+    @property
+    def failed(self):
+        return dict((host, launch.error) for host, launch in self.launches.iteritems()
+                    if launch.error is not None)
+
+    @property
+    def jitters(self):
+        return sorted(launch.jitter for launch in self.launches.itervalues()
+                      if launch.error is None)
+
+    @property
+    def max_skew(self):
+        offsets = [abs(launch.offset) for launch in self.launches.itervalues()
+                   if launch.offset is not None]
+        return max(offsets) if offsets else None
+
+    def as_dict(self):
+        return dict(start=self.start,
+                    log_path=self.log_path,
+                    hosts=[dict(launch._asdict(),
+                                error=str(launch.error) if launch.error else None)
+                           for _, launch in sorted(self.launches.iteritems())])
+
+    def __str__(self):
+        lines = []
+        for host, launch in sorted(self.launches.iteritems()):
+            if launch.error is not None:
+                lines.append("[{}] error: {}".format(host, launch.error))
+                continue
+            lines.append("[{}] started {:+.1f}ms, clock offset {:+.1f}ms (rtt {:.1f}ms)"
+                         .format(host, launch.jitter * 1000, launch.offset * 1000,
+                                 launch.rtt * 1000))
+        jitters = self.jitters
+        lines.append("{} hosts started at {:.3f}, {} failed, jitter median {} max {}, "
+                     "max clock skew {}, output in {}"
+                     .format(len(jitters),
+                             self.start,
+                             len(self.failed),
+                             _milliseconds(jitters[len(jitters) // 2] if jitters else None),
+                             _milliseconds(jitters[-1] if jitters else None),
+                             _milliseconds(self.max_skew),
+                             self.log_path))
+        return "\n".join(lines)
+
+
+def launch(ssh, hosts, command, max_skew=MAX_SKEW, lead=None, clock=time.time,
+           sleep=time.sleep):
+    """
+    Runs ``command`` on all the ``hosts`` at the same time, through the
+    `class:wolphin.ssh.SSHPool` ``ssh``, in the background, with its output in the report's
+    ``log_path`` on every host; returns a `class:wolphin.launch.LaunchReport`.
+
+    :param max_skew: the largest offset, in seconds, of a host's clock from the local one; a
+     `class:wolphin.exceptions.ClockSkewError` is raised, before any host is armed, if exceeded.
+    :param lead: (optional) seconds from arming the hosts to the start, by default as long as
+     measuring their clocks took, for all of them to be armed in time, and at least ``MIN_LEAD``.
+    """
+
+    measuring = clock()
+    clocks = ssh.map(lambda host: _measure_clock(ssh, host, clock), hosts)
+    launches = dict((host, HostLaunch(host, None, None, None, None, result))
+                    for host, result in clocks.iteritems() if isinstance(result, Exception))
+    clocks = dict((host, result) for host, result in clocks.iteritems()
+                  if not isinstance(result, Exception))
+
+    skewed = sorted(host for host, (offset, _) in clocks.iteritems() if abs(offset) > max_skew)
+    if skewed:
+        raise ClockSkewError("The clocks of {} are off by more than {}s, e.g. {} by {:+.3f}s."
+                             .format(", ".join(skewed), max_skew, skewed[0],
+                                     clocks[skewed[0]][0]))
+
+    if lead is None:
+        lead = max(MIN_LEAD, clock() - measuring)
+    start = clock() + lead
+    name = "/tmp/wolphin-launch-{}".format(int(start * 1000))
+    started_path, log_path = name + ".started", name + ".log"
+
+    armed = ssh.map(lambda host: _arm(ssh, host, command, start + clocks[host][0], started_path,
+                                      log_path),
+                    list(clocks))
+    launches.update((host, HostLaunch(host, offset, rtt, None, None, armed[host]))
+                    for host, (offset, rtt) in clocks.iteritems()
+                    if isinstance(armed[host], Exception))
+
+    sleep(max(0, start + SETTLE - clock()))
+    started = ssh.map(lambda host: _started(ssh, host, started_path),
+                      [host for host in clocks if host not in launches])
+    for host, result in started.iteritems():
+        offset, rtt = clocks[host]
+        if isinstance(result, Exception):
+            launches[host] = HostLaunch(host, offset, rtt, None, None, result)
+        else:
+            launches[host] = HostLaunch(host, offset, rtt, result, result - (start + offset),
+                                        None)
+    return LaunchReport(start, launches, log_path)
+
+
+def _measure_clock(ssh, host, clock):
+    """Returns the offset of the clock of ``host`` from the local one, and its round trip"""
+
+    samples = []
+    for _ in range(SKEW_SAMPLES):
+        sent = clock()
+        result = ssh.run(host, "date +%s.%N")
+        received = clock()
+        if not result.succeeded:
+            raise SSHError("{}: could not read the clock: {}".format(host, result.stderr.strip()))
+        # the host read its clock half way through the round trip, give or take half of it.
+        samples.append((received - sent, float(result.stdout.strip()) - (sent + received) / 2))
+    rtt, offset = min(samples)
+    return offset, rtt
+
+
+def _arm(ssh, host, command, start, started_path, log_path):
+    """Has ``host`` run ``command`` at ``start``, by its clock, in the background"""
+
+    waiting = "$(command -v python3 || command -v python) -c {} > {} && ({})".format(
+        pipes.quote(_WAIT_UNTIL.format(start=round(start, 6))), pipes.quote(started_path),
+        command)
+    result = ssh.run(host, "nohup sh -c {} > {} 2>&1 < /dev/null &".format(pipes.quote(waiting),
+                                                                          pipes.quote(log_path)))
+    if not result.succeeded:
+        raise SSHError("{}: could not be armed: {}".format(host, result.stderr.strip()))
+
+
+def _started(ssh, host, started_path):
+    """Returns when the command started on ``host``, by its clock"""
+
+    result = ssh.run(host, "cat {}".format(pipes.quote(started_path)))
+    if not result.succeeded or not result.stdout.strip():
+        raise SSHError("{}: did not start in time".format(host))
+    return float(result.stdout.strip())
+
+
+def _milliseconds(seconds):
+    return "{:.1f}ms".format(seconds * 1000) if seconds is not None else "-"
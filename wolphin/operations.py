@@ -0,0 +1,222 @@
+"""
+Handles to non-blocking lifecycle operations, e.g. ``project.terminate(wait=False)``, and the
+single background monitor that tracks them all.
+"""
+
+import logging
+import threading
+from time import time
+
+from wolphin.exceptions import OperationCancelled, OperationTimeout
+
+
+class OperationHandle(object):
+    """
+    A lifecycle operation whose ec2 requests have been made and whose instances are transitioning,
+    e.g. from stopping to stopped. The `class:wolphin.operations.OperationMonitor` completes the
+    handle once all of them have transitioned, or fails it once its ``deadline`` has passed.
+
+    Cancelling a handle only stops tracking the operation, the requests made to ec2 stand.
+    """
+
+    def __init__(self, operation, instances, state_code, new_state_code, deadline, status,
+                 report=None):
+        """
+        :param operation: the name of the operation, e.g. 'terminate'.
+        :param instances: the instances acted on.
+        :param state_code: the state code the instances must leave.
+        :param new_state_code: the state code the instances must reach.
+        :param deadline: the time (as per `time.time`) by which they must have transitioned.
+        :param status: function returning the status of an instance as the operation's result.
+        :param report: (optional) the operation's `class:wolphin.timing.LifecycleReport`.
+        """
+
+        self.operation = operation
+        self.instances = list(instances)
+        self.state_code = state_code
+        self.new_state_code = new_state_code
+        self.deadline = deadline
+        self.status = status
+        self.report = report
+        self.remaining = len(self.instances)
+        self._result = None
+        self._exception = None
+        self._cancelled = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def __repr__(self):
+        return "<OperationHandle {} of {} instances, {} remaining>".format(self.operation,
+                                                                           len(self.instances),
+                                                                           self.remaining)
+
+    def done(self):
+        """Returns True if the operation completed, failed or was cancelled"""
+        return self._done.is_set()
+
+    def cancelled(self):
+        return self._cancelled
+
+    def result(self, timeout=None):
+        """
+        Waits up to ``timeout`` seconds, or for as long as it takes, for the operation to complete;
+        returns the statuses of its instances as the blocking operation would.
+        """
+
+        if not self._done.wait(timeout):
+            raise OperationTimeout("{} did not complete within {} secs."
+                                   .format(self.operation, timeout))
+        if self._cancelled:
+            raise OperationCancelled("{} was cancelled.".format(self.operation))
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        """Like ``result``, but returns the exception the operation failed with, if any"""
+
+        try:
+            self.result(timeout)
+        except OperationTimeout as error:
+            if not self.done():
+                raise
+            return error
+        return None
+
+    def add_done_callback(self, callback):
+        """
+        Calls ``callback(handle)`` once the operation is done, right away if it already is. The
+        callback is otherwise called by the monitor's thread.
+        """
+
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def cancel(self):
+        """Stops tracking the operation; returns False if it was already done, True otherwise"""
+        return self._finish(cancelled=True)
+
+    def _update(self, described, now):
+        """
+        Checks the ``described`` instances (a dict of id to instance) of the operation at ``now``;
+        returns True if the operation is now done.
+        """
+
+        if self.done():
+            return True
+
+        remaining = 0
+        for index, instance in enumerate(self.instances):
+            instance = described.get(instance.id, instance)
+            self.instances[index] = instance
+            if self.report is not None:
+                self.report.record(instance, instance.state)
+            if ((self.state_code is not None and instance.state_code == self.state_code) or
+                    (self.new_state_code is not None and
+                     instance.state_code != self.new_state_code)):
+                remaining += 1
+        self.remaining = remaining
+
+        if not remaining:
+            return self._finish(result=[self.status(instance) for instance in self.instances])
+        if now > self.deadline:
+            return self._finish(exception=OperationTimeout("{} instances of {} did not transition "
+                                                           "in time."
+                                                           .format(remaining, self.operation)))
+        return False
+
+    def _finish(self, result=None, exception=None, cancelled=False):
+        with self._lock:
+            if self.done():
+                return False
+            self._result, self._exception, self._cancelled = result, exception, cancelled
+            if self.report is not None:
+                self.report.finish()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+        return True
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logging.getLogger('wolphin.operations').exception("Callback of {} failed"
+                                                              .format(self))
+
+
+class OperationMonitor(object):
+    """
+    Tracks every outstanding `class:wolphin.operations.OperationHandle` of a project with a single
+    background thread, which describes all their instances with one call every ``interval``
+    seconds. The thread only runs while there are outstanding handles.
+    """
+
+    def __init__(self, describe, interval, clock=time):
+        """
+        :param describe: function describing a list of instance ids; returns the instances.
+        :param interval: seconds between describing the instances.
+        """
+
+        self.describe = describe
+        self.interval = interval
+        self.clock = clock
+        self.handles = []
+        self.condition = threading.Condition()
+        self.thread = None
+        self.logger = logging.getLogger('wolphin.operations')
+
+    def track(self, handle):
+        """Tracks ``handle`` until it is done; returns it"""
+
+        if not handle.instances:
+            handle._update(dict(), self.clock())
+            return handle
+        with self.condition:
+            self.handles.append(handle)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._monitor, name="wolphin-operations")
+                self.thread.daemon = True
+                self.thread.start()
+            self.condition.notify()
+        return handle
+
+    @property
+    def outstanding(self):
+        with self.condition:
+            return [handle for handle in self.handles if not handle.done()]
+
+    def _monitor(self):
+        while True:
+            with self.condition:
+                self.handles = [handle for handle in self.handles if not handle.done()]
+                if not self.handles:
+                    self.thread = None
+                    return
+                handles = list(self.handles)
+
+            self._tick(handles)
+
+            with self.condition:
+                self.condition.wait(self.interval)
+
+    def _tick(self, handles):
+        instance_ids = sorted(set(instance.id
+                                  for handle in handles
+                                  for instance in handle.instances))
+        try:
+            described = dict((instance.id, instance) for instance in self.describe(instance_ids))
+        except Exception:
+            # transient, the handles fail once their deadline passes if this persists.
+            self.logger.warning("Failed to describe the instances of {} operations"
+                                .format(len(handles)), exc_info=True)
+            described = dict()
+
+        now = self.clock()
+        for handle in handles:
+            handle._update(described, now)
@@ -0,0 +1,72 @@
+"""Progress of the instances a wolphin project waits for, e.g. to be running or ssh-ready"""
+
+from gusset.colortable import ColorTable
+
+
+class Progress(object):
+    """
+    Aggregated progress of a fleet towards a ``phase`` (e.g. 'running' or 'ssh_ready'): the number
+    of instances per state and the names of the first stragglers, the instances not there yet. It
+    costs the same to keep and to print regardless of the size of the fleet.
+    """
+
+    # the stragglers named, the others are only counted.
+    NAMED_STRAGGLERS = 5
+
+    __slots__ = ('phase', 'total', 'counts', 'stragglers', 'straggler_count')
+
+    def __init__(self, phase):
+        self.phase = phase
+        self.total = 0
+        self.counts = dict()
+        self.stragglers = []
+        self.straggler_count = 0
+
+    def add(self, state, straggler=None):
+        """Counts an instance in ``state``; ``straggler`` is its name if it is not there yet"""
+
+        self.total += 1
+        self.counts[state] = self.counts.get(state, 0) + 1
+        if straggler is not None:
+            self.straggler_count += 1
+            if len(self.stragglers) < self.NAMED_STRAGGLERS:
+                self.stragglers.append(straggler)
+
+    @property
+    def done(self):
+        return self.total - self.straggler_count
+
+    def __str__(self):
+        progress = "{}: {}/{} ({})".format(self.phase,
+                                           self.done,
+                                           self.total,
+                                           ", ".join("{} {}".format(state, count)
+                                                     for state, count
+                                                     in sorted(self.counts.iteritems())))
+        if not self.stragglers:
+            return progress
+
+        more = self.straggler_count - len(self.stragglers)
+        return "{}, waiting for {}{}".format(progress,
+                                             ", ".join(str(name) for name in self.stragglers),
+                                             " and {} more".format(more) if more else "")
+
+
+class StatusTable(object):
+    """
+    The rows of a status table, only rendered as a `class:gusset.colortable.ColorTable` when it is
+    printed, e.g. by a log record that is actually emitted.
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+        self.rows = []
+
+    def add(self, **row):
+        self.rows.append(row)
+
+    def __str__(self):
+        color_table = ColorTable(*self.columns)
+        for row in self.rows:
+            color_table.add(**row)
+        return str(color_table)
@@ -1,19 +1,79 @@
 import logging
-from time import sleep
+import pipes
+import socket
+import threading
+from functools import wraps
+from time import sleep, time
 
 from boto.exception import EC2ResponseError
 from boto.ec2 import connect_to_region
-from fabric.api import hide, run, settings
-from gusset.colortable import ColorTable
 
 from wolphin.attribute_dict import AttributeDict
-from wolphin.exceptions import EC2InstanceLimitExceeded, SSHTimeoutError, WolphinException
+from wolphin.connection import InterceptedConnection
+from wolphin.exceptions import (BootTimeoutError, EC2InstanceLimitExceeded, EC2RequestLimitExceeded,
+                                ReadinessTimeoutError, SSHTimeoutError, WolphinException)
+from wolphin.operations import OperationHandle, OperationMonitor
+from wolphin.progress import Progress, StatusTable
 from wolphin.selector import DefaultSelector
+from wolphin.status import (CACHED_STATUS_FIELDS, STATUS_FIELDS, STATUS_GETTERS, instance_status,
+                            print_status, snapshot_status, status_record_type)
+from wolphin.stragglers import StragglerDetector
+from wolphin.throttle import RateLimiter, is_throttling_error
+from wolphin.timing import LifecycleReport
+
+# print_status is imported from here by scripts, e.g. the example; the features only some commands
+# use, e.g. deploy or calibrate, are imported by the methods using them so that the other commands
+# do not pay for importing them.
+
+
+def _traced(func):
+    """
+    Decorates an operation of a `class:wolphin.project.WolphinProject` so that the ec2 calls made
+    during it are attributed to it by the project's tracer, if any.
+    """
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.tracer is None:
+            return func(self, *args, **kwargs)
+        with self.tracer.operation(func.__name__):
+            return func(self, *args, **kwargs)
+    return wrapper
+
+
+def _lifecycle_operation(func):
+    """
+    Decorates a lifecycle operation of a `class:wolphin.project.WolphinProject` so that it records
+    a `class:wolphin.timing.LifecycleReport`, made available as the project's ``last_report``.
+    Operations invoked by another operation (e.g. ``stop`` during ``reboot``) record to the report
+    of the outermost one, which closes the readiness channel once done. The operation is traced as
+    well.
+    """
+
+    @_traced
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._report is not None:
+            return func(self, *args, **kwargs)
+
+        self._report = LifecycleReport(func.__name__)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._report.finish()
+            self.last_report, self._report = self._report, None
+            self._close_readiness()
+    return wrapper
 
 
 class WolphinProject(object):
 
-    def __init__(self, config, conn):
+    SSH_PORT = 22
+    # the number of instances listed per describe call, at most 1000 as per ec2.
+    PAGE_SIZE = 1000
+    TCP_CONNECT_TIMEOUT = 2
+
+    def __init__(self, config, conn=None, tracer=None, rate_limiter=None):
         self.STATES = {
             'pending': 0,
             'running': 16,
@@ -23,34 +83,211 @@ class WolphinProject(object):
             'terminated': 48
         }
         self.config = config
-        self.conn = conn
-        self.logger = logging.getLogger('wolphin.{}'.format(config.project))
+        self.tracer = tracer
+        self.rate_limiter = rate_limiter
+        self._conn = self._intercept(conn) if conn is not None else None
+        self._ssh = None
+        self._monitor = None
+        self._readiness = None
+        # the project of which this one is a role group, see `func:role`.
+        self._parent = None
+        self._roles = dict()
+        self.snapshot = None
+        if config.snapshot_dir:
+            from wolphin.snapshot import InventorySnapshot
+            self.snapshot = InventorySnapshot.for_project(config)
+        self.user_data = None
+        if config.user_data_file:
+            from wolphin.user_data import load_user_data
+            self.user_data = load_user_data(config)
+        self._reconciled = False
+        self.logger = logging.getLogger(".".join(['wolphin', config.project] +
+                                                 ([config.role] if config.role else [])))
+        self.last_report = None
+        self._report = None
+        # an optional callable given the `class:wolphin.progress.Progress` of every round of
+        # waiting for instances, e.g. to be running.
+        self.progress_sink = None
 
     @classmethod
-    def new(cls, config):
+    def new(cls, config, tracer=None, connect=True):
         """
         Factory method to create a new instance of WolphinProject.
 
         :param config: `class:wolphin.config.Configuration` object to configure the project with.
+        :param tracer: (optional) a `class:wolphin.tracing.Tracer` to record the ec2 calls made by
+         the project with. No tracing is done, at no cost, if not provided.
+        :param connect: (optional) defaults to True, set to False to connect to ec2 only when the
+         project first needs to.
         :returns: `class:wolphin.project.WolphinProject`.
+
+        All the ec2 calls made by the project are rate limited as per ``config``.
         """
 
         config.validate()
-        conn = connect_to_region(config.region,
-                                 aws_access_key_id=config.aws_access_key_id,
-                                 aws_secret_access_key=config.aws_secret_key)
-        project = cls(config, conn)
+        project = cls(config, tracer=tracer, rate_limiter=RateLimiter.from_config(config))
+        if connect:
+            project.connect()
 
         return project
 
+    @property
+    def conn(self):
+        """The project's ec2 connection, connected on first use"""
+        return self.connect()
+
+    def connect(self):
+        """Connects to ec2 in the configured region if not yet connected; returns the connection"""
+
+        if self._conn is None and self._parent is not None:
+            self._conn = self._parent.connect()
+        elif self._conn is None:
+            self._conn = self._intercept(connect_to_region(self.config.region,
+                                                           aws_access_key_id=
+                                                           self.config.aws_access_key_id,
+                                                           aws_secret_access_key=
+                                                           self.config.aws_secret_key))
+        return self._conn
+
+    @property
+    def ssh(self):
+        """The project's `class:wolphin.ssh.SSHPool` of connections to its instances"""
+
+        if self._parent is not None:
+            return self._parent.ssh
+        if self._ssh is None:
+            # paramiko is slow to import, only import it once ssh is needed.
+            from wolphin.ssh import SSHPool
+            self._ssh = SSHPool.from_config(self.config)
+        return self._ssh
+
+    @property
+    def monitor(self):
+        """The `class:wolphin.operations.OperationMonitor` of the project's operations"""
+
+        if self._monitor is None:
+            self._monitor = OperationMonitor(self._describe_instances,
+                                             interval=self.config.max_wait_duration)
+        return self._monitor
+
+    @property
+    def readiness(self):
+        """
+        The channel the project's instances signal that they are ready through, see
+        `mod:wolphin.readiness`; None if they are polled over ssh instead.
+        """
+
+        if self._parent is not None:
+            return self._parent.readiness
+        if self._readiness is None and self.config.readiness not in (None, 'ssh'):
+            from wolphin.readiness import readiness_channel
+            self._readiness = readiness_channel(self)
+        return self._readiness
+
+    def _close_readiness(self):
+        """
+        Closes the project's readiness channel, if any, unless an operation of the project is still
+        going on, e.g. one of its role groups finished but not the project's operation itself.
+        """
+
+        project = self._parent if self._parent is not None else self
+        if project._report is None and project._readiness is not None:
+            project._readiness.close()
+            project._readiness = None
+
+    def role(self, name):
+        """
+        Returns the project of the ``name`` role group of this project, e.g. its load generators,
+        as configured by ``config.roles``: its lifecycle and other operations only act on the
+        instances of that role, which are reserved as the role is configured, tagged with
+        ``WolphinRole`` and named ``wolphin.<project>.<role>.<number>``. It shares its ec2 and ssh
+        connections with this project.
+        """
+
+        if name not in self._roles:
+            project = WolphinProject(self.config.for_role(name), tracer=self.tracer,
+                                     rate_limiter=self.rate_limiter)
+            project._parent = self
+            project.progress_sink = self.progress_sink
+            self._roles[name] = project
+        return self._roles[name]
+
+    @property
+    def roles(self):
+        """The names of the project's role groups, empty if it has none"""
+        return sorted(self.config.roles or [])
+
+    def _for_each_role(self, operation, **kwargs):
+        """
+        Runs the ``operation`` of every role group of the project, all of them concurrently, with
+        the ``kwargs``; the instances of the roles are recorded in the ongoing operation's report.
+        """
+
+        errors = []
+        # the roles share the project's readiness channel, made before they use it concurrently.
+        self.readiness
+
+        def _run(project):
+            try:
+                getattr(project, operation)(**kwargs)
+            except Exception as error:
+                errors.append(error)
+
+        projects = [self.role(name) for name in self.roles]
+        threads = [threading.Thread(target=_run, args=(project,),
+                                    name="wolphin-{}-{}".format(operation, project.config.role))
+                   for project in projects]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self._report is not None:
+            for project in projects:
+                if project.last_report is not None:
+                    self._report.timings.update(project.last_report.timings)
+        if errors:
+            raise errors[0]
+
+    def _project_for(self, instance):
+        """Returns the project of the role group of ``instance``, this one if it has none"""
+
+        role = instance.tags.get("WolphinRole")
+        if self.config.role is None and role in (self.config.roles or dict()):
+            return self.role(role)
+        return self
+
+    def _intercept(self, conn):
+        """Routes the calls made through ``conn`` through the project's tracer and rate limiter"""
+
+        # the tracer is innermost so that it sees every attempt of the calls retried by the rate
+        # limiter.
+        if self.tracer is not None:
+            conn = InterceptedConnection(conn, self.tracer)
+        if self.rate_limiter is not None:
+            conn = InterceptedConnection(conn, self.rate_limiter)
+        return conn
+
+    @_lifecycle_operation
     def create(self, wait_for_ssh=True):
         """
         Creates a new wolphin project and the requested number of ec2 instances for the project.
+        The timing of the operation is then available as ``self.last_report``.
 
         :param wait_for_ssh: (optional) defaults to True, set to False if wolphin should not wait
-         for the project's ec2 instances to be ssh-ready.
+         for the project's ec2 instances to be ready, nor for them to publish the configured
+         ``boot_marker``.
+
+        A project with role groups creates all of them concurrently, each as configured, see
+        `func:role`.
         """
 
+        if self.roles:
+            self.logger.info("Creating the role groups {} ....".format(", ".join(self.roles)))
+            self._for_each_role('create', wait_for_ssh=wait_for_ssh)
+            self.logger.info("Finished creating.")
+            return self.status()
+
         self.logger.info("Finding any existing reusable hosts .... ")
 
         # now wait for the shutting-down and stopping instances to finish shutting down / stopping.
@@ -59,14 +296,20 @@ class WolphinProject(object):
 
         healthy = self._get_healthy_instances()
 
-        self._satisfy_config_requirements(healthy)
+        started = self._satisfy_config_requirements(healthy)
 
-        # wait for all the healthy ones to be running.
-        self.logger.info("Waiting for all instances to start ....")
-        self._wait_for_transition(healthy, new_state_code=self.STATES['running'])
+        if wait_for_ssh and self.config.straggler_factor:
+            self.logger.info("Waiting for all instances to be ready, replacing stragglers ....")
+            healthy = self._wait_for_ready_replacing_stragglers(healthy, started)
+        else:
+            # wait for all the healthy ones to be running.
+            self.logger.info("Waiting for all instances to start ....")
+            self._wait_for_transition(healthy, new_state_code=self.STATES['running'])
+            if wait_for_ssh:
+                self._wait_for_ready(healthy, started)
 
-        if wait_for_ssh:
-            self._wait_for_ssh(healthy)
+        if wait_for_ssh and self.config.boot_marker:
+            self._wait_for_boot(healthy)
 
         self.logger.info("{} ec2 instances ready for project"
                          .format(len(self.get_instances_in_states([self.STATES['running']]))))
@@ -74,6 +317,11 @@ class WolphinProject(object):
         return self.status()
 
     def _satisfy_config_requirements(self, healthy):
+        """Reserves or terminates instances as needed; returns the instances it started"""
+
+        # the readiness channel must be there before the instances boot and signal through it.
+        readiness = self.readiness
+
         # terminate some existing ones if they are extra.
         already_present = len(healthy)
         max_number_needed = self.config.max_instance_count - already_present
@@ -93,10 +341,14 @@ class WolphinProject(object):
             healthy.extend(new_instances)
 
         # start non running instances.
-        for instance in healthy:
-            if instance.state != 'running':
-                instance.start()
-
+        started = [instance for instance in healthy if instance.state != 'running']
+        if readiness is not None:
+            readiness.reset(started)
+        # the instances already running are not timed, they would skew the fleet's percentiles.
+        for instance in started:
+            self._record(instance, 'requested')
+            instance.start()
+        return started
 
     def _create_extra_instances(self, min_number_needed, max_number_needed):
 
@@ -107,11 +359,12 @@ class WolphinProject(object):
         self.logger.debug("Requesting between {} and {} EC2 instances ...."
                           .format(min_number_needed, max_number_needed))
 
-        reservation = self._reserve(min_number_needed, max_number_needed)
+        reservation = self._reserve(min_number_needed, max_number_needed,
+                                    first_instance_number=instance_allocation_number + 1)
         provided = len(reservation.instances)
         self.logger.debug("{} instances provided by Amazon".format(provided))
 
-        instances = reservation.instances or []
+        instances = _in_launch_order(reservation.instances or [])
         # Tagging instances with the project name.
         for tag_number, instance in enumerate(instances,
                                               start=instance_allocation_number + 1):
@@ -121,16 +374,25 @@ class WolphinProject(object):
     def _max_allocated_number(self):
         """Returns the maximum instance number allocated to this project's ec2 instances"""
         instances = self._get_all_instances()
-        return (max(0, *[self._get_instance_number(instance) for instance in instances])
-                if instances else 0)
-
-    def start(self, selector=None, wait_for_ssh=True):
+        max_number = (max(0, *[self._get_instance_number(instance) for instance in instances])
+                      if instances else 0)
+        if self.snapshot is not None:
+            # the snapshot also knows the numbers of the terminated instances no longer listed.
+            max_number = max(max_number, self.snapshot.max_number())
+        return max_number
+
+    @_lifecycle_operation
+    def start(self, selector=None, wait_for_ssh=True, wait=True):
         """
         Start the appropriate ec2 instance(s) based on ``self.config``.
+        The timing of the operation is then available as ``self.last_report``.
 
         :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
         :param wait_for_ssh: (optional) defaults to True, set to False if wolphin should not wait
-         for the project's ec2 instances to be ssh-ready.
+         for the project's ec2 instances to be ready.
+        :param wait: (optional) defaults to True, set to False to return an
+         `class:wolphin.operations.OperationHandle` once the instances are requested to start,
+         instead of waiting for them to be running. The handle does not wait for ssh.
         """
 
         # wait for the stopping instances to finish stopping as they cannot be started if
@@ -145,21 +407,42 @@ class WolphinProject(object):
                                                   self.STATES['running']],
                                                  inverse_select=True,
                                                  selector=selector)
+        if self.readiness is not None:
+            self.readiness.reset(instances)
         for instance in instances:
+            self._record(instance, 'requested')
             instance.start()
 
-        self._wait_for_starting_instances(instances=instances)
+        if not wait:
+            return self._track('start', instances,
+                               state_code=self.STATES['pending'],
+                               new_state_code=self.STATES['running'])
 
-        if wait_for_ssh:
-            instances = self.get_instances_in_states([self.STATES['running']],
-                                                     selector=selector)
-            self._wait_for_ssh(instances)
+        if wait_for_ssh and self.config.straggler_factor:
+            self._wait_for_ready_replacing_stragglers(
+                self.get_instances_in_states([self.STATES['running'], self.STATES['pending']],
+                                             selector=selector),
+                started=instances)
+        else:
+            self._wait_for_starting_instances(instances=instances)
+            if wait_for_ssh:
+                self._wait_for_ready(self.get_instances_in_states([self.STATES['running']],
+                                                                  selector=selector),
+                                     started=instances)
 
         self.logger.info("Finished starting.")
         return self.status(selector)
 
-    def stop(self, selector=None):
-        """Stop the appropriate ec2 instance(s)"""
+    @_lifecycle_operation
+    def stop(self, selector=None, wait=True):
+        """
+        Stop the appropriate ec2 instance(s)
+
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param wait: (optional) defaults to True, set to False to return an
+         `class:wolphin.operations.OperationHandle` once the instances are requested to stop,
+         instead of waiting for them to be stopped.
+        """
 
         # wait for the starting instances to finish starting as they cannot be stopped if
         # they are in the middle of starting.
@@ -174,20 +457,31 @@ class WolphinProject(object):
                                                  inverse_select=True,
                                                  selector=selector)
         for instance in instances:
+            self._record(instance, 'requested')
             instance.stop()
 
+        if not wait:
+            return self._track('stop', instances,
+                               state_code=self.STATES['stopping'],
+                               new_state_code=self.STATES['stopped'])
+
         self._wait_for_stopping_instances(instances=instances)
         self.logger.info("Finished stopping.")
         return self.status(selector)
 
+    @_lifecycle_operation
     def reboot(self, selector=None):
         self.stop(selector)
         self.start(selector)
         self.logger.info("Finished rebooting.")
         return self.status(selector)
 
+    @_lifecycle_operation
     def revert(self, sequential=False, selector=None):
-        """Revert project instances"""
+        """
+        Revert project instances.
+        The timing of the operation is then available as ``self.last_report``.
+        """
 
         instances = self._get_healthy_instances(selector)
         self.logger.info("Starting reverting {} instances ....".format(len(instances)))
@@ -214,67 +508,374 @@ class WolphinProject(object):
          - tag each new instance with a previous instance number
         """
 
-        instance_numbers = [self._get_instance_number(instance) for instance in instances]
+        # the instances of a role group are replaced as the role is configured.
+        numbers_per_project = dict()
+        for instance in instances:
+            numbers_per_project.setdefault(self._project_for(instance), []).append(
+                self._get_instance_number(instance))
         self.terminate(instances=instances)
         self.logger.debug("Getting a new reservation ....")
-        if instance_numbers:
-            new_instances = self._reserve(len(instance_numbers), len(instance_numbers)).instances
+        if numbers_per_project:
+            from wolphin.user_data import contiguous_runs
+            new_instances = []
+            for project, instance_numbers in sorted(numbers_per_project.iteritems(),
+                                                    key=lambda (project, _):
+                                                    project.config.role):
+                # user data numbers the instances of a reservation consecutively, see
+                # `mod:wolphin.user_data`.
+                for numbers in (contiguous_runs(instance_numbers)
+                                if project.user_data is not None
+                                else [instance_numbers]):
+                    reservation = project._reserve(len(numbers), len(numbers),
+                                                   first_instance_number=numbers[0])
+                    for instance, instance_number in zip(
+                            _in_launch_order(reservation.instances), numbers):
+                        project._tag_instance(instance, instance_number)
+                        new_instances.append(instance)
             self.logger.debug("{} instances received from Amazon.".format(len(new_instances)))
 
-            for instance, instance_number in zip(new_instances, instance_numbers):
-                self._tag_instance(instance, instance_number)
-
             self._wait_for_starting_instances(instances=new_instances)
 
-    def status(self, selector=None):
-        """Returns the statuses of requested wolphin project instances"""
-
-        as_attribute_dict = (lambda instance:
-                             AttributeDict(id=instance.id,
-                                           project_name=instance.tags.get("ProjectName"),
-                                           name=instance.tags.get("Name"),
-                                           state_code=instance.state_code,
-                                           state=instance.state,
-                                           public_dns_name=instance.public_dns_name,
-                                           public_ip_address=instance.ip_address,
-                                           private_dns_name=instance.private_dns_name,
-                                           private_ip_address=instance.private_ip_address,
-                                           ami_id=instance.image_id,
-                                           instance_type=instance.instance_type,
-                                           placement=instance.placement,  # availability zone
-                                           ssh_key_name=instance.key_name,
-                                           security_groups=instance.groups,
-                                           launch_time=instance.launch_time,
-                                           owner_email=instance.tags.get("OwnerEmail")))
-
-        return [as_attribute_dict(instance)
+    @_traced
+    def status(self, selector=None, cached=False, fields=None):
+        """
+        Returns the statuses of requested wolphin project instances
+
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param cached: (optional) defaults to False, set to True to return the last known statuses
+         of the instances from the project's snapshot (see ``config.snapshot_dir``) immediately,
+         without asking ec2. Each of them then tells when the instance was ``last_seen`` and
+         whether that is ``stale``.
+        :param fields: (optional) the `STATUS_FIELDS` wanted, e.g. ``['public_ip_address']``;
+         statuses are then compact records of these fields only (see `iter_status`) instead of
+         dicts of all of them.
+        """
+
+        if cached:
+            statuses = self._cached_status(selector)
+            if fields is None:
+                return statuses
+            record_type = status_record_type(fields, known=CACHED_STATUS_FIELDS)
+            return [record_type(*[status[field] for field in record_type._fields])
+                    for status in statuses]
+        if fields is not None:
+            return list(self.iter_status(selector, fields))
+        return [instance_status(instance)
                 for instance in self._select_instances(selector=selector)]
 
-    def terminate(self, instances=None, selector=None):
+    def iter_status(self, selector=None, fields=STATUS_FIELDS):
+        """
+        Yields the statuses of requested wolphin project instances as compact, immutable records of
+        the ``fields`` only (see `status_record_type`), e.g. ``status.public_ip_address``, as the
+        instances are listed.
+        """
+
+        record_type = status_record_type(fields)
+        getters = [STATUS_GETTERS[field] for field in record_type._fields]
+        for instance in self.iter_instances(selector=selector):
+            yield record_type(*[getter(instance) for getter in getters])
+
+    def _cached_status(self, selector=None):
+        if self.snapshot is None:
+            raise WolphinException("No snapshot of project {} is kept, set snapshot_dir to keep "
+                                   "one.".format(self.config.project))
+
+        selector = selector or DefaultSelector()
+        records = [AttributeDict(record=record, tags=self._tags(record.number, record.role))
+                   for record in sorted(self.snapshot.records.itervalues(),
+                                        key=lambda record: (record.role, record.number))]
+        return [snapshot_status(selected.record,
+                                 selected.tags,
+                                 self.STATES[selected.record.state],
+                                 self.snapshot.is_stale(selected.record))
+                for selected in selector.select(records)]
+
+    @_lifecycle_operation
+    def terminate(self, instances=None, selector=None, wait=True):
         """
         Terminate instances
 
         :param instances: a list of instances to terminate.
         :param force: if True, terminates all instances irrespective of any selectors applied.
+        :param wait: (optional) defaults to True, set to False to return an
+         `class:wolphin.operations.OperationHandle` once the instances are requested to
+         terminate, instead of waiting for them to be terminated.
 
         """
         instances_to_terminate = instances or self._get_healthy_instances(selector)
         for instance in instances_to_terminate:
+            if instance.state not in ('shutting-down', 'terminated'):
+                self._record(instance, 'requested')
             instance.terminate()
 
+        if not wait:
+            return self._track('terminate', instances_to_terminate,
+                               state_code=self.STATES['shutting-down'],
+                               new_state_code=self.STATES['terminated'])
+
         self._wait_for_shutting_down_instances(instances_to_terminate)
         self.logger.info("Finished terminating.")
         return self.status(selector)
 
+    @_traced
+    def deploy(self, local_paths, remote_dir, selector=None, peer_to_peer=False):
+        """
+        Deploys the ``local_paths`` (files or directories) to the ``remote_dir`` of the project's
+        running instances: they are compressed once, uploaded to all the instances concurrently
+        and extracted there. Instances whose ``remote_dir`` already has the same content are
+        skipped.
+
+        :param local_paths: the files and directories to deploy, each one under its base name.
+        :param remote_dir: the directory to deploy them to, created if need be.
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param peer_to_peer: (optional) defaults to False, set to True to upload the files to a
+         single instance only and have the instances pass them on to each other over their private
+         ip addresses, see `func:wolphin.deploy.distribute`, e.g. for large files and fleets.
+        :returns: a `class:wolphin.deploy.DeployReport` of the bytes sent and time taken per host.
+        """
+
+        from wolphin.deploy import Bundle, distribute, push
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        with Bundle(local_paths) as bundle:
+            self.logger.info("Deploying {} bytes to {} instances ....".format(bundle.size,
+                                                                             len(running)))
+            if peer_to_peer:
+                return distribute(self.ssh, bundle,
+                                  dict((instance.ip_address, instance.private_ip_address)
+                                       for instance in running),
+                                  remote_dir)
+            return push(self.ssh, bundle, [instance.ip_address for instance in running],
+                        remote_dir)
+
+    @_traced
+    def provision(self, steps, selector=None):
+        """
+        Provisions the project's running instances with the ``steps``, concurrently: only the
+        steps that changed since they last succeeded on an instance, or that require such a step,
+        are run; see `mod:wolphin.steps`.
+
+        :param steps: the `class:wolphin.steps.Step` to run, in order unless they require others.
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :returns: a `class:wolphin.steps.ProvisionReport` of the outcome of every step per host.
+        """
+
+        from wolphin.steps import provision
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return provision(self.ssh, [instance.ip_address for instance in running], steps)
+
+    @_traced
+    def collect(self, remote_glob, local_dir, selector=None):
+        """
+        Collects the files matching ``remote_glob`` from the project's running instances, e.g. the
+        results of a load test: every instance compresses them, and they are downloaded from all
+        the instances concurrently, each into its own ``local_dir/<ip address>`` subdirectory as
+        soon as it is ready. A collection that was interrupted resumes where it left off.
+
+        :param remote_glob: the files to collect, e.g. '/opt/test/results/*.csv'.
+        :param local_dir: the directory to collect them in, created if need be.
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :returns: a `class:wolphin.collect.CollectReport` of the bytes received and time taken per
+         host.
+        """
+
+        from wolphin.collect import collect
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return collect(self.ssh, [instance.ip_address for instance in running], remote_glob,
+                       local_dir)
+
+    @_traced
+    def latency(self, remote_path, selector=None, interval=1):
+        """
+        Merges the latency histograms logged to ``remote_path`` by the project's running
+        instances, e.g. load generators, into fleet-wide percentiles and a time series of them per
+        ``interval`` seconds; see `mod:wolphin.histogram` for the format of the logs. The logs of
+        the instances are read concurrently and merged once read.
+
+        :returns: a `class:wolphin.histogram.FleetLatency`.
+        """
+
+        from wolphin.histogram import pull
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return pull(self.ssh, [instance.ip_address for instance in running], remote_path,
+                    interval=interval)
+
+    def tail(self, remote_path, selector=None, lines=10):
+        """
+        Follows ``remote_path``, e.g. a log, on all of the project's running instances at once;
+        yields ``(ip address, line)`` as the lines arrive, until closed.
+        """
+
+        from wolphin.collect import tail
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return tail(self.ssh, [instance.ip_address for instance in running], remote_path,
+                    lines=lines)
+
+    @_traced
+    def launch(self, command, selector=None, max_skew=None, lead=None):
+        """
+        Runs ``command`` on all of the project's running instances at the same time, e.g. to start
+        generating load: it is staged on all the instances concurrently, once their clocks are
+        checked, and released on each of them at a shared start time; see `mod:wolphin.launch`.
+
+        :param command: the shell command to run, in the background.
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param max_skew: (optional) the largest offset, in seconds, of an instance's clock from the
+         local one, beyond which a `class:wolphin.exceptions.ClockSkewError` is raised; defaults to
+         `data:wolphin.launch.MAX_SKEW`.
+        :param lead: (optional) seconds from staging the command to starting it.
+        :returns: a `class:wolphin.launch.LaunchReport` of the start jitter and clock offset per
+         host.
+        """
+
+        from wolphin.launch import MAX_SKEW, launch
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return launch(self.ssh, [instance.ip_address for instance in running], command,
+                      max_skew=MAX_SKEW if max_skew is None else max_skew, lead=lead)
+
+    @_traced
+    def calibrate(self, selector=None, replace_outliers=False, threshold=None):
+        """
+        Runs the same short cpu, memory and network benchmarks on all of the project's running
+        instances concurrently, and stores their scores as tags of the instances, e.g. to tell the
+        instances much slower than the others before a test; see `mod:wolphin.calibrate`.
+
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param replace_outliers: (optional) defaults to False, set to True to revert the instances
+         that are outliers, replacing them with new ones.
+        :param threshold: (optional) the median absolute deviations below the median a score is an
+         outlier beyond; defaults to `data:wolphin.calibrate.OUTLIER_THRESHOLD`.
+        :returns: a `class:wolphin.calibrate.CalibrationReport` of the scores per host.
+        """
+
+        from wolphin.calibrate import OUTLIER_THRESHOLD, calibrate
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        by_address = dict((instance.ip_address, instance) for instance in running)
+        report = calibrate(self.ssh,
+                           dict((instance.ip_address, instance.private_ip_address)
+                                for instance in running),
+                           threshold=OUTLIER_THRESHOLD if threshold is None else threshold)
+        for address, instance in by_address.iteritems():
+            tags = report.tags(address)
+            if tags:
+                self.conn.create_tags(instance.id, tags)
+
+        if replace_outliers and report.outliers:
+            outliers = [by_address[address] for address in sorted(report.outliers)]
+            self.logger.info("Replacing {} outliers ....".format(len(outliers)))
+            self._revert(outliers)
+            report.replaced = [_name(instance) for instance in outliers]
+        return report
+
+    @_traced
+    def telemetry(self, selector=None, capacity=None, thresholds=None, on_saturated=None):
+        """
+        Returns a `class:wolphin.telemetry.FleetTelemetry` of the project's running instances,
+        sampling their CPU, load average, memory and network counters concurrently whenever it is
+        polled, e.g. in the background while a test runs, to tell the instances that saturate.
+
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used.
+        :param capacity: (optional) the samples kept per instance; defaults to
+         `data:wolphin.telemetry.CAPACITY`.
+        :param thresholds: (optional) the saturation thresholds, by resource, see
+         `data:wolphin.telemetry.THRESHOLDS`.
+        :param on_saturated: (optional) called with the ip address of an instance and its
+         saturated resources whenever an instance becomes saturated.
+        """
+
+        from wolphin.telemetry import CAPACITY, FleetTelemetry
+
+        running = self.get_instances_in_states([self.STATES['running']], selector=selector)
+        return FleetTelemetry(self.ssh, [instance.ip_address for instance in running],
+                              capacity=CAPACITY if capacity is None else capacity,
+                              thresholds=thresholds,
+                              on_saturated=on_saturated)
+
+    def _track(self, operation, instances, state_code, new_state_code):
+        """
+        Returns an `class:wolphin.operations.OperationHandle` of the ``operation``, tracked by the
+        project's monitor until the ``instances`` transition from ``state_code`` to
+        ``new_state_code``, for as long as a blocking operation would wait for them.
+        """
+
+        deadline = time() + self.config.max_wait_tries * self.config.max_wait_duration
+        return self.monitor.track(OperationHandle(operation,
+                                                  instances,
+                                                  state_code,
+                                                  new_state_code,
+                                                  deadline,
+                                                  status=instance_status,
+                                                  report=self._report))
+
+    def _describe_instances(self, instance_ids):
+        """Describes the instances with the ``instance_ids`` with a single ec2 call"""
+
+        reservations = self.conn.get_all_instances(instance_ids=instance_ids)
+        return [instance for reservation in reservations for instance in reservation.instances]
+
     def get_instances_in_states(self, state_codes, inverse_select=False, selector=None):
-        """Returns project instances that are in the given ``state_codes``"""
+        """
+        Returns project instances that are in the given ``state_codes``, or in any other state if
+        ``inverse_select``; the states are filtered by ec2, and checked again once the instances
+        are updated.
+        """
 
-        not_in_state = lambda instance: instance.state_code not in state_codes
-        in_state = lambda instance: instance.state_code in state_codes
-        filter_function = not_in_state if inverse_select else in_state
-        instances = self._select_instances(selector)
+        if inverse_select:
+            state_codes = [code for code in self.STATES.itervalues() if code not in state_codes]
+        return [instance
+                for instance in self._updated(self.iter_instances(selector=selector,
+                                                                  states=state_codes))
+                if instance.state_code in state_codes]
+
+    def iter_instances(self, selector=None, states=None):
+        """
+        Yields the project's instances a page at a time, as ec2 lists them, so that the first ones
+        are yielded as soon as the first page is listed.
+
+        :param selector: (optional) the `class:wolphin.selector.Selector` to be used. It selects
+         from every page as it is listed if it is ``per_instance``, from all the instances
+         otherwise.
+        :param states: (optional) the state codes of the instances wanted, filtered by ec2. All
+         the instances are yielded if not given.
+        """
+
+        selector = selector or DefaultSelector()
+        pages = self._iter_pages(states)
+        if not selector.per_instance:
+            pages = [[instance for page in pages for instance in page]]
+        for page in pages:
+            for instance in selector.select(page):
+                yield instance
+
+    def _iter_pages(self, states=None):
+        """Yields the pages of the project's instances in the ``states`` (codes), if given"""
+
+        if states is not None and not states:
+            return
+        if self.snapshot is not None:
+            yield [instance for instance in self._get_instances_through_snapshot()
+                   if states is None or instance.state_code in states]
+            return
 
-        return filter(filter_function, instances)
+        filters = self._project_filters()
+        if states is not None:
+            filters["instance-state-name"] = [state for state, code in self.STATES.iteritems()
+                                              if code in states]
+        next_token = None
+        while True:
+            page = self.conn.get_all_reservations(filters=filters,
+                                                  max_results=self.PAGE_SIZE,
+                                                  next_token=next_token)
+            yield [instance for reservation in page for instance in reservation.instances]
+            next_token = getattr(page, 'next_token', None)
+            if not next_token:
+                return
 
     def _get_healthy_instances(self, selector=None):
         """
@@ -288,40 +889,97 @@ class WolphinProject(object):
 
     def _get_all_instances(self):
         """Get all instances for a wolphin project on ec2"""
+        return self._updated(self.iter_instances())
 
-        reservations = self.conn.get_all_instances(filters={"tag:ProjectName":
-                                                            "wolphin.{}"
-                                                            .format(self.config.project)})
+    def _updated(self, instances):
+        """
+        Updates the ``instances`` one by one, as the list APIs always have, so that instances in
+        transition are seen in their latest state; returns them as a list.
+        """
 
-        return self._get_instances_from_reservations(reservations)
+        instances = list(instances)
+        for instance in instances:
+            instance.update()
+        return instances
 
-    def _get_instance_number(self, instance):
-        """Parses the instance name to get the instance number"""
+    def _get_instances_through_snapshot(self):
+        """
+        Gets the project's instances through its snapshot: the first time by listing the project's
+        instances that are not terminated, to reconcile the snapshot with ec2, and from then on by
+        describing the instances known to the snapshot by id, without listing the project again.
+        The project's terminated instances are then only known to the snapshot.
+        """
 
-        return int(str((instance).tags.get("Name")).split(".")[-1])
+        if self._reconciled:
+            known_ids = self.snapshot.known_ids()
+            try:
+                reservations = (self.conn.get_all_instances(instance_ids=known_ids)
+                                if known_ids else [])
+                return self._update_snapshot(reservations)
+            except EC2ResponseError as ec2_error:
+                if not _is_not_found_error(ec2_error):
+                    raise
+                self.logger.debug("Instances known to the snapshot are gone, reconciling ....")
+
+        live_states = [state for state in self.STATES if state != 'terminated']
+        reservations = self.conn.get_all_instances(filters=dict(self._project_filters(),
+                                                                **{"instance-state-name":
+                                                                   live_states}))
+        instances = self._update_snapshot(reservations, complete=True)
+        self._reconciled = True
+        return instances
+
+    def _project_filters(self):
+        """The ec2 filters of the project's instances, only those of its role if it is one"""
+
+        filters = {"tag:ProjectName": "wolphin.{}".format(self.config.project)}
+        if self.config.role is not None:
+            filters["tag:WolphinRole"] = self.config.role
+        return filters
 
-    def _get_instances_from_reservations(self, reservations):
-        """Flatten all reservations to get one instances list"""
+    def _update_snapshot(self, reservations, complete=False):
+        """Records the instances of the ``reservations`` in the snapshot and saves it"""
 
+        # the instances were just described, there is no need to update them one by one.
         instances = [instance
-                     for reservation in reservations or []
+                     for reservation in reservations
                      for instance in reservation.instances]
+        self.snapshot.update(instances, complete=complete)
+        self.snapshot.save()
+        return instances
 
-        for instance in instances:
-            instance.update()
+    def _get_instance_number(self, instance):
+        """Parses the instance name to get the instance number"""
 
-        return instances
+        return int(str((instance).tags.get("Name")).split(".")[-1])
 
-    def _reserve(self, min_number_needed=None, max_number_needed=None):
+    def _instance_key(self, instance):
+        """The role and number of ``instance``, unique among the instances of all the roles"""
+
+        return instance.tags.get("WolphinRole"), self._get_instance_number(instance)
+
+    def _reserve(self, min_number_needed=None, max_number_needed=None, first_instance_number=None):
         """
         Makes a reservation for ec2 instances, on amazon ec2, based on ``self.config`` parameters,
-        starts the instances and returns the reservation.
+        starts the instances and returns the reservation. The configured user data, if any, is sent
+        with it, for instances numbered from ``first_instance_number``.
         """
 
         min_number_needed = min_number_needed or self.config.min_instance_count
         max_number_needed = max_number_needed or self.config.max_instance_count
 
+        kwargs = dict()
+        if self.user_data is not None:
+            from wolphin.user_data import render_user_data
+            if first_instance_number is None:
+                first_instance_number = self._max_allocated_number() + 1
+            kwargs['user_data'] = render_user_data(self.user_data,
+                                                   self.config,
+                                                   first_instance_number)
+
         # reserve and run instances.
+        report = self._ongoing_report
+        requested = report.clock() if report is not None else None
         try:
             reservation = self.conn.run_instances(self.config.ami_id,
                                                   min_count=str(min_number_needed),
@@ -331,22 +989,49 @@ class WolphinProject(object):
                                                   [self.config.instance_securitygroup],
                                                   instance_type=self.config.instance_type,
                                                   placement=
-                                                  self.config.instance_availabilityzone)
+                                                  self.config.instance_availabilityzone,
+                                                  **kwargs)
         except EC2ResponseError as ec2_error:
             if "InstanceLimitExceeded" in str(ec2_error):
                 raise EC2InstanceLimitExceeded("EC2 instance limit exceeded in region={}"
                                                "\nAmazon EC2 Response:"
                                                "\n{}".format(self.config.region,
                                                              ec2_error))
+            elif is_throttling_error(ec2_error):
+                raise EC2RequestLimitExceeded("EC2 kept throttling requests in region={}"
+                                              "\nAmazon EC2 Response:"
+                                              "\n{}".format(self.config.region,
+                                                            ec2_error))
             else:
                 raise WolphinException(str(ec2_error))
+
+        for instance in reservation.instances:
+            self._record(instance, 'requested', requested)
+            self._record(instance, instance.state)
         return reservation
 
+    def _record(self, instance, milestone, timestamp=None):
+        """Records ``milestone`` for ``instance`` in the report of the ongoing operation if any"""
+
+        report = self._ongoing_report
+        if report is not None:
+            report.record(instance, milestone, timestamp)
+
+    @property
+    def _ongoing_report(self):
+        """
+        The report of the ongoing operation, if any: a role group acted on by an operation of its
+        project records to the project's report.
+        """
+
+        if self._report is None and self._parent is not None:
+            return self._parent._report
+        return self._report
+
     def _select_instances(self, selector=None):
         """Gets the instances based on self.config"""
 
-        selector = selector or DefaultSelector()
-        return selector.select(self._get_all_instances())
+        return self._updated(self.iter_instances(selector=selector))
 
     def _tag_instance(self, instance, suffix):
         """
@@ -354,10 +1039,22 @@ class WolphinProject(object):
         ``self.config`` is used to construct the complete wolphin instance name.
         """
 
-        self.conn.create_tags(instance.id,
-                              {"Name": "wolphin.{}.{}".format(self.config.project, suffix),
-                               "ProjectName": "wolphin.{}".format(self.config.project),
-                               "OwnerEmail": self.config.email})
+        tags = self._tags(suffix, self.config.role)
+        tags["OwnerEmail"] = self.config.email
+        self.conn.create_tags(instance.id, tags)
+        if self.snapshot is not None:
+            # saved with the next listing of the project's instances.
+            self.snapshot.record(instance, number=suffix, role=self.config.role)
+
+    def _tags(self, number, role=None):
+        """The wolphin tags of the instance ``number`` of the project, of its ``role`` if any"""
+
+        tags = {"Name": ".".join(["wolphin", self.config.project] + ([role] if role else []) +
+                                 [str(number)]),
+                "ProjectName": "wolphin.{}".format(self.config.project)}
+        if role is not None:
+            tags["WolphinRole"] = role
+        return tags
 
     def _wait_for_transition(self, instances, state_code=None, new_state_code=None):
         """
@@ -386,30 +1083,210 @@ class WolphinProject(object):
                                   self.config.max_wait_duration,
                                   self.config.max_wait_tries * self.config.max_wait_duration))
 
-        all_instances_ready, status_table = self._check_instances_for_transition(instances,
-                                                                                 state_code,
-                                                                                 new_state_code)
-        self.logger.debug("\n{}".format(status_table))
+        all_instances_ready, progress, status_table = (
+            self._check_instances_for_transition(instances, state_code, new_state_code))
+        self._report_progress(progress, status_table)
         return all_instances_ready
 
     def _check_instances_for_transition(self, instances, state_code, new_state_code):
         """
         Checks if the ``instances`` have transitioned out of the ``state_code`` to the
         ``new_state_code`` and returns True if all of them have, False otherwise along with the
+        `class:wolphin.progress.Progress` of the transition and, only if debugging, a table of the
         statuses of all of them.
         """
 
         keep_waiting = False
-        status_table = ColorTable('instance', 'state')
+        phase = (_inverse_lookup(self.STATES, new_state_code) or
+                 ["leaving {}".format(_inverse_lookup(self.STATES, state_code))])[0]
+        progress = Progress(phase)
+        status_table = self._status_table('instance', 'state')
+        for instance in instances:
+            instance.update()
+            self._record(instance, instance.state)
+            if status_table is not None:
+                status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
+                                 state="{}|{}".format(instance.state_code, instance.state))
+
+            waiting = ((state_code is not None and instance.state_code == state_code) or
+                       (new_state_code is not None and instance.state_code != new_state_code))
+            keep_waiting = keep_waiting or waiting
+            progress.add(instance.state, _name(instance) if waiting else None)
+        return not keep_waiting, progress, status_table
+
+    def _status_table(self, *columns):
+        """Returns a `class:wolphin.progress.StatusTable` to fill if debugging, None otherwise"""
+        return StatusTable(*columns) if self.logger.isEnabledFor(logging.DEBUG) else None
+
+    def _report_progress(self, progress, status_table):
+        """Reports a round of waiting to the progress sink, if any, and to the debug log"""
+
+        if self.progress_sink is not None:
+            self.progress_sink(progress)
+        self.logger.debug("%s", progress)
+        if status_table is not None:
+            self.logger.debug("\n%s", status_table)
+
+    def _wait_for_ready(self, instances, started):
+        """
+        Waits until the ``instances`` are ready: until they are ssh-ready or, if they signal it
+        themselves, until the ``started`` ones among them did; the others already were.
+        """
+
+        if self.readiness is None:
+            return self._wait_for_ssh(instances)
+        return self._wait_for_signals(started)
+
+    def _wait_for_ready_replacing_stragglers(self, instances, started):
+        """
+        Waits until the ``instances`` are running and ready, as `func:_wait_for_ready` does, but
+        starts a replacement for every straggler among them, with the same instance number, see
+        `mod:wolphin.stragglers`. Whichever of an instance and its replacement is ready first is
+        kept and the other one is terminated. Like a reverted instance, a replacement is a new
+        instance from the configured AMI. A straggler that cannot be replaced, e.g. as the instance
+        limit is reached, is waited for. On timeout, the replacements of the instances that are
+        not ready are terminated. Returns the instances kept, in role and instance number order.
+        """
+
+        # the instances of the role groups of a project are numbered per role.
+        detector = self._straggler_detector()
+        signalling = set(instance.id for instance in started)
+        candidates = dict()
+        for instance in instances:
+            key = self._instance_key(instance)
+            candidates[key] = [instance]
+            detector.request(key)
+
+        kept = dict()
+        unreplaceable = set()
+        for _ in range(self.config.max_wait_tries):
+            waiting = [instance for key, instances in candidates.iteritems()
+                       if key not in kept for instance in instances]
+            for instance in self._ready_instances(waiting, signalling):
+                key = self._instance_key(instance)
+                if key in kept:
+                    continue
+                kept[key] = instance
+                detector.done(key)
+                for other in candidates[key]:
+                    if other is not instance:
+                        self.logger.info("Terminating {} ({}), {} was ready first ...."
+                                         .format(_name(other), other.id, instance.id))
+                        other.terminate()
+            if len(kept) == len(candidates):
+                return [kept[key] for key in sorted(kept)]
+
+            for key in detector.stragglers():
+                # one replacement per instance at most.
+                if len(candidates[key]) == 1 and key not in unreplaceable:
+                    try:
+                        replacement = self._replace_straggler(candidates[key][0], key[1],
+                                                              detector.threshold)
+                    except WolphinException as error:
+                        self.logger.warning("Could not replace {}, waiting for it: {}"
+                                            .format(_name(candidates[key][0]), error))
+                        unreplaceable.add(key)
+                        continue
+                    candidates[key].append(replacement)
+                    signalling.add(replacement.id)
+            sleep(self.config.max_wait_duration)
+
+        # an instance number is not left to two instances.
+        for key, instances in candidates.iteritems():
+            if key not in kept:
+                for replacement in instances[1:]:
+                    self.logger.info("Terminating {} ({}), the replacement of a straggler ...."
+                                     .format(_name(replacement), replacement.id))
+                    replacement.terminate()
+
+        error_message = ("Timed out when waiting for some or all instances of project:"
+                         "{} to be ready.".format(self.config.project))
+        self.logger.error(error_message)
+        timeout_error = ReadinessTimeoutError if self.readiness is not None else SSHTimeoutError
+        raise timeout_error(error_message)
+
+    def _straggler_detector(self):
+        return StragglerDetector(self.config.straggler_factor)
+
+    def _ready_instances(self, instances, signalling):
+        """
+        Returns the ``instances`` that are running and ready: ssh-ready or, if they signal it
+        themselves, that signalled it unless they are not among the ``signalling`` ids.
+        """
+
         for instance in instances:
             instance.update()
-            status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
-                             state="{}|{}".format(instance.state_code, instance.state))
+            self._record(instance, instance.state)
+        running = [instance for instance in instances if instance.state == 'running']
+
+        if self.readiness is not None:
+            signalled = self.readiness.ready([instance for instance in running
+                                              if instance.id in signalling])
+            ready = [instance for instance in running
+                     if instance.id not in signalling or instance.id in signalled]
+            for instance in ready:
+                self._record(instance, 'ready')
+        else:
+            ready = [instance for instance in running if self._check_if_ssh_ready(instance)]
 
-            if ((state_code is not None and instance.state_code == state_code) or
-                    (new_state_code is not None and instance.state_code != new_state_code)):
-                keep_waiting = True
-        return not keep_waiting, status_table
+        progress = Progress('ready')
+        ready_ids = set(instance.id for instance in ready)
+        for instance in instances:
+            is_ready = instance.id in ready_ids
+            progress.add('ready' if is_ready else instance.state,
+                         None if is_ready else _name(instance))
+        self._report_progress(progress, None)
+        return ready
+
+    def _replace_straggler(self, instance, number, threshold):
+        """Starts a replacement for the straggling ``instance``; returns it"""
+
+        self.logger.info("{} ({}) is not ready after {:.0f}s, starting a replacement ...."
+                         .format(_name(instance), instance.id, threshold))
+        self._record(instance, 'straggler')
+        project = self._project_for(instance)
+        reservation = project._reserve(1, 1, first_instance_number=number)
+        replacement = reservation.instances[0]
+        project._tag_instance(replacement, number)
+        if self.readiness is not None:
+            self.readiness.reset([replacement])
+        return replacement
+
+    def _wait_for_signals(self, instances):
+        """
+        Waits until the ``instances`` signal that they are ready through the project's readiness
+        channel, which costs one describe call at most per round whatever their number.
+        """
+
+        for _ in range(self.config.max_wait_tries):
+            if self._all_instances_signalled(instances):
+                return instances
+            sleep(self.config.max_wait_duration)
+
+        error_message = ("Timed out when waiting for some or all instances of project:"
+                         "{} to signal that they are ready.".format(self.config.project))
+        self.logger.error(error_message)
+        raise ReadinessTimeoutError(error_message)
+
+    def _all_instances_signalled(self, instances):
+        """Checks which of the ``instances`` signalled that they are ready; returns True if all"""
+
+        ready = self.readiness.ready(instances)
+
+        progress = Progress('ready')
+        status_table = self._status_table('instance', 'ready')
+        for instance in instances:
+            is_ready = instance.id in ready
+            if is_ready:
+                self._record(instance, 'ready')
+            progress.add('ready' if is_ready else 'not ready',
+                         None if is_ready else _name(instance))
+            if status_table is not None:
+                status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
+                                 ready=str(is_ready))
+
+        self._report_progress(progress, status_table)
+        return len(ready) == len(instances)
 
     def _wait_for_ssh(self, instances):
         """
@@ -438,26 +1315,31 @@ class WolphinProject(object):
                                   self.config.max_wait_duration,
                                   self.config.max_wait_tries))
 
-        all_instances_ready, status_table = self._check_instances_for_ssh(instances)
-        self.logger.debug("\n{}".format(status_table))
+        all_instances_ready, progress, status_table = self._check_instances_for_ssh(instances)
+        self._report_progress(progress, status_table)
         return all_instances_ready
 
     def _check_instances_for_ssh(self, instances):
         """
         Checks if the ``instances`` are ssh-ready; returns True if they are, False otherwise,
-        along with the statuses of all of them.
+        along with the `class:wolphin.progress.Progress` of the instances and, only if debugging, a
+        table of the statuses of all of them.
         """
 
         not_ready = False
-        status_table = ColorTable('instance', 'ssh_ready')
+        progress = Progress('ssh_ready')
+        status_table = self._status_table('instance', 'ssh_ready')
         for instance in instances:
             instance.update()
             instance_is_ssh_ready = self._check_if_ssh_ready(instance)
             not_ready = not_ready or not instance_is_ssh_ready
+            progress.add('ssh_ready' if instance_is_ssh_ready else 'not ssh_ready',
+                         None if instance_is_ssh_ready else _name(instance))
 
-            status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
-                             ssh_ready=str(instance_is_ssh_ready))
-        return not not_ready, status_table
+            if status_table is not None:
+                status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
+                                 ssh_ready=str(instance_is_ssh_ready))
+        return not not_ready, progress, status_table
 
     def _check_if_ssh_ready(self, instance):
         """
@@ -469,6 +1351,12 @@ class WolphinProject(object):
             # if the host is not ready yet, it may not even have a host string
             # which would mean it is definitely not ready for ssh yet.
             return False
+        if not self._check_if_tcp_open(instance):
+            return False
+        self._record(instance, 'tcp_open')
+
+        # fabric is slow to import and only needed here, so it is only imported when needed.
+        from fabric.api import hide, run, settings
         try:
             with settings(hide('everything'),
                           host_string=instance.ip_address,
@@ -477,8 +1365,65 @@ class WolphinProject(object):
                 run("hostname")
         except:
             return False
+        self._record(instance, 'ssh_ready')
         return True
 
+    def _check_if_tcp_open(self, instance):
+        """
+        Returns True if the ssh port of the ``instance`` accepts tcp connections, False otherwise.
+        This is much cheaper than an ssh login attempt while the instance is still booting.
+        """
+
+        try:
+            socket.create_connection((instance.ip_address, self.SSH_PORT),
+                                     self.TCP_CONNECT_TIMEOUT).close()
+        except (socket.error, socket.timeout):
+            return False
+        return True
+
+    def _wait_for_boot(self, instances):
+        """
+        Waits until the ``instances`` publish the configured ``boot_marker``, i.e. are done
+        provisioning themselves with their user data. Only the ones that have not yet are checked
+        again, over ssh.
+        """
+
+        booted = set()
+        for _ in range(self.config.max_wait_tries):
+            if self._all_instances_booted(instances, booted):
+                return instances
+            sleep(self.config.max_wait_duration)
+
+        error_message = ("Timed out when waiting for some or all instances of project:"
+                         "{} to create {}.".format(self.config.project, self.config.boot_marker))
+        self.logger.error(error_message)
+        raise BootTimeoutError(error_message)
+
+    def _all_instances_booted(self, instances, booted):
+        """Checks the ``instances`` not in the ``booted`` ids yet; returns True if all booted"""
+
+        booting = [instance for instance in instances if instance.id not in booted]
+        results = self.ssh.run_all([instance.ip_address for instance in booting],
+                                   "test -e {}".format(pipes.quote(self.config.boot_marker)))
+
+        progress = Progress('booted')
+        status_table = self._status_table('instance', 'booted')
+        for instance in instances:
+            if instance.id not in booted:
+                result = results.get(instance.ip_address)
+                if result is not None and not isinstance(result, Exception) and result.succeeded:
+                    booted.add(instance.id)
+                    self._record(instance, 'booted')
+            is_booted = instance.id in booted
+            progress.add('booted' if is_booted else 'booting',
+                         None if is_booted else _name(instance))
+            if status_table is not None:
+                status_table.add(instance="{}|{}".format(instance.id, instance.tags.get("Name")),
+                                 booted=str(is_booted))
+
+        self._report_progress(progress, status_table)
+        return len(booted) == len(instances)
+
     def _wait_for_starting_instances(self, instances=None, selector=None):
         self.logger.info("Waiting for pending instances to start ....")
         self._wait_for_transition(instances or
@@ -504,27 +1449,19 @@ class WolphinProject(object):
                                   new_state_code=self.STATES['stopped'])
 
 
-def print_status(instance_infos):
-
-    if instance_infos is not None:
-        color_table = ColorTable('Instance',
-                                 'State',
-                                 'Public',
-                                 'SSHKey',
-                                 'SecurityGroups',
-                                 'Zone',
-                                 'Contact')
-        for instance_info in instance_infos:
-            color_table.add(Instance="{}|{}".format(instance_info.id, instance_info.name,),
-                            State="{}|{}".format(instance_info.state_code, instance_info.state),
-                            Public="{}|{}".format(instance_info.public_dns_name,
-                                                  instance_info.public_ip_address),
-                            SSHKey=instance_info.ssh_key_name,
-                            SecurityGroups=", ".join(g.name for g in instance_info.security_groups),
-                            Zone=instance_info.placement,
-                            Contact=instance_info.owner_email)
-
-        print color_table
+def _is_not_found_error(ec2_error):
+    return (getattr(ec2_error, 'error_code', None) == "InvalidInstanceID.NotFound" or
+            "InvalidInstanceID.NotFound" in str(ec2_error))
+
+
+def _in_launch_order(instances):
+    """Sorts the ``instances`` of a reservation by their launch index"""
+    return sorted(instances,
+                  key=lambda instance: int(getattr(instance, 'ami_launch_index', 0) or 0))
+
+
+def _name(instance):
+    return instance.tags.get("Name") or instance.id
 
 
 def _inverse_lookup(dictionary, value):
@@ -0,0 +1,159 @@
+"""
+Readiness signalled by the instances of a wolphin project themselves, instead of polled by wolphin
+over ssh, so that checking on a fleet costs the same whatever its size.
+
+Instances signal that they are ready, typically at the end of their user data (see
+`mod:wolphin.user_data`, where ``$wolphin_signal_ready`` is the command to do so), through one of
+these channels, configured with ``readiness``:
+
+ - 'tag': by tagging themselves ``WolphinReady``, which wolphin observes with one describe call per
+   round. The instances need permission to create tags on themselves.
+ - 'http': by posting their instance id to a small http collector wolphin runs during a lifecycle
+   operation, at ``readiness_url``, which must be reachable from the instances. Only the instances
+   the operation started are expected to signal, the others are refused.
+"""
+
+import BaseHTTPServer
+import SocketServer
+import logging
+import threading
+from urlparse import urlparse
+
+from wolphin.exceptions import InvalidWolphinConfiguration
+
+
+READINESS_CHANNELS = ('ssh', 'tag', 'http')
+
+INSTANCE_ID_URL = "http://169.254.169.254/latest/meta-data/instance-id"
+
+
+def readiness_channel(project):
+    """Returns the readiness channel configured for ``project``, None if it is polled over ssh"""
+
+    if project.config.readiness == 'tag':
+        return TagReadiness(project)
+    if project.config.readiness == 'http':
+        return HTTPReadiness(project.config.readiness_url)
+    return None
+
+
+def signal_ready_command(config):
+    """Returns the shell command an instance of ``config``'s project runs to signal it is ready"""
+
+    instance_id = "$(curl -s {})".format(INSTANCE_ID_URL)
+    if config.readiness == 'tag':
+        return ("aws ec2 create-tags --region {} --resources {} --tags Key={},Value=1"
+                .format(config.region, instance_id, TagReadiness.TAG))
+    if config.readiness == 'http':
+        return "curl -s -X POST {}/ready/{}".format(config.readiness_url.rstrip("/"), instance_id)
+    return "true"
+
+
+class TagReadiness(object):
+    """Instances are ready once they have tagged themselves ``WolphinReady``"""
+
+    TAG = "WolphinReady"
+
+    def __init__(self, project):
+        self.project = project
+
+    def reset(self, instances):
+        """Forgets that the ``instances`` were ready, before they are started again"""
+
+        instance_ids = [instance.id for instance in instances]
+        if instance_ids:
+            self.project.conn.delete_tags(instance_ids, {self.TAG: None})
+
+    def ready(self, instances):
+        """Returns the ids of those of the ``instances`` that are ready, with one describe call"""
+
+        if not instances:
+            return set()
+        described = self.project._describe_instances([instance.id for instance in instances])
+        return set(instance.id for instance in described if instance.tags.get(self.TAG))
+
+    def close(self):
+        pass
+
+
+class _CollectorHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "ready" or not parts[1]:
+            self.send_error(404)
+            return
+        if not self.server.collector.signal(parts[1]):
+            self.send_error(403)
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write("ok\n")
+
+    def log_message(self, message_format, *args):
+        self.server.collector.logger.debug(message_format, *args)
+
+
+class _CollectorServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class HTTPReadiness(object):
+    """
+    Instances are ready once they have posted their instance id to ``<readiness_url>/ready/<id>``.
+    The collector listens on the host and port of the ``readiness_url`` only, and only accepts the
+    ids of the instances it was told to expect, see `func:reset`; anything but a POST is refused.
+    """
+
+    def __init__(self, readiness_url):
+        if not readiness_url:
+            raise InvalidWolphinConfiguration("readiness_url is needed for http readiness.")
+        self.expected = set()
+        self.signalled = set()
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('wolphin.readiness')
+
+        url = urlparse(readiness_url)
+        self.server = _CollectorServer((url.hostname or '', url.port or 80), _CollectorHandler)
+        self.server.collector = self
+        self.thread = threading.Thread(target=self.server.serve_forever, name="wolphin-readiness")
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def signal(self, instance_id):
+        """Records that ``instance_id`` is ready; returns False if it is not expected to signal"""
+
+        with self.lock:
+            if instance_id not in self.expected:
+                self.logger.warning("Refused the signal of unexpected instance {}"
+                                    .format(instance_id))
+                return False
+            self.signalled.add(instance_id)
+            return True
+
+    def reset(self, instances):
+        """
+        Forgets that the ``instances`` were ready, before they are started again, and expects them
+        to signal.
+        """
+
+        instance_ids = set(instance.id for instance in instances)
+        with self.lock:
+            self.signalled.difference_update(instance_ids)
+            self.expected.update(instance_ids)
+
+    def ready(self, instances):
+        """Returns the ids of those of the ``instances`` that are ready, without any ec2 call"""
+
+        with self.lock:
+            return set(instance.id for instance in instances if instance.id in self.signalled)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -8,6 +8,11 @@ class Selector(object):
 
     __metaclass__ = ABCMeta
 
+    # True if the selector decides on each instance regardless of the others, so that it can select
+    # from the pages of a project's instances as they are listed, see
+    # `WolphinProject.iter_instances`. Other selectors are given all the instances at once.
+    per_instance = False
+
     @abstractmethod
     def select(self, instances):
         """
@@ -22,6 +27,8 @@ class Selector(object):
 
 class DefaultSelector(Selector):
 
+    per_instance = True
+
     def select(self, instances):
         return instances
 
@@ -29,6 +36,8 @@ class DefaultSelector(Selector):
 class InstanceNumberBasedSelector(Selector):
     """Selector that does instance selection based on instance numbers"""
 
+    per_instance = True
+
     def __init__(self, instance_numbers=None):
         self.instance_numbers = [int(number) for number in instance_numbers or []]
 
@@ -39,3 +48,18 @@ class InstanceNumberBasedSelector(Selector):
         return ([instance
                  for instance in instances
                  if get_instance_number(instance) in self.instance_numbers])
+
+
+class RoleSelector(Selector):
+    """Selector that does instance selection based on the role groups of the instances"""
+
+    per_instance = True
+
+    def __init__(self, roles=None):
+        self.roles = list(roles or [])
+
+    def select(self, instances=[]):
+        if not self.roles:
+            return instances
+        return [instance for instance in instances
+                if instance.tags.get("WolphinRole") in self.roles]
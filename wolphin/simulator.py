@@ -0,0 +1,475 @@
+"""
+A local simulation of those parts of ec2 that wolphin uses, to evaluate wolphin at scale offline.
+
+`class:wolphin.simulator.SimulatedEC2Connection` can be used in place of a boto ec2 connection,
+e.g. ``WolphinProject(config, SimulatedEC2Connection.realistic(clock))``. Unlike
+``wolphin.tests.mock_boto`` it has per-call latency, instances that take time to change state,
+capacity limits per availability zone and instance type, request throttling, paginated describe
+calls and tag-indexed lookups that keep describe calls cheap with thousands of instances.
+
+All time in the simulation is measured with a clock, an object with ``time()`` and ``sleep()``.
+The default clock is the ``time`` module; a `class:wolphin.simulator.VirtualClock` can be used
+instead to simulate hours of ec2 time in seconds, as long as everything else waits on it too.
+"""
+
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+from boto.exception import EC2ResponseError
+
+from wolphin.throttle import MUTATING_CALLS, TokenBucket
+
+
+STATES = {
+    'pending': 0,
+    'running': 16,
+    'shutting-down': 32,
+    'stopping': 64,
+    'stopped': 80,
+    'terminated': 48
+}
+
+# the stable state each transitional state ends up in.
+TRANSITIONS = {
+    'pending': 'running',
+    'stopping': 'stopped',
+    'shutting-down': 'terminated'
+}
+
+
+def constant(seconds):
+    """A distribution always drawing ``seconds``"""
+    return lambda rng: seconds
+
+
+def uniform(low, high):
+    """A distribution drawing uniformly between ``low`` and ``high`` seconds"""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median, sigma):
+    """
+    A log-normal distribution of seconds with the given ``median``, the usual shape of boot and
+    api latencies: most draws are close to the median with a long tail of slow ones.
+    """
+
+    return lambda rng: rng.lognormvariate(math.log(median), sigma)
+
+
+class VirtualClock(object):
+    """A clock whose time only moves forward when it is slept on"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+        self.lock = threading.Lock()
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += max(0, seconds)
+
+
+class ResultSet(list):
+    """A page of results of a describe call"""
+
+    next_token = None
+
+
+class Reservation(object):
+    def __init__(self, reservation_id, instances):
+        self.id = reservation_id
+        self.instances = instances
+
+
+class Group(object):
+    def __init__(self, name):
+        self.id = "sg-{}".format(uuid.uuid4().hex[:8])
+        self.name = name
+
+
+class _InstanceRecord(object):
+    """The simulator's own record of an instance; describe calls return snapshots of it"""
+
+    __slots__ = ('id', 'seq', 'reservation_id', 'state', 'transition_at', 'tags', 'image_id',
+                 'instance_type', 'placement', 'key_name', 'groups', 'launch_time',
+                 'ip_address', 'private_ip_address', 'public_dns_name', 'private_dns_name')
+
+
+class SimulatedInstance(object):
+    """
+    A snapshot of a simulated instance as returned by describe calls, with the same attributes and
+    methods as a boto instance. Like with boto, its state is only refreshed by ``update()``.
+    """
+
+    def __init__(self, connection, record):
+        self.connection = connection
+        self.id = record.id
+        self._refresh(record)
+
+    def _refresh(self, record):
+        self.state = record.state
+        self.tags = dict(record.tags)
+        self.image_id = record.image_id
+        self.instance_type = record.instance_type
+        self.placement = record.placement
+        self.key_name = record.key_name
+        self.groups = record.groups
+        self.launch_time = record.launch_time
+        self.ip_address = record.ip_address
+        self.private_ip_address = record.private_ip_address
+        self.public_dns_name = record.public_dns_name
+        self.private_dns_name = record.private_dns_name
+
+    @property
+    def state_code(self):
+        return STATES[self.state]
+
+    def update(self):
+        self._refresh(self.connection._describe_one('Instance.update', self.id))
+        return self.state
+
+    def start(self):
+        self.connection._change_states('Instance.start', [self.id], 'start')
+
+    def stop(self):
+        self.connection._change_states('Instance.stop', [self.id], 'stop')
+
+    def terminate(self):
+        self.connection._change_states('Instance.terminate', [self.id], 'terminate')
+
+    def reboot(self):
+        self.connection._call('Instance.reboot')
+
+    def add_tag(self, key, value=''):
+        self.connection._tag('Instance.add_tag', [self.id], {key: value})
+        self.tags[key] = value
+
+
+class SimulatedEC2Connection(object):
+    """
+    A simulated ec2 connection, see the module documentation.
+    """
+
+    def __init__(self,
+                 clock=time,
+                 latency=None,
+                 transition_delays=None,
+                 instance_limit=None,
+                 capacity=None,
+                 describe_throttle=None,
+                 mutate_throttle=None,
+                 seed=None):
+        """
+        :param clock: the clock to measure and spend simulated time with.
+        :param latency: a dict of call names (e.g. 'run_instances' or 'Instance.update') to the
+         distribution of their latency; calls not in it take no time, unless there is a
+         'default' distribution.
+        :param transition_delays: a dict of transitional states ('pending', 'stopping',
+         'shutting-down') to the distribution of the time spent in them; instantaneous if absent.
+        :param instance_limit: the maximum number of non terminated instances in the account.
+        :param capacity: a dict of (availability zone, instance type) to the maximum number of non
+         terminated instances ec2 has capacity for in it.
+        :param describe_throttle: (rate, burst) of describe calls allowed before ec2 starts
+         responding with RequestLimitExceeded.
+        :param mutate_throttle: (rate, burst) of mutating calls, likewise.
+        :param seed: seed for drawing from the distributions, for repeatable simulations.
+        """
+
+        self.clock = clock
+        self.latency = latency or {}
+        self.transition_delays = transition_delays or {}
+        self.instance_limit = instance_limit
+        self.capacity = capacity or {}
+        self.random = random.Random(seed)
+        self.describe_bucket = (TokenBucket(*describe_throttle, clock=clock.time)
+                                if describe_throttle else None)
+        self.mutate_bucket = (TokenBucket(*mutate_throttle, clock=clock.time)
+                              if mutate_throttle else None)
+
+        self.calls = defaultdict(int)
+        self.throttled = defaultdict(int)
+        self.records = dict()
+        self.lock = threading.RLock()
+        self._seq = itertools.count()
+        self._transitions = []
+        self._tag_index = defaultdict(set)
+        self._live = defaultdict(int)
+
+    @classmethod
+    def realistic(cls, clock=time, seed=None, **kwargs):
+        """
+        Factory method to create a simulated connection with typical ec2 latencies, state transition
+        times and request limits; any of them can be overridden with ``kwargs``.
+        """
+
+        defaults = dict(latency={'default': lognormal(0.15, 0.4),
+                                 'run_instances': lognormal(1.5, 0.3)},
+                        transition_delays={'pending': lognormal(40, 0.35),
+                                           'stopping': lognormal(30, 0.3),
+                                           'shutting-down': lognormal(25, 0.3)},
+                        instance_limit=20000,
+                        describe_throttle=(20, 100),
+                        mutate_throttle=(5, 200))
+        defaults.update(kwargs)
+        return cls(clock=clock, seed=seed, **defaults)
+
+    # ---- the boto connection api ----
+
+    def run_instances(self,
+                      image_id,
+                      min_count=1,
+                      max_count=1,
+                      key_name=None,
+                      security_groups=None,
+                      instance_type='m1.small',
+                      placement=None,
+                      **kwargs):
+        self._call('run_instances')
+        min_count, max_count = int(min_count), int(max_count)
+        if not 1 <= min_count <= max_count:
+            raise _error(400, "InvalidParameterValue", "Invalid min_count and max_count arguments")
+
+        with self.lock:
+            self._advance()
+            available = max_count
+            if self.instance_limit is not None:
+                available = min(available, self.instance_limit - sum(self._live.itervalues()))
+                if available < min_count:
+                    raise _error(400, "InstanceLimitExceeded",
+                                 "Your account allows for only {} more instances"
+                                 .format(max(0, available)))
+            if (placement, instance_type) in self.capacity:
+                available = min(available, (self.capacity[(placement, instance_type)] -
+                                            self._live[(placement, instance_type)]))
+                if available < min_count:
+                    raise _error(500, "InsufficientInstanceCapacity",
+                                 "Insufficient capacity for {} in {}"
+                                 .format(instance_type, placement))
+
+            reservation_id = "r-{}".format(uuid.uuid4().hex[:8])
+            groups = [Group(name) for name in security_groups or []]
+            instances = []
+            for launch_index in range(available):
+                record = self._new_record(reservation_id, image_id, key_name, groups,
+                                          instance_type, placement)
+                self._schedule(record, 'pending')
+                instances.append(SimulatedInstance(self, record))
+            return Reservation(reservation_id, instances)
+
+    def create_tags(self, resource_ids, tags, dry_run=False):
+        resource_ids = [resource_ids] if isinstance(resource_ids, basestring) else resource_ids
+        self._tag('create_tags', resource_ids, tags)
+        return True
+
+    def get_all_reservations(self, instance_ids=None, filters=None, dry_run=False,
+                             max_results=None, next_token=None):
+        self._call('get_all_reservations')
+        return self._describe(instance_ids, filters, max_results, next_token)
+
+    def get_all_instances(self, instance_ids=None, filters=None, dry_run=False, max_results=None):
+        self._call('get_all_instances')
+        return self._describe(instance_ids, filters, max_results, None)
+
+    def get_only_instances(self, instance_ids=None, filters=None, dry_run=False,
+                           max_results=None, next_token=None):
+        self._call('get_only_instances')
+        page = self._describe(instance_ids, filters, max_results, next_token)
+        instances = ResultSet(instance
+                              for reservation in page
+                              for instance in reservation.instances)
+        instances.next_token = page.next_token
+        return instances
+
+    def start_instances(self, instance_ids=None, dry_run=False):
+        return self._change_states('start_instances', instance_ids, 'start')
+
+    def stop_instances(self, instance_ids=None, force=False, dry_run=False):
+        return self._change_states('stop_instances', instance_ids, 'stop')
+
+    def terminate_instances(self, instance_ids=None, dry_run=False):
+        return self._change_states('terminate_instances', instance_ids, 'terminate')
+
+    def reboot_instances(self, instance_ids=None, dry_run=False):
+        self._call('reboot_instances')
+        return True
+
+    # ---- simulation ----
+
+    def _call(self, call):
+        """Accounts for a call to ec2: throttles it if needed and spends its latency"""
+
+        self.calls[call] += 1
+        distribution = self.latency.get(call, self.latency.get('default'))
+        if distribution is not None:
+            self.clock.sleep(distribution(self.random))
+
+        bucket = self.mutate_bucket if call in MUTATING_CALLS else self.describe_bucket
+        if bucket is not None and not bucket.try_acquire():
+            self.throttled[call] += 1
+            raise _error(503, "RequestLimitExceeded", "Request limit exceeded.")
+
+    def _new_record(self, reservation_id, image_id, key_name, groups, instance_type, placement):
+        seq = next(self._seq)
+        record = _InstanceRecord()
+        record.id = "i-{:08x}".format(seq)
+        record.seq = seq
+        record.reservation_id = reservation_id
+        record.state = 'pending'
+        record.transition_at = None
+        record.tags = dict()
+        record.image_id = image_id
+        record.instance_type = instance_type
+        record.placement = placement
+        record.key_name = key_name
+        record.groups = groups
+        record.launch_time = datetime.utcfromtimestamp(self.clock.time()).isoformat()
+        record.ip_address = None
+        record.public_dns_name = ""
+        record.private_ip_address = "10.{}.{}.{}".format(seq >> 16 & 255,
+                                                         seq >> 8 & 255,
+                                                         seq & 255)
+        record.private_dns_name = "ip-{}.ec2.internal".format(
+            record.private_ip_address.replace(".", "-"))
+        self.records[record.id] = record
+        self._live[(placement, instance_type)] += 1
+        return record
+
+    def _schedule(self, record, state):
+        """Puts ``record`` in the transitional ``state``, to leave it after a drawn delay"""
+
+        record.state = state
+        distribution = self.transition_delays.get(state)
+        delay = distribution(self.random) if distribution is not None else 0
+        record.transition_at = self.clock.time() + delay
+        heapq.heappush(self._transitions, (record.transition_at, record.seq, record.id))
+
+    def _advance(self):
+        """Completes all the state transitions that are due by now"""
+
+        now = self.clock.time()
+        while self._transitions and self._transitions[0][0] <= now:
+            transition_at, _, instance_id = heapq.heappop(self._transitions)
+            record = self.records[instance_id]
+            if record.transition_at != transition_at or record.state not in TRANSITIONS:
+                # superseded by a later state change.
+                continue
+            record.state = TRANSITIONS[record.state]
+            record.transition_at = None
+            if record.state == 'running':
+                record.ip_address = "54.{}.{}.{}".format(record.seq >> 16 & 255,
+                                                         record.seq >> 8 & 255,
+                                                         record.seq & 255)
+                record.public_dns_name = "ec2-{}.compute.amazonaws.com".format(
+                    record.ip_address.replace(".", "-"))
+            elif record.state in ('stopped', 'terminated'):
+                record.ip_address = None
+                record.public_dns_name = ""
+            if record.state == 'terminated':
+                self._live[(record.placement, record.instance_type)] -= 1
+
+    def _change_states(self, call, instance_ids, action):
+        self._call(call)
+        with self.lock:
+            self._advance()
+            for instance_id in instance_ids or []:
+                record = self._record(instance_id)
+                if action == 'start' and record.state == 'stopped':
+                    self._schedule(record, 'pending')
+                elif action == 'stop' and record.state in ('pending', 'running'):
+                    self._schedule(record, 'stopping')
+                elif action == 'terminate' and record.state not in ('shutting-down',
+                                                                     'terminated'):
+                    self._schedule(record, 'shutting-down')
+            return [SimulatedInstance(self, self._record(instance_id))
+                    for instance_id in instance_ids or []]
+
+    def _tag(self, call, instance_ids, tags):
+        self._call(call)
+        with self.lock:
+            for instance_id in instance_ids:
+                record = self._record(instance_id)
+                for key, value in tags.iteritems():
+                    if key in record.tags:
+                        self._tag_index[(key, record.tags[key])].discard(instance_id)
+                    record.tags[key] = value
+                    self._tag_index[(key, value)].add(instance_id)
+
+    def _describe_one(self, call, instance_id):
+        self._call(call)
+        with self.lock:
+            self._advance()
+            return self._record(instance_id)
+
+    def _describe(self, instance_ids, filters, max_results, next_token):
+        with self.lock:
+            self._advance()
+            records = self._filter(instance_ids, filters or {})
+            start = int(next_token) if next_token else 0
+            end = start + max_results if max_results else len(records)
+
+            page = ResultSet()
+            by_reservation = dict()
+            for record in records[start:end]:
+                if record.reservation_id not in by_reservation:
+                    by_reservation[record.reservation_id] = Reservation(record.reservation_id, [])
+                    page.append(by_reservation[record.reservation_id])
+                by_reservation[record.reservation_id].instances.append(
+                    SimulatedInstance(self, record))
+            page.next_token = str(end) if end < len(records) else None
+            return page
+
+    def _filter(self, instance_ids, filters):
+        """
+        Returns the records matching ``instance_ids`` and ``filters`` in launch order. Tag filters
+        are resolved through the tag index rather than by scanning every instance.
+        """
+
+        candidates = None
+        if instance_ids:
+            candidates = set(instance_ids)
+            for instance_id in candidates:
+                self._record(instance_id)
+
+        state_names = None
+        for name, values in filters.iteritems():
+            values = values if isinstance(values, (list, tuple, set)) else [values]
+            if name.startswith("tag:"):
+                matching = set().union(*[self._tag_index.get((name[4:], str(value)), set())
+                                         for value in values])
+                candidates = matching if candidates is None else candidates & matching
+            elif name == 'instance-state-name':
+                state_names = set(values)
+            elif name == 'instance-state-code':
+                state_names = set(state for state, code in STATES.iteritems()
+                                  if str(code) in set(str(value) for value in values))
+            elif name == 'instance-id':
+                candidates = set(values) if candidates is None else candidates & set(values)
+            else:
+                raise _error(400, "InvalidParameterValue",
+                             "The filter '{}' is not supported by the simulator".format(name))
+
+        records = (self.records.itervalues() if candidates is None
+                   else (self.records[instance_id] for instance_id in candidates
+                         if instance_id in self.records))
+        if state_names is not None:
+            records = (record for record in records if record.state in state_names)
+        return sorted(records, key=lambda record: record.seq)
+
+    def _record(self, instance_id):
+        if instance_id not in self.records:
+            raise _error(400, "InvalidInstanceID.NotFound",
+                         "The instance ID '{}' does not exist".format(instance_id))
+        return self.records[instance_id]
+
+
+def _error(status, code, message):
+    return EC2ResponseError(status, code, "{}: {}".format(code, message))
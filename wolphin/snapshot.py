@@ -0,0 +1,139 @@
+"""On-disk snapshots of the inventory of a wolphin project's instances"""
+
+import gzip
+import json
+import os
+from collections import namedtuple
+from os.path import dirname, exists, expanduser, join
+from time import time
+
+
+class SnapshotRecord(namedtuple('SnapshotRecord', ['id',
+                                                   'number',
+                                                   'state',
+                                                   'ip_address',
+                                                   'private_ip_address',
+                                                   'last_seen',
+                                                   'role'])):
+    """What was last known about an instance, and when (``last_seen``)"""
+
+    __slots__ = ()
+
+
+class InventorySnapshot(object):
+    """
+    The last known state of a project's instances, kept in a small gzipped file of one row per
+    instance, so that a new wolphin process can tell what the project looks like without
+    rediscovering it from ec2 first.
+    """
+
+    FORMAT_VERSION = 2
+
+    # records not seen for longer than this many seconds are reported as stale.
+    STALE_AFTER = 300
+
+    def __init__(self, path, clock=time):
+        self.path = path
+        self.clock = clock
+        self.records = dict()
+        self.saved = None
+
+    @classmethod
+    def for_project(cls, config):
+        """
+        Factory method to load the snapshot of the project configured by ``config`` from its
+        ``snapshot_dir``; each role group of a project has its own.
+        """
+
+        name = ".".join([config.project] + ([config.role] if config.role else []))
+        snapshot = cls(join(expanduser(config.snapshot_dir), "{}.snapshot".format(name)))
+        snapshot.load()
+        return snapshot
+
+    def load(self):
+        if not exists(self.path):
+            return
+        with gzip.open(self.path, 'rb') as snapshot_file:
+            contents = json.load(snapshot_file)
+        if contents.get("version") != self.FORMAT_VERSION:
+            # an incompatible snapshot is as good as none, it will be rebuilt from ec2.
+            return
+        self.saved = contents["saved"]
+        self.records = dict((row[0], SnapshotRecord(*row)) for row in contents["rows"])
+
+    def save(self):
+        """Saves the snapshot, atomically so that a concurrent reader never sees a partial one"""
+
+        if not exists(dirname(self.path)):
+            os.makedirs(dirname(self.path))
+        self.saved = self.clock()
+        temporary_path = "{}.{}.tmp".format(self.path, os.getpid())
+        with gzip.open(temporary_path, 'wb') as snapshot_file:
+            json.dump(dict(version=self.FORMAT_VERSION,
+                           saved=self.saved,
+                           columns=SnapshotRecord._fields,
+                           rows=[list(record) for record in self.records.itervalues()]),
+                      snapshot_file,
+                      separators=(',', ':'))
+        os.rename(temporary_path, self.path)
+
+    def record(self, instance, number=None, seen=None, role=None):
+        """Records what is known about ``instance`` now, or at ``seen``"""
+
+        previous = self.records.get(instance.id)
+        if number is None:
+            number = _instance_number(instance)
+        if number is None and previous is not None:
+            number = previous.number
+        role = role or instance.tags.get("WolphinRole")
+        if role is None and previous is not None:
+            role = previous.role
+        self.records[instance.id] = SnapshotRecord(instance.id,
+                                                   number,
+                                                   instance.state,
+                                                   instance.ip_address,
+                                                   instance.private_ip_address,
+                                                   self.clock() if seen is None else seen,
+                                                   role)
+
+    def update(self, instances, complete=False):
+        """
+        Records all the ``instances``. If they are ``complete``, i.e. all the project's non
+        terminated instances, any other instance not known to be terminated is recorded as such.
+        """
+
+        seen = self.clock()
+        for instance in instances:
+            self.record(instance, seen=seen)
+        if complete:
+            present = set(instance.id for instance in instances)
+            for record in self.records.values():
+                if record.id not in present and record.state != 'terminated':
+                    self.records[record.id] = record._replace(state='terminated',
+                                                              ip_address=None,
+                                                              last_seen=seen)
+
+    def known_ids(self):
+        """Returns the ids of the instances not known to be terminated"""
+        return sorted(record.id for record in self.records.itervalues()
+                      if record.state != 'terminated')
+
+    def max_number(self):
+        """Returns the maximum instance number ever recorded, 0 if none"""
+        return max([record.number for record in self.records.itervalues()
+                    if record.number is not None] or [0])
+
+    def age(self, record):
+        """Returns the seconds since ``record`` was last seen"""
+        return self.clock() - record.last_seen
+
+    def is_stale(self, record):
+        return self.age(record) > self.STALE_AFTER
+
+
+def _instance_number(instance):
+    name = instance.tags.get("Name")
+    try:
+        return int(str(name).split(".")[-1])
+    except ValueError:
+        return None
@@ -0,0 +1,148 @@
+"""A pool of ssh connections to the instances of a wolphin project"""
+
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+import paramiko
+
+from wolphin.exceptions import SSHError
+
+
+class CommandResult(object):
+    """The outcome of running a command on a host"""
+
+    def __init__(self, host, exit_status, stdout, stderr):
+        self.host = host
+        self.exit_status = exit_status
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def succeeded(self):
+        return self.exit_status == 0
+
+    def as_dict(self):
+        return dict(host=self.host,
+                    exit_status=self.exit_status,
+                    stdout=self.stdout,
+                    stderr=self.stderr)
+
+
+class SSHPool(object):
+    """
+    Keeps one ssh connection open per host, so that repeated commands do not pay for the ssh
+    handshake again, and runs commands on many hosts concurrently with a bounded number of threads.
+    """
+
+    DEFAULT_MAX_WORKERS = 32
+    DEFAULT_TIMEOUT = 10
+
+    def __init__(self,
+                 user,
+                 key_filename,
+                 port=22,
+                 timeout=DEFAULT_TIMEOUT,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """
+        :param user: the user to log in as.
+        :param key_filename: the private key (.pem) to log in with.
+        :param port: the ssh port.
+        :param timeout: seconds to wait for a connection to be made.
+        :param max_workers: the maximum number of hosts to work on concurrently.
+        """
+
+        self.user = user
+        self.key_filename = key_filename
+        self.port = port
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.clients = dict()
+        self.lock = threading.Lock()
+        self.host_locks = dict()
+        self.logger = logging.getLogger('wolphin.ssh')
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Factory method to create a pool from a `class:wolphin.config.Configuration`"""
+        return cls(config.user, config.ssh_key_file, **kwargs)
+
+    def _host_lock(self, host):
+        with self.lock:
+            return self.host_locks.setdefault(host, threading.Lock())
+
+    def client(self, host):
+        """Returns a connected `class:paramiko.SSHClient` to ``host``, reusing an open one"""
+
+        with self._host_lock(host):
+            client = self.clients.get(host)
+            transport = client.get_transport() if client is not None else None
+            if transport is None or not transport.is_active():
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                client.connect(host,
+                               port=self.port,
+                               username=self.user,
+                               key_filename=self.key_filename,
+                               timeout=self.timeout)
+                self.clients[host] = client
+            return client
+
+    def run(self, host, command, timeout=None):
+        """Runs ``command`` on ``host``; returns a `class:wolphin.ssh.CommandResult`"""
+
+        try:
+            _, stdout, stderr = self.client(host).exec_command(command, timeout=timeout)
+            output, error = stdout.read(), stderr.read()
+            return CommandResult(host, stdout.channel.recv_exit_status(), output, error)
+        except (paramiko.SSHException, EnvironmentError) as error:
+            self.disconnect(host)
+            raise SSHError("{}: {}".format(host, error))
+
+    def open_sftp(self, host):
+        """Returns a `class:paramiko.SFTPClient` to ``host``, over its pooled connection"""
+
+        try:
+            return self.client(host).open_sftp()
+        except (paramiko.SSHException, EnvironmentError) as error:
+            self.disconnect(host)
+            raise SSHError("{}: {}".format(host, error))
+
+    def map(self, func, hosts):
+        """
+        Calls ``func(host)`` for each of the ``hosts`` concurrently; returns a dict of host to what
+        ``func`` returned, or to the `class:wolphin.exceptions.WolphinException` it raised.
+        """
+
+        hosts = list(hosts)
+        if not hosts:
+            return dict()
+
+        def _call(host):
+            try:
+                return host, func(host)
+            except SSHError as error:
+                return host, error
+            except Exception as error:
+                self.logger.debug("{} failed on {}".format(func, host), exc_info=True)
+                return host, SSHError("{}: {}".format(host, error))
+
+        pool = ThreadPool(min(self.max_workers, len(hosts)))
+        try:
+            return dict(pool.map(_call, hosts))
+        finally:
+            pool.close()
+
+    def run_all(self, hosts, command, timeout=None):
+        """Runs ``command`` on all the ``hosts`` concurrently, see ``map``."""
+        return self.map(lambda host: self.run(host, command, timeout=timeout), hosts)
+
+    def disconnect(self, host):
+        with self.lock:
+            client = self.clients.pop(host, None)
+        if client is not None:
+            client.close()
+
+    def close(self):
+        for host in list(self.clients):
+            self.disconnect(host)
@@ -0,0 +1,129 @@
+"""The statuses of a wolphin project's instances, see `WolphinProject.status`"""
+
+from collections import namedtuple
+from operator import attrgetter
+from time import time
+
+from gusset.colortable import ColorTable
+
+from wolphin.attribute_dict import AttributeDict
+from wolphin.exceptions import WolphinException
+
+
+# the fields of the statuses returned by `WolphinProject.status`, in order.
+STATUS_FIELDS = ('id',
+                 'project_name',
+                 'name',
+                 'state_code',
+                 'state',
+                 'public_dns_name',
+                 'public_ip_address',
+                 'private_dns_name',
+                 'private_ip_address',
+                 'ami_id',
+                 'instance_type',
+                 'placement',  # availability zone
+                 'ssh_key_name',
+                 'security_groups',
+                 'launch_time',
+                 'owner_email')
+
+# the fields of the statuses from a project's snapshot, see `WolphinProject.status`.
+CACHED_STATUS_FIELDS = STATUS_FIELDS + ('last_seen', 'stale')
+
+# how every status field is read from an ec2 instance.
+STATUS_GETTERS = dict(id=attrgetter('id'),
+                      project_name=lambda instance: instance.tags.get("ProjectName"),
+                      name=lambda instance: instance.tags.get("Name"),
+                      state_code=attrgetter('state_code'),
+                      state=attrgetter('state'),
+                      public_dns_name=attrgetter('public_dns_name'),
+                      public_ip_address=attrgetter('ip_address'),
+                      private_dns_name=attrgetter('private_dns_name'),
+                      private_ip_address=attrgetter('private_ip_address'),
+                      ami_id=attrgetter('image_id'),
+                      instance_type=attrgetter('instance_type'),
+                      placement=attrgetter('placement'),
+                      ssh_key_name=attrgetter('key_name'),
+                      security_groups=attrgetter('groups'),
+                      launch_time=attrgetter('launch_time'),
+                      owner_email=lambda instance: instance.tags.get("OwnerEmail"))
+
+_status_record_types = dict()
+
+
+def instance_status(instance):
+    """Returns the status of an ec2 ``instance`` as reported by `WolphinProject.status`"""
+
+    return AttributeDict((field, STATUS_GETTERS[field](instance)) for field in STATUS_FIELDS)
+
+
+def status_record_type(fields, known=STATUS_FIELDS):
+    """
+    Returns the record type of statuses made of the ``fields`` only: a namedtuple, which keeps no
+    per record dict.
+    """
+
+    fields = tuple(fields)
+    unknown = [field for field in fields if field not in known]
+    if unknown or not fields:
+        raise WolphinException("Unknown status fields: {}, the known ones are: {}."
+                               .format(", ".join(unknown) or "none given", ", ".join(known)))
+    if fields not in _status_record_types:
+        _status_record_types[fields] = namedtuple('InstanceStatus', fields)
+    return _status_record_types[fields]
+
+
+def snapshot_status(record, tags, state_code, stale):
+    """Returns the status of an instance as last recorded in a snapshot, see `instance_status`"""
+
+    return AttributeDict(id=record.id,
+                         project_name=tags["ProjectName"],
+                         name=tags["Name"],
+                         state_code=state_code,
+                         state=record.state,
+                         public_dns_name=None,
+                         public_ip_address=record.ip_address,
+                         private_dns_name=None,
+                         private_ip_address=record.private_ip_address,
+                         ami_id=None,
+                         instance_type=None,
+                         placement=None,
+                         ssh_key_name=None,
+                         security_groups=[],
+                         launch_time=None,
+                         owner_email=None,
+                         last_seen=record.last_seen,
+                         stale=stale)
+
+
+def print_status(instance_infos):
+
+    if instance_infos is not None:
+        color_table = ColorTable('Instance',
+                                 'State',
+                                 'Public',
+                                 'SSHKey',
+                                 'SecurityGroups',
+                                 'Zone',
+                                 'Contact')
+        for instance_info in instance_infos:
+            color_table.add(Instance="{}|{}".format(instance_info.id, instance_info.name,),
+                            State=_format_state(instance_info),
+                            Public="{}|{}".format(instance_info.public_dns_name or "",
+                                                  instance_info.public_ip_address),
+                            SSHKey=instance_info.ssh_key_name or "",
+                            SecurityGroups=", ".join(g.name for g in instance_info.security_groups),
+                            Zone=instance_info.placement or "",
+                            Contact=instance_info.owner_email or "")
+
+        print color_table
+
+
+def _format_state(instance_info):
+    state = "{}|{}".format(instance_info.state_code, instance_info.state)
+    if instance_info.get("last_seen") is None:
+        return state
+    age = int(time() - instance_info.last_seen)
+    age = "{}m".format(age // 60) if age >= 60 else "{}s".format(age)
+    return "{} (seen {} ago{})".format(state, age, ", stale" if instance_info.stale else "")
@@ -0,0 +1,223 @@
+"""
+Idempotent provisioning of the instances of a wolphin project, as named steps.
+
+Every `class:wolphin.steps.Step` has a fingerprint: the sha256 of its name, command, inputs, the
+content of its files and the fingerprints of the steps it requires. Once a step succeeded on a
+host, its fingerprint is recorded there, under ``~/.wolphin/steps``; provisioning the host again
+skips the steps whose recorded fingerprint matches. A changed step changes the fingerprints of all
+the steps requiring it, directly or not, so that they run again as well.
+
+Hosts are provisioned concurrently, and a host that is up to date costs a single ssh command.
+"""
+
+import hashlib
+import pipes
+import re
+from collections import namedtuple
+from time import time
+
+from wolphin.deploy import Bundle, deploy_to_host
+from wolphin.exceptions import StepError
+
+
+# the directory, relative to the home of the user wolphin logs in as, of the steps' fingerprints.
+STEPS_DIR = ".wolphin/steps"
+
+_STEP_NAME = re.compile(r"^[\w.-]+$")
+
+# the outcome of every step on a host, by name: 'ran', 'skipped', 'failed' or 'blocked' (not run
+# as an earlier step failed).
+HostProvisioning = namedtuple('HostProvisioning', ['host', 'outcomes', 'seconds', 'error'])
+
+
+class Step(object):
+    """A named shell ``command`` run on every host, once per fingerprint"""
+
+    def __init__(self, name, command, inputs=(), files=(), requires=()):
+        """
+        :param name: the step's unique name, letters, digits, '.', '_' and '-' only.
+        :param command: the shell command of the step, run in its directory on the host,
+         ``~/.wolphin/steps/<name>``.
+        :param inputs: (optional) strings the command depends on, e.g. the version of what it
+         installs, which are part of the step's fingerprint.
+        :param files: (optional) local files and directories the command uses, deployed to the
+         step's directory before it runs; their content is part of the step's fingerprint.
+        :param requires: (optional) the names of the steps to run before this one.
+        """
+
+        if not _STEP_NAME.match(name):
+            raise StepError("Invalid step name: '{}'.".format(name))
+        self.name = name
+        self.command = command
+        self.inputs = list(inputs)
+        self.files = list(files)
+        self.requires = list(requires)
+
+    @property
+    def directory(self):
+        return "{}/{}".format(STEPS_DIR, self.name)
+
+    def __repr__(self):
+        return "Step({})".format(self.name)
+
+
+def in_order(steps):
+    """
+    Returns the ``steps`` ordered so that every step comes after the steps it requires, otherwise
+    in the order given; raises a `class:wolphin.exceptions.StepError` if they cannot be.
+    """
+
+    by_name = dict()
+    for step in steps:
+        if step.name in by_name:
+            raise StepError("Duplicate step: '{}'.".format(step.name))
+        by_name[step.name] = step
+
+    ordered, visiting, visited = [], set(), set()
+
+    def _visit(step):
+        if step.name in visited:
+            return
+        if step.name in visiting:
+            raise StepError("Steps require each other: '{}'.".format(step.name))
+        visiting.add(step.name)
+        for name in step.requires:
+            if name not in by_name:
+                raise StepError("'{}' requires an unknown step: '{}'.".format(step.name, name))
+            _visit(by_name[name])
+        visiting.discard(step.name)
+        visited.add(step.name)
+        ordered.append(step)
+
+    for step in steps:
+        _visit(step)
+    return ordered
+
+
+def fingerprints(steps, bundles):
+    """
+    Returns the fingerprint of each of the ``steps`` (already `func:wolphin.steps.in_order`), by
+    name, given the `class:wolphin.deploy.Bundle` of the files of each of them, by name.
+    """
+
+    fingerprints = dict()
+    for step in steps:
+        fingerprint = hashlib.sha256()
+        for part in ([step.name, step.command] + step.inputs +
+                     [bundles[step.name].sha256 if step.name in bundles else ""] +
+                     [fingerprints[name] for name in step.requires]):
+            part = str(part)
+            fingerprint.update("{}\0".format(len(part)))
+            fingerprint.update(part)
+        fingerprints[step.name] = fingerprint.hexdigest()
+    return fingerprints
+
+
+class ProvisionReport(object):
+    """The outcome of provisioning: the outcome of every step on every host"""
+
+    def __init__(self, provisionings, duration):
+        self.provisionings = provisionings
+        self.duration = duration
+
+    def count(self, outcome):
+        """Returns the number of steps, over all the hosts, with ``outcome``, e.g. 'ran'"""
+        return sum(provisioning.outcomes.values().count(outcome)
+                   for provisioning in self.provisionings.itervalues())
+
+    @property
+    def failed(self):
+        return dict((host, provisioning.error)
+                    for host, provisioning in self.provisionings.iteritems()
+                    if provisioning.error is not None)
+
+    def as_dict(self):
+        return dict(duration=self.duration,
+                    hosts=[dict(provisioning._asdict(),
+                                error=str(provisioning.error) if provisioning.error else None)
+                           for _, provisioning in sorted(self.provisionings.iteritems())])
+
+    def __str__(self):
+        lines = ["[{}] error: {}".format(host, error)
+                 for host, error in sorted(self.failed.iteritems())]
+        lines.append("{} hosts, {} steps ran, {} skipped, {} failed, {} blocked in {:.1f}s"
+                     .format(len(self.provisionings),
+                             self.count('ran'),
+                             self.count('skipped'),
+                             self.count('failed'),
+                             self.count('blocked'),
+                             self.duration))
+        return "\n".join(lines)
+
+
+def provision(ssh, hosts, steps, clock=time):
+    """
+    Runs the ``steps`` whose fingerprint changed on all the ``hosts`` concurrently, through the
+    `class:wolphin.ssh.SSHPool` ``ssh``; returns a `class:wolphin.steps.ProvisionReport`.
+    """
+
+    started = clock()
+    steps = in_order(steps)
+    bundles = dict((step.name, Bundle(step.files)) for step in steps if step.files)
+    try:
+        step_fingerprints = fingerprints(steps, bundles)
+        results = ssh.map(lambda host: _provision_host(ssh, host, steps, step_fingerprints,
+                                                       bundles, clock),
+                          hosts)
+    finally:
+        for bundle in bundles.itervalues():
+            bundle.close()
+
+    provisionings = dict((host, result if not isinstance(result, Exception)
+                          else HostProvisioning(host, dict(), 0, result))
+                         for host, result in results.iteritems())
+    return ProvisionReport(provisionings, clock() - started)
+
+
+def _provision_host(ssh, host, steps, step_fingerprints, bundles, clock):
+    started = clock()
+    recorded = _recorded_fingerprints(ssh, host)
+
+    outcomes = dict()
+    error = None
+    for step in steps:
+        if error is not None:
+            outcomes[step.name] = 'blocked'
+            continue
+        if recorded.get(step.name) == step_fingerprints[step.name]:
+            outcomes[step.name] = 'skipped'
+            continue
+
+        if step.name in bundles:
+            deploy_to_host(ssh, bundles[step.name], host, step.directory)
+        error = _run_step(ssh, host, step, step_fingerprints[step.name])
+        outcomes[step.name] = 'ran' if error is None else 'failed'
+
+    return HostProvisioning(host, outcomes, clock() - started, error)
+
+
+def _recorded_fingerprints(ssh, host):
+    """Returns the fingerprints of the steps recorded on ``host``, by name, with one command"""
+
+    result = ssh.run(host, "cat {}/*.fingerprint 2>/dev/null".format(STEPS_DIR))
+    return dict(line.split(None, 1) for line in result.stdout.splitlines() if " " in line)
+
+
+def _run_step(ssh, host, step, fingerprint):
+    """Runs ``step`` on ``host`` and records its ``fingerprint``; returns the error, if any"""
+
+    directory = pipes.quote(step.directory)
+    result = ssh.run(host, "mkdir -p {directory} && cd {directory} && ({command})"
+                           .format(directory=directory, command=step.command))
+    if not result.succeeded:
+        return StepError("{}: step '{}' failed with exit status {}: {}"
+                         .format(host, step.name, result.exit_status, result.stderr.strip()))
+
+    # the fingerprint is recorded with the step's name, so that all of them are read at once.
+    result = ssh.run(host, "echo {} {} > {}/{}.fingerprint".format(step.name, fingerprint,
+                                                                   STEPS_DIR, step.name))
+    if not result.succeeded:
+        # the step would run again every time.
+        return StepError("{}: step '{}' ran but its fingerprint could not be recorded: {}"
+                         .format(host, step.name, result.stderr.strip()))
+    return None
@@ -0,0 +1,52 @@
+"""
+Detecting the instances that take far longer than the rest of their fleet to be ready, e.g. stuck
+pending or never answering ssh, so that wolphin can start a replacement for them speculatively
+rather than hold the whole fleet until it times out.
+"""
+
+from math import ceil
+from time import time
+
+
+# the percentile of the time the fleet took to be ready that stragglers are compared with.
+STRAGGLER_PERCENTILE = 90
+
+
+class StragglerDetector(object):
+    """
+    Tracks when instances, by key (e.g. instance number), were requested and became ready. Once
+    ``percentile`` percent of them are ready, an instance that is not yet is a straggler if it has
+    been waited on for more than ``factor`` times the time that took.
+    """
+
+    def __init__(self, factor, percentile=STRAGGLER_PERCENTILE, clock=time):
+        self.factor = factor
+        self.percentile = percentile
+        self.clock = clock
+        self.requested = dict()
+        self.ready = dict()
+
+    def request(self, key):
+        self.requested.setdefault(key, self.clock())
+
+    def done(self, key):
+        self.ready.setdefault(key, self.clock() - self.requested[key])
+
+    @property
+    def threshold(self):
+        """The seconds beyond which an instance is a straggler, None until enough are ready"""
+
+        needed = int(ceil(len(self.requested) * self.percentile / 100.0))
+        if not needed or len(self.ready) < needed:
+            return None
+        return self.factor * sorted(self.ready.itervalues())[needed - 1]
+
+    def stragglers(self):
+        """Returns the keys of the stragglers, in order"""
+
+        threshold = self.threshold
+        if threshold is None:
+            return []
+        now = self.clock()
+        return sorted(key for key, requested in self.requested.iteritems()
+                      if key not in self.ready and now - requested > threshold)
@@ -0,0 +1,246 @@
+"""
+Resource telemetry of the instances of a wolphin project while they run, e.g. load generators,
+to tell when they are the bottleneck rather than what they test.
+
+Every poll reads the kernel's counters (``/proc/stat``, ``/proc/loadavg``, ``/proc/meminfo`` and
+``/proc/net/dev``) of all the hosts concurrently, with a single ``cat`` per host over the project's
+pooled ssh connections, so nothing needs to be installed on them. The CPU and network figures of a
+sample are rates since the previous poll. Each host keeps its last samples only, in a ring buffer,
+and is saturated while its last ``SATURATION_SAMPLES`` samples are all over a threshold.
+"""
+
+import threading
+from collections import deque, namedtuple
+from itertools import count
+from time import sleep, strftime, time
+
+from gusset.colortable import ColorTable
+
+
+# the samples kept per host, e.g. an hour's worth of polls every 5 seconds.
+CAPACITY = 720
+
+# the thresholds of the saturation of a host: its CPU usage and memory used, as fractions, and its
+# load average per CPU.
+THRESHOLDS = dict(cpu=0.9, load=1.0, memory=0.9)
+
+# the consecutive samples over a threshold that a host is saturated after, so that a single spike
+# does not count.
+SATURATION_SAMPLES = 3
+
+_COMMAND = "cat /proc/uptime /proc/stat /proc/loadavg /proc/meminfo /proc/net/dev"
+
+# the counters of a host at a point of its uptime, in seconds.
+Counters = namedtuple('Counters', ['uptime', 'cpu_total', 'cpu_idle', 'cpus', 'load',
+                                   'memory_total', 'memory_available', 'rx_bytes', 'tx_bytes'])
+
+# ``cpu`` and ``memory`` are the fractions used, ``load`` the 1 minute load average per CPU and
+# ``rx`` and ``tx`` the bytes per second received and sent, over all the interfaces but loopback.
+Sample = namedtuple('Sample', ['time', 'cpu', 'load', 'memory', 'rx', 'tx'])
+
+
+def parse_counters(text):
+    """Returns the `class:wolphin.telemetry.Counters` in the output of the telemetry command"""
+
+    lines = text.splitlines()
+    uptime = float(lines[0].split()[0])
+    cpu_total = cpu_idle = cpus = load = memory_total = memory_available = 0
+    rx_bytes = tx_bytes = 0
+    for line in lines[1:]:
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "cpu":
+            ticks = [int(field) for field in fields[1:]]
+            cpu_total = sum(ticks[:8])
+            # idle and iowait.
+            cpu_idle = sum(ticks[3:5])
+        elif fields[0].startswith("cpu"):
+            cpus += 1
+        elif len(fields) == 5 and "/" in fields[3]:
+            load = float(fields[0])
+        elif fields[0] == "MemTotal:":
+            memory_total = int(fields[1])
+        elif fields[0] == "MemAvailable:":
+            memory_available = int(fields[1])
+        elif ":" in line and "|" not in line:
+            interface, counters = line.split(":", 1)
+            counters = counters.split()
+            if interface.strip() != "lo" and len(counters) >= 9:
+                rx_bytes += int(counters[0])
+                tx_bytes += int(counters[8])
+    return Counters(uptime, cpu_total, cpu_idle, max(cpus, 1), load, memory_total,
+                    memory_available, rx_bytes, tx_bytes)
+
+
+def sample(previous, current, timestamp):
+    """Returns the `class:wolphin.telemetry.Sample` of a host between two of its counters"""
+
+    elapsed = current.uptime - previous.uptime
+    ticks = current.cpu_total - previous.cpu_total
+    return Sample(timestamp,
+                  1 - float(current.cpu_idle - previous.cpu_idle) / ticks if ticks > 0 else 0.0,
+                  current.load / current.cpus,
+                  (1 - float(current.memory_available) / current.memory_total
+                   if current.memory_total else 0.0),
+                  (current.rx_bytes - previous.rx_bytes) / elapsed if elapsed > 0 else 0.0,
+                  (current.tx_bytes - previous.tx_bytes) / elapsed if elapsed > 0 else 0.0)
+
+
+class HostTelemetry(object):
+    """The last ``capacity`` samples of a host, and the error of its last poll, if any"""
+
+    def __init__(self, host, capacity=CAPACITY):
+        self.host = host
+        self.samples = deque(maxlen=capacity)
+        self.counters = None
+        self.error = None
+
+    def add(self, counters, timestamp):
+        """Adds the sample since the previous ``counters``, if any; returns it"""
+
+        previous, self.counters = self.counters, counters
+        self.error = None
+        if previous is None or counters.uptime <= previous.uptime:
+            # the first poll, or the host rebooted.
+            return None
+        self.samples.append(sample(previous, counters, timestamp))
+        return self.samples[-1]
+
+    def saturated(self, thresholds=THRESHOLDS):
+        """Returns the resources, e.g. 'cpu', the last samples of the host are all over"""
+
+        if len(self.samples) < SATURATION_SAMPLES:
+            return []
+        last = list(self.samples)[-SATURATION_SAMPLES:]
+        return [resource for resource, threshold in sorted(thresholds.iteritems())
+                if all(getattr(each, resource) > threshold for each in last)]
+
+
+class FleetTelemetry(object):
+    """
+    Polls the resources of ``hosts`` through the `class:wolphin.ssh.SSHPool` ``ssh``, either
+    ``watch``\\ ed or in the background, between ``start`` and ``stop``. ``on_saturated`` is
+    called with a host and its saturated resources whenever a host becomes saturated.
+    """
+
+    def __init__(self, ssh, hosts, capacity=CAPACITY, thresholds=None, on_saturated=None,
+                 clock=time):
+        self.ssh = ssh
+        self.hosts = dict((host, HostTelemetry(host, capacity)) for host in hosts)
+        self.thresholds = thresholds or THRESHOLDS
+        self.on_saturated = on_saturated
+        self.clock = clock
+        self.polls = 0
+        self.lock = threading.Lock()
+        self._saturated = dict()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """Samples all the hosts once, concurrently; returns the hosts that became saturated"""
+
+        timestamp = self.clock()
+        results = self.ssh.map(lambda host: self.ssh.run(host, _COMMAND), list(self.hosts))
+        newly_saturated = dict()
+        with self.lock:
+            for host, result in results.iteritems():
+                telemetry = self.hosts[host]
+                if isinstance(result, Exception):
+                    telemetry.error = result
+                    continue
+                if not result.succeeded:
+                    telemetry.error = result.stderr.strip()
+                    continue
+                try:
+                    telemetry.add(parse_counters(result.stdout), timestamp)
+                except (ValueError, IndexError) as error:
+                    telemetry.error = "unreadable counters: {}".format(error)
+                    continue
+
+                saturated = telemetry.saturated(self.thresholds)
+                if saturated and not self._saturated.get(host):
+                    newly_saturated[host] = saturated
+                self._saturated[host] = saturated
+            self.polls += 1
+
+        if self.on_saturated:
+            for host, resources in sorted(newly_saturated.iteritems()):
+                self.on_saturated(host, resources)
+        return newly_saturated
+
+    def watch(self, interval, ticks=None):
+        """Polls every ``interval`` seconds, ``ticks`` times or forever; yields after every poll"""
+
+        for tick in (count() if ticks is None else xrange(ticks)):
+            if tick:
+                sleep(interval)
+            yield self.poll()
+
+    def start(self, interval=5):
+        """Polls every ``interval`` seconds in the background until stopped"""
+
+        def _poll():
+            while not self._stopped.is_set():
+                self.poll()
+                self._stopped.wait(interval)
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=_poll, name="wolphin-telemetry")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def saturated(self):
+        """The hosts currently saturated, with their saturated resources"""
+
+        with self.lock:
+            return dict((host, resources) for host, resources in self._saturated.iteritems()
+                        if resources)
+
+    def as_dict(self):
+        with self.lock:
+            return dict(polls=self.polls,
+                        hosts=[dict(host=host,
+                                    saturated=self._saturated.get(host, []),
+                                    error=str(telemetry.error) if telemetry.error else None,
+                                    samples=[each._asdict() for each in telemetry.samples])
+                               for host, telemetry in sorted(self.hosts.iteritems())])
+
+    def __str__(self):
+        table = ColorTable('host', 'cpu', 'load', 'memory', 'rx', 'tx', 'saturated')
+        with self.lock:
+            for host, telemetry in sorted(self.hosts.iteritems()):
+                if telemetry.error is not None or not telemetry.samples:
+                    table.add(host=host, cpu="-", load="-", memory="-", rx="-", tx="-",
+                              saturated=str(telemetry.error or "-"))
+                    continue
+                last = telemetry.samples[-1]
+                table.add(host=host,
+                          cpu="{:.0%}".format(last.cpu),
+                          load="{:.2f}".format(last.load),
+                          memory="{:.0%}".format(last.memory),
+                          rx=_per_second(last.rx),
+                          tx=_per_second(last.tx),
+                          saturated=", ".join(self._saturated.get(host, [])) or "-")
+            saturated = len([host for host in self._saturated if self._saturated[host]])
+        return "{}\n{} hosts, {} saturated".format(table, len(self.hosts), saturated)
+
+
+def print_saturated(host, resources):
+    """Prints that ``host`` became saturated, e.g. as the ``on_saturated`` of a FleetTelemetry"""
+    print "{} {} saturated: {}".format(strftime("%H:%M:%S"), host, ", ".join(resources))
+
+
+def _per_second(rate):
+    for unit in ("B", "KB", "MB"):
+        if rate < 1024:
+            return "{:.1f}{}/s".format(rate, unit)
+        rate /= 1024.0
+    return "{:.1f}GB/s".format(rate)
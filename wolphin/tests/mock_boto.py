@@ -22,7 +22,7 @@ class MockEC2Connection(object):
 
     def get_non_terminated_instances(self):
         instances = []
-        for k, v in self.INSTANCES.iteritems():
+        for k, v in self.INSTANCES.items():
             if v.state_code != 48:
                 instances.append(v)
         return instances
@@ -34,7 +34,8 @@ class MockEC2Connection(object):
                       key_name=None,
                       security_groups=None,
                       instance_type=None,
-                      placement=None):
+                      placement=None,
+                      user_data=None):
         if not 1 <= int(min_count) <= int(max_count):
             raise EC2ResponseError(status=400,
                                    reason="InvalidParameters",
@@ -64,6 +65,8 @@ class MockEC2Connection(object):
                                 security_groups=security_groups,
                                 instance_type=instance_type,
                                 placement=placement)
+            instance.user_data = user_data
+            instance.ami_launch_index = str(x)
             self.INSTANCES[instance.id] = instance
             instances.append(instance)
 
@@ -73,21 +76,47 @@ class MockEC2Connection(object):
         for k, v in tags_dict.iteritems():
             self.INSTANCES[instance_id].tags[k] = v
 
-    def get_all_instances(self, filters):
+    def delete_tags(self, resource_ids, tags):
+        for resource_id in resource_ids:
+            for k in tags:
+                self.INSTANCES[resource_id].tags.pop(k, None)
+
+    def get_all_instances(self, instance_ids=None, filters=None):
         instances = []
-        if filters is None:
-            instances = self.INSTANCES
-        for instance_id, instance in self.INSTANCES.iteritems():
-            add_instance = False
-            for k, v in filters.iteritems():
-                k = k.split(":")[1]
-                if k in instance.tags and instance.tags[k] == v:
-                    add_instance = True
-                    break
-            if add_instance:
+        # a copy, as the roles of a project reserve instances concurrently.
+        for instance_id, instance in self.INSTANCES.items():
+            if instance_ids is not None and instance_id not in instance_ids:
+                continue
+            if all(self._matches(instance, k, v) for k, v in (filters or {}).iteritems()):
                 instances.append(instance)
+        if instance_ids is not None and len(instances) < len(set(instance_ids)):
+            raise EC2ResponseError(status=400,
+                                   reason="InvalidInstanceID.NotFound",
+                                   body="InvalidInstanceID.NotFound: unknown instance ids")
         return [Reservation(instances)]
 
+    def get_all_reservations(self, instance_ids=None, filters=None, max_results=None,
+                             next_token=None):
+        instances = self.get_all_instances(instance_ids, filters)[0].instances
+        start = int(next_token or 0)
+        end = start + max_results if max_results else len(instances)
+        page = ResultSet([Reservation(instances[start:end])])
+        page.next_token = str(end) if end < len(instances) else None
+        return page
+
+    def _matches(self, instance, name, value):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        if name == "instance-state-name":
+            return instance.state in values
+        if name == "instance-state-code":
+            return str(instance.state_code) in [str(code) for code in values]
+        name = name.split(":")[1]
+        return name in instance.tags and instance.tags[name] in values
+
+
+class ResultSet(list):
+    next_token = None
+
 
 class Group(object):
     def __init__(self, name):
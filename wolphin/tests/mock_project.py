@@ -0,0 +1,22 @@
+"""Projects on a `class:wolphin.tests.mock_boto.MockEC2Connection`, for the tests"""
+
+from mock import Mock, patch
+
+from wolphin.project import WolphinProject
+
+
+def mock_project(config, conn, wait_for_ssh=False, **kwargs):
+    """
+    Returns a new `class:wolphin.project.WolphinProject` of ``config`` on the mock ec2 ``conn``,
+    which neither throttles nor needs the configuration to be valid; the instances are not waited
+    for to be reachable over ssh unless ``wait_for_ssh``. The ``kwargs`` are passed on to
+    `func:wolphin.project.WolphinProject.new`, e.g. the ``tracer``.
+    """
+
+    config.ec2_describe_rate = config.ec2_mutate_rate = 100000
+    config.validate = Mock()
+    with patch('wolphin.project.connect_to_region', Mock(return_value=conn)):
+        project = WolphinProject.new(config, **kwargs)
+    if not wait_for_ssh:
+        project._wait_for_ssh = Mock()
+    return project
@@ -0,0 +1,46 @@
+"""Mocks the hosts reached through an `class:wolphin.ssh.SSHPool`"""
+
+from StringIO import StringIO
+
+from mock import Mock
+
+from wolphin.ssh import CommandResult
+
+
+class MockHosts(object):
+    """
+    Hosts reached through an `class:wolphin.ssh.SSHPool`, whose commands and file transfers are
+    emulated by ``run``, ``put`` and ``open``: by default every command succeeds without output,
+    and the files put and opened are recorded. The commands run are kept in ``commands``.
+    """
+
+    def __init__(self, pool):
+        self.commands = []
+        self.uploads = []
+        self.opened = []
+        pool.run = Mock(side_effect=self._run)
+        pool.open_sftp = Mock(side_effect=self._open_sftp)
+
+    def _run(self, host, command):
+        self.commands.append(command)
+        return self.run(host, command)
+
+    def _open_sftp(self, host):
+        return Mock(put=lambda local_path, remote_path: self.put(host, local_path, remote_path),
+                    open=lambda remote_path, mode: self.open(host, remote_path, mode))
+
+    def run(self, host, command):
+        """Returns the `class:wolphin.ssh.CommandResult` of ``command`` run on ``host``."""
+
+        return CommandResult(host, 0, "", "")
+
+    def put(self, host, local_path, remote_path):
+        """Uploads ``local_path`` to ``remote_path`` on ``host``."""
+
+        self.uploads.append(host)
+
+    def open(self, host, remote_path, mode):
+        """Returns the file at ``remote_path`` on ``host``, opened in ``mode``; empty by default."""
+
+        self.opened.append((host, remote_path))
+        return StringIO()
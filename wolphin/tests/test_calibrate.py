@@ -0,0 +1,116 @@
+import re
+
+from nose.tools import eq_, ok_
+
+from wolphin.calibrate import (BENCHMARK_BYTES, MEMORY_BYTES, SCORE_TAG, calibrate,
+                               robust_outliers)
+from wolphin.config import Configuration
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.tests.mock_ssh import MockHosts
+
+
+class BenchmarkedHosts(MockHosts):
+    """Hosts taking ``seconds`` at every benchmark (1 by default), by host and benchmark"""
+
+    def __init__(self, pool, private_ips):
+        self.private_ips = private_ips
+        self.seconds = dict()
+        self.served = set()
+        self.stopped = dict()
+        self.downloads = dict()
+        MockHosts.__init__(self, pool)
+
+    def _seconds(self, host, benchmark):
+        return self.seconds.get((host, benchmark), 1.0)
+
+    def run(self, host, command):
+        if "echo cpu" in command:
+            if "http.server 8701 --bind {}".format(self.private_ips[host]) in command:
+                self.served.add(host)
+            return CommandResult(host, 0, "cpu 100.0 {}\nmemory 200.0 {}\n"
+                                          .format(100 + self._seconds(host, 'cpu'),
+                                                  200 + self._seconds(host, 'memory')), "")
+        download = re.search(r"http://([\d.]+):8701/benchmark", command)
+        if download:
+            ok_(download.group(1) in self.private_ips.values())
+            self.downloads[host] = download.group(1)
+            return CommandResult(host, 0, "{} {:.3f}".format(BENCHMARK_BYTES,
+                                                             self._seconds(host, 'network')), "")
+        if " kill " in command:
+            self.stopped[host] = command
+        return MockHosts.run(self, host, command)
+
+
+class TestCalibrate(object):
+    """Tests for calibrating the hosts of a fleet"""
+
+    def setUp(self):
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=4)
+        self.private_ips = dict(("10.0.0.{}".format(n), "172.16.0.{}".format(n))
+                                for n in range(1, 11))
+        self.remote = BenchmarkedHosts(self.pool, self.private_ips)
+
+    def test_robust_outliers(self):
+        scores = dict(("host{}".format(n), 100 + n % 3) for n in range(20))
+        eq_([], robust_outliers(scores))
+        scores["slow"] = 60
+        # faster than the others is fine.
+        scores["fast"] = 200
+        eq_(["slow"], robust_outliers(scores))
+        # not outliers when the scores vary a lot anyway.
+        eq_([], robust_outliers(dict(a=10, b=100, c=50, d=30, e=70)))
+
+    def test_all_the_hosts_are_benchmarked(self):
+        report = calibrate(self.pool, self.private_ips)
+        eq_({}, report.failed)
+        eq_(256.0, report.median('cpu'))
+        eq_(MEMORY_BYTES / (1024.0 * 1024), report.median('memory'))
+        eq_(256.0, report.median('network'))
+        eq_({}, report.outliers)
+        eq_(set(self.private_ips), self.remote.served)
+        # the servers are stopped and the staged benchmark file removed.
+        cleanup = ("test -f /tmp/wolphin-calibrate.pid && kill $(cat /tmp/wolphin-calibrate.pid); "
+                   "rm -rf /tmp/wolphin-calibrate /tmp/wolphin-calibrate.pid")
+        eq_(dict((host, cleanup) for host in self.private_ips), self.remote.stopped)
+        # every host downloads from another one.
+        eq_(set(self.private_ips.values()), set(self.remote.downloads.values()))
+        ok_(all(self.private_ips[host] != source
+                for host, source in self.remote.downloads.iteritems()))
+        eq_({SCORE_TAG.format('cpu'): "256.0",
+             SCORE_TAG.format('memory'): "4096.0",
+             SCORE_TAG.format('network'): "256.0"}, report.tags("10.0.0.1"))
+        ok_("10 hosts, medians cpu 256.0, memory 4096.0, network 256.0, 0 outliers"
+            in str(report))
+
+    def test_slow_hosts_are_outliers(self):
+        self.remote.seconds[("10.0.0.3", 'cpu')] = 2.0
+        self.remote.seconds[("10.0.0.7", 'network')] = 1.5
+        self.remote.seconds[("10.0.0.7", 'memory')] = 1.1
+        report = calibrate(self.pool, self.private_ips)
+        eq_({"10.0.0.3": ['cpu'], "10.0.0.7": ['network']}, report.outliers)
+
+    def test_project_stores_scores_and_replaces_outliers(self):
+        config = Configuration(project="test_project", min_instance_count=4, max_instance_count=4,
+                               max_wait_duration=0)
+        conn = MockEC2Connection()
+        project = mock_project(config, conn)
+        project.create()
+        project._ssh = self.pool
+        instances = sorted(conn.INSTANCES.values(), key=lambda instance: instance.tags["Name"])
+        for number, instance in enumerate(instances, 1):
+            instance.ip_address = "10.0.0.{}".format(number)
+            instance.private_ip_address = "172.16.0.{}".format(number)
+        self.remote.seconds[("10.0.0.2", 'cpu')] = 3.0
+
+        report = project.calibrate(replace_outliers=True)
+        eq_({"10.0.0.2": ['cpu']}, report.outliers)
+        eq_(["wolphin.test_project.2"], report.replaced)
+        eq_("256.0", instances[0].tags[SCORE_TAG.format('cpu')])
+        eq_('terminated', instances[1].state)
+        replacements = [instance for instance in conn.INSTANCES.values()
+                        if instance.tags.get("Name") == "wolphin.test_project.2" and
+                        instance.state != 'terminated']
+        eq_(1, len(replacements))
+        ok_("(1 replaced)" in str(report))
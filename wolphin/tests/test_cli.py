@@ -0,0 +1,115 @@
+import shutil
+import subprocess
+import sys
+import tempfile
+from os.path import join
+from time import time
+
+from nose.tools import eq_, ok_
+
+
+# modules that are slow to import and must only be imported by the commands that need them.
+HEAVY_MODULES = ['boto', 'fabric', 'paramiko', 'gusset']
+
+# modules of the features only some commands use, imported by the project when they are used.
+FEATURE_MODULES = ['wolphin.calibrate', 'wolphin.collect', 'wolphin.deploy', 'wolphin.histogram',
+                   'wolphin.launch', 'wolphin.readiness', 'wolphin.snapshot', 'wolphin.steps',
+                   'wolphin.telemetry', 'wolphin.user_data']
+
+STATUS_COMMAND = """
+import sys
+from time import time
+from mock import patch
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin import cli
+
+start = time()
+with patch('wolphin.config.Configuration.validate'):
+    with patch('boto.ec2.connect_to_region', return_value=MockEC2Connection()):
+        cli.main(['status', '-p', 'test', '--email', 'a@a.com'])
+sys.stderr.write("{} {}".format(time() - start, 'paramiko' in sys.modules))
+"""
+
+CACHED_STATUS_COMMAND = """
+import sys
+from time import time
+from mock import patch
+from wolphin import cli
+
+start = time()
+with patch('wolphin.config.Configuration.validate'):
+    with patch('boto.ec2.connect_to_region', side_effect=AssertionError("connected to ec2")):
+        cli.main(['status', '--cached', '-c', sys.argv[1]])
+sys.stderr.write("{}".format(time() - start))
+"""
+
+
+def _python(code, *args):
+    process = subprocess.Popen([sys.executable, "-W", "ignore", "-c", code] + list(args),
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    eq_(0, process.returncode, err)
+    return out, err
+
+
+class TestCommandLine(object):
+    """Tests for the wolphin command"""
+
+    def test_cli_module_is_light(self):
+        out, _ = _python("import sys, wolphin.cli; "
+                         "print ','.join(m for m in sys.modules if m.split('.')[0] in {})"
+                         .format(HEAVY_MODULES))
+        eq_("", out.strip())
+
+    def test_project_imports_features_when_used(self):
+        out, _ = _python("import sys, wolphin.project; "
+                         "print ','.join(m for m in sys.modules if m in {})"
+                         .format(FEATURE_MODULES))
+        eq_("", out.strip())
+
+    def test_daemon_client_does_not_import_boto(self):
+        out, _ = _python("import sys; "
+                         "from wolphin.daemon import DaemonClient; "
+                         "from wolphin.status import print_status; "
+                         "print ','.join(m for m in sys.modules if m.split('.')[0] == 'boto')")
+        eq_("", out.strip())
+
+    def test_help_is_fast(self):
+        start = time()
+        out, _ = _python("from wolphin.cli import main; main(['--help'])")
+        ok_(time() - start < 1, "wolphin --help took {} secs.".format(time() - start))
+        ok_("usage: wolphin" in out)
+
+    def test_status_does_not_import_ssh(self):
+        out, err = _python(STATUS_COMMAND)
+        duration, ssh_imported = err.strip().split("\n")[-1].split()
+        ok_(float(duration) < 1, "wolphin status took {} secs.".format(duration))
+        eq_("False", ssh_imported)
+        ok_("Instance" in out)
+
+    def test_cached_status_is_fast_and_does_not_connect(self):
+        from wolphin.snapshot import InventorySnapshot, SnapshotRecord
+
+        snapshot_dir = tempfile.mkdtemp()
+        try:
+            snapshot = InventorySnapshot(join(snapshot_dir, "test.snapshot"))
+            now = time()
+            for number in range(1, 1001):
+                record = SnapshotRecord("i-{}".format(number), number, "running",
+                                        "10.0.0.1", "1.1.1.1", now - number, None)
+                snapshot.records[record.id] = record
+            snapshot.save()
+            config_file = join(snapshot_dir, "wolphin.conf")
+            with open(config_file, "w") as config:
+                config.write("project = test\nemail = a@a.com\nsnapshot_dir = {}\n"
+                             .format(snapshot_dir))
+
+            out, err = _python(CACHED_STATUS_COMMAND, config_file)
+        finally:
+            shutil.rmtree(snapshot_dir)
+
+        duration = err.strip().split("\n")[-1]
+        ok_(float(duration) < 1, "wolphin status --cached took {} secs.".format(duration))
+        ok_("i-1000|wolphin.test.1000" in out)
+        ok_("seen 16m ago, stale" in out)
@@ -0,0 +1,155 @@
+import hashlib
+import os
+import shutil
+import tarfile
+import tempfile
+from StringIO import StringIO
+from os.path import exists, join
+
+from mock import Mock
+from nose.tools import eq_, ok_
+
+from wolphin.collect import collect, remote_archive, tail
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.tests.mock_ssh import MockHosts
+
+
+class ArchivingHosts(MockHosts):
+    """Hosts whose results are local files"""
+
+    def __init__(self, pool, root, hosts):
+        self.root = root
+        self.archived = []
+        for host in hosts:
+            os.makedirs(join(root, host, "results"))
+            os.makedirs(join(root, host, "tmp"))
+            with open(join(root, host, "results", "latency.csv"), "w") as results:
+                results.write("{},{}\n".format(host, "1" * 10000))
+        MockHosts.__init__(self, pool)
+
+    def path(self, host, remote_path):
+        return join(self.root, host) + remote_path
+
+    def open(self, host, remote_path, mode):
+        return open(self.path(host, remote_path), mode)
+
+    def run(self, host, command):
+        if command.startswith("rm -f"):
+            os.remove(self.path(host, command.split()[-1]))
+            return CommandResult(host, 0, "", "")
+
+        archive = self.path(host, command.split()[2])
+        results = join(self.root, host, "results")
+        if not exists(archive) or any(os.path.getmtime(join(results, name)) >
+                                      os.path.getmtime(archive)
+                                      for name in os.listdir(results)):
+            self.archived.append(host)
+            with tarfile.open(archive, "w:gz") as results:
+                results.add(join(self.root, host, "results"), arcname="results")
+        sha256 = hashlib.sha256(open(archive, "rb").read()).hexdigest()
+        return CommandResult(host, 0, "{}  {}\n".format(sha256, archive), "")
+
+
+class TestCollect(object):
+    """Tests for collecting files from, and following files of, a project's instances"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.local_dir = join(self.directory, "collected")
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=4)
+        self.hosts = ["10.0.0.{}".format(n) for n in range(1, 6)]
+        os.makedirs(join(self.directory, "remote"))
+        self.remote = ArchivingHosts(self.pool, join(self.directory, "remote"), self.hosts)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_collect_into_per_host_directories(self):
+        report = collect(self.pool, self.hosts, "/opt/results/*.csv", self.local_dir)
+        eq_({}, report.failed)
+        for host in self.hosts:
+            ok_(open(join(self.local_dir, host, "results", "latency.csv")).read()
+                .startswith(host + ","))
+        eq_(sorted(os.listdir(self.local_dir)), self.hosts)
+        ok_(report.bytes_received > 0)
+        ok_("5 hosts, 0 failed" in str(report))
+
+    def test_interrupted_collection_is_resumed(self):
+        host = self.hosts[0]
+        # an interrupted collection left the archive on the host and the beginning of it here.
+        archive = remote_archive("/opt/results/*.csv")
+        self.remote.run(host, "test -f {}".format(archive))
+        with open(self.remote.path(host, archive), "rb") as complete:
+            content = complete.read()
+        size = len(content)
+        beginning = content[:size / 2]
+        os.makedirs(self.local_dir)
+        partial_path = join(self.local_dir, "{}.{}.tar.gz.part"
+                            .format(host, hashlib.sha256(content).hexdigest()[:12]))
+        with open(partial_path, "wb") as partial:
+            partial.write(beginning)
+
+        report = collect(self.pool, [host], "/opt/results/*.csv", self.local_dir)
+        eq_({}, report.failed)
+        eq_([host], self.remote.archived)
+        eq_(len(beginning), report.collections[host].resumed_from)
+        eq_(size - len(beginning), report.collections[host].bytes_received)
+        ok_(open(join(self.local_dir, host, "results", "latency.csv")).read()
+            .startswith(host + ","))
+        ok_(not exists(partial_path))
+        # the archive is removed from the host once collected.
+        ok_(not exists(self.remote.path(host, archive)))
+
+    def test_archive_of_changed_files_is_made_again(self):
+        host = self.hosts[0]
+        # an interrupted collection left the archive, and its beginning here; the results changed.
+        archive = remote_archive("/opt/results/*.csv")
+        self.remote.run(host, "test -f {}".format(archive))
+        os.makedirs(self.local_dir)
+        with open(join(self.local_dir, host + ".000000000000.tar.gz.part"), "wb") as partial:
+            partial.write(open(self.remote.path(host, archive), "rb").read(100))
+        results = join(self.remote.root, host, "results", "latency.csv")
+        with open(results, "w") as changed:
+            changed.write("changed\n")
+        os.utime(results, (os.path.getmtime(self.remote.path(host, archive)) + 10,) * 2)
+
+        report = collect(self.pool, [host], "/opt/results/*.csv", self.local_dir)
+        eq_({}, report.failed)
+        eq_([host, host], self.remote.archived)
+        eq_(0, report.collections[host].resumed_from)
+        eq_("changed\n", open(join(self.local_dir, host, "results", "latency.csv")).read())
+        eq_([host], os.listdir(self.local_dir))
+
+    def test_members_outside_of_the_directory_are_not_extracted(self):
+        host = self.hosts[0]
+        archive = self.remote.path(host, remote_archive("/opt/results/*.csv"))
+        with tarfile.open(archive, "w:gz") as results:
+            results.add(join(self.remote.root, host, "results", "latency.csv"),
+                        arcname="../../escaped.csv")
+        report = collect(self.pool, [host], "/opt/results/*.csv", self.local_dir)
+        ok_("outside of its directory: ../../escaped.csv" in str(report.failed[host]))
+        ok_(not exists(join(self.directory, "escaped.csv")))
+        eq_([], os.listdir(self.local_dir))
+
+    def test_failures_are_reported_per_host(self):
+        self.pool.run.side_effect = lambda host, command: CommandResult(host, 2, "",
+                                                                        "No such file")
+        report = collect(self.pool, self.hosts[:2], "/opt/results/*.csv", self.local_dir)
+        eq_(sorted(self.hosts[:2]), sorted(report.failed))
+        ok_("No such file" in str(report))
+
+    def test_tail_interleaves_the_lines_of_all_hosts(self):
+        commands = []
+
+        def client(host):
+            stdout = StringIO("{0} one\n{0} two\n".format(host))
+            stdout.channel = Mock()
+            return Mock(exec_command=lambda command: commands.append(command) or (None, stdout,
+                                                                                   None))
+
+        self.pool.client = Mock(side_effect=client)
+        lines = list(tail(self.pool, self.hosts[:3], "/var/log/test.log"))
+        eq_(6, len(lines))
+        eq_(set(self.hosts[:3]), set(host for host, _ in lines))
+        ok_(("10.0.0.2", "10.0.0.2 two") in lines)
+        eq_(["tail -n 10 -F /var/log/test.log"] * 3, commands)
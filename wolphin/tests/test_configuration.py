@@ -35,7 +35,7 @@ class TestConfiguration(object):
 
             configs = [self._config]
             for k, v in configs[0].__dict__.iteritems():
-                if v:
+                if v and k not in Configuration.OPTIONAL_ATTRIBUTES:
                     new_config = self._config
                     new_config.__dict__[k] = None
                     configs.append(new_config)
@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+import threading
+from os.path import exists, join
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.daemon import DaemonClient, WolphinDaemon
+from wolphin.exceptions import DaemonError
+from wolphin.project import WolphinProject
+from wolphin.ssh import CommandResult
+from wolphin.tests.mock_boto import MockEC2Connection
+
+
+class TestWolphinDaemon(object):
+    """Tests for serving a project through a WolphinDaemon"""
+
+    def setUp(self):
+        config = Configuration(project="test_project", min_instance_count=3, max_instance_count=3)
+        config.max_wait_duration = 0
+        config.validate = Mock()
+        self.project = WolphinProject(config, MockEC2Connection())
+        self.project._wait_for_ssh = Mock()
+        self.project.create()
+
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = join(self.directory, "test.sock")
+        self.daemon = WolphinDaemon(self.project, self.socket_path, refresh_interval=60)
+        self.thread = threading.Thread(target=self.daemon.serve)
+        self.thread.start()
+        self.client = DaemonClient(self.socket_path, timeout=10)
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            self.client.shutdown()
+            self.thread.join(10)
+        shutil.rmtree(self.directory)
+
+    def test_status_is_served_from_the_inventory(self):
+        self.project.conn.get_all_reservations = Mock(side_effect=AssertionError("not warm"))
+        statuses = self.client.status()
+        eq_(3, len(statuses))
+        eq_(set(['running']), set(status.state for status in statuses))
+        eq_(['default'], [group.name for group in statuses[0].security_groups])
+        eq_(1, len(self.client.status(instance_numbers=[2])))
+
+    def test_stop_and_start(self):
+        eq_(set(['stopped']), set(status.state for status in self.client.stop([1, 2])))
+        eq_(['running', 'stopped', 'stopped'],
+            sorted(status.state for status in self.client.status()))
+        eq_(set(['running']), set(status.state for status in self.client.start()))
+
+    def test_exec(self):
+        self.project._ssh = Mock()
+        self.project._ssh.run_all.return_value = {
+            "100.100.100.100": CommandResult("100.100.100.100", 0, "ok\n", "")
+        }
+        results = self.client.execute("uptime", instance_numbers=[1])
+        eq_(0, results["100.100.100.100"]["exit_status"])
+        hosts, command = self.project._ssh.run_all.call_args[0]
+        eq_(["100.100.100.100"], hosts)
+        eq_("uptime", command)
+
+    def test_refreshes_wait_for_operations(self):
+        refreshed = threading.Event()
+        with self.daemon.operation_lock:
+            refresher = threading.Thread(target=lambda: self.daemon.refresh() and refreshed.set())
+            refresher.start()
+            ok_(not refreshed.wait(0.2))
+        refresher.join(10)
+        ok_(refreshed.is_set())
+
+    def test_periodic_refresh_skips_while_operating(self):
+        self.daemon.refresh_interval = 0.01
+        self.project._get_all_instances = Mock(return_value=[])
+        with self.daemon.operation_lock:
+            refresher = threading.Thread(target=self.daemon._refresh_periodically)
+            refresher.start()
+            self.daemon.stopped.wait(0.1)
+            eq_(0, self.project._get_all_instances.call_count)
+        self.daemon.stopped.set()
+        refresher.join(10)
+
+    @raises(DaemonError)
+    def test_unknown_command(self):
+        self.client.request("format_disks")
+
+    def test_shutdown(self):
+        self.client.shutdown()
+        self.thread.join(10)
+        ok_(not self.thread.is_alive())
+        ok_(not exists(self.socket_path))
+
+    @raises(DaemonError)
+    def test_one_daemon_per_socket(self):
+        WolphinDaemon(self.project, self.socket_path)
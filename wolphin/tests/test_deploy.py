@@ -0,0 +1,215 @@
+import hashlib
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+from os.path import join
+
+from nose.tools import eq_, ok_
+
+from wolphin.config import Configuration
+from wolphin.deploy import MARKER_FILE, Bundle, distribute, push, serve_command
+from wolphin.exceptions import SSHError
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.tests.mock_ssh import MockHosts
+
+
+class FakeHosts(MockHosts):
+    """Hosts whose directories are local ones"""
+
+    def __init__(self, pool, root):
+        self.root = root
+        os.makedirs(root)
+        self.broken = set()
+        MockHosts.__init__(self, pool)
+
+    def directory(self, host, remote_dir):
+        return join(self.root, host) + remote_dir
+
+    def put(self, host, local_path, remote_path):
+        if host in self.broken:
+            raise SSHError("{}: connection lost".format(host))
+        MockHosts.put(self, host, local_path, remote_path)
+        shutil.copy(local_path, join(self.root, host + ".upload"))
+
+    def run(self, host, command):
+        # the commands are not run, their outcome is emulated.
+        if command.startswith("cat "):
+            marker = self.directory(host, command.split()[1])
+            stdout = open(marker).read() if os.path.exists(marker) else ""
+            return CommandResult(host, 0, stdout, "")
+        directory = self.directory(host, command.split()[2])
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        with tarfile.open(join(self.root, host + ".upload")) as bundle:
+            bundle.extractall(directory)
+        with open(join(directory, MARKER_FILE), "w") as marker:
+            marker.write(command.split("echo ")[1].split()[0] + "\n")
+        return MockHosts.run(self, host, command)
+
+
+class PeerHosts(MockHosts):
+    """Hosts that pass a bundle on to each other"""
+
+    def __init__(self, pool, private_ips):
+        self.private_ips = private_ips
+        self.hosts = dict((private_ip, host) for host, private_ip in private_ips.iteritems())
+        self.files = dict((host, dict()) for host in private_ips)
+        self.serving = set()
+        self.stops = []
+        self.corrupted = set()
+        MockHosts.__init__(self, pool)
+
+    def put(self, host, local_path, remote_path):
+        MockHosts.put(self, host, local_path, remote_path)
+        self.files[host][remote_path] = open(local_path, "rb").read()
+
+    def run(self, host, command):
+        files = self.files[host]
+        if command.startswith("cat "):
+            return CommandResult(host, 0, files.get(command.split()[1], ""), "")
+        if " kill " in command:
+            self.stops.append((host, command))
+            self.serving.discard(host)
+            return CommandResult(host, 0, "", "")
+
+        fetched = re.search(r"--retry 3 -o (\S+) http://([^:]+):", command)
+        if fetched:
+            source = self.hosts[fetched.group(2)]
+            if source not in self.serving:
+                return CommandResult(host, 7, "", "connection refused")
+            content = self.files[source][fetched.group(1)]
+            files[fetched.group(1)] = content + ("x" if host in self.corrupted else "")
+
+        checked = re.search(r"echo (\w+)  (\S+) \| sha256sum", command)
+        if checked:
+            if hashlib.sha256(files[checked.group(2)]).hexdigest() != checked.group(1):
+                return CommandResult(host, 1, "", "checksum did not match")
+            marked = re.search(r"echo (\w+) > (\S+) && ", command)
+            files[marked.group(2)] = marked.group(1) + "\n"
+            ok_("--bind {}".format(self.private_ips[host]) in command)
+            self.serving.add(host)
+        return MockHosts.run(self, host, command)
+
+
+class TestDeploy(object):
+    """Tests for deploying files to a project's instances"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.local = join(self.directory, "local")
+        os.makedirs(join(self.local, "bin"))
+        with open(join(self.local, "bin", "run.sh"), "w") as script:
+            script.write("#!/bin/sh\necho run\n")
+        with open(join(self.local, "data.csv"), "w") as data:
+            data.write("a,b\n1,2\n")
+
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=4)
+        self.hosts = FakeHosts(self.pool, join(self.directory, "remote"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _bundle(self):
+        return Bundle([join(self.local, "bin"), join(self.local, "data.csv")])
+
+    def test_bundle_hash_follows_content(self):
+        with self._bundle() as bundle:
+            first = bundle.sha256
+            with tarfile.open(bundle.path) as archive:
+                eq_(["bin", "bin/run.sh", "data.csv"], sorted(archive.getnames()))
+        os.utime(join(self.local, "data.csv"), (0, 0))
+        with self._bundle() as bundle:
+            eq_(first, bundle.sha256)
+        with open(join(self.local, "data.csv"), "a") as data:
+            data.write("3,4\n")
+        with self._bundle() as bundle:
+            ok_(first != bundle.sha256)
+
+    def test_push_to_all_hosts_then_skip_them(self):
+        hosts = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+        with self._bundle() as bundle:
+            report = push(self.pool, bundle, hosts, "/opt/test")
+            eq_(sorted(hosts), sorted(self.hosts.uploads))
+            eq_(3 * bundle.size, report.bytes_sent)
+            eq_([], report.skipped)
+            for host in hosts:
+                eq_("#!/bin/sh\necho run\n",
+                    open(join(self.hosts.directory(host, "/opt/test"), "bin", "run.sh")).read())
+
+            report = push(self.pool, bundle, hosts, "/opt/test")
+            eq_(3, len(self.hosts.uploads))
+            eq_(0, report.bytes_sent)
+            eq_(hosts, report.skipped)
+            ok_("3 hosts, 3 up to date, 0 failed" in str(report))
+
+    def test_failures_are_reported_per_host(self):
+        self.hosts.broken.add("10.0.0.2")
+        with self._bundle() as bundle:
+            report = push(self.pool, bundle, ["10.0.0.1", "10.0.0.2"], "/opt/test")
+        eq_(["10.0.0.2"], report.failed.keys())
+        ok_("[10.0.0.2] error: 10.0.0.2: connection lost" in str(report))
+        ok_(report.deployments["10.0.0.1"].bytes_sent > 0)
+
+    def test_project_deploys_to_running_instances(self):
+        config = Configuration(project="test_project", min_instance_count=2, max_instance_count=2,
+                               max_wait_duration=0)
+        conn = MockEC2Connection()
+        project = mock_project(config, conn)
+        project.create()
+        project._ssh = self.pool
+
+        report = project.deploy([join(self.local, "data.csv")], "/opt/test")
+        eq_(set(instance.ip_address for instance in conn.INSTANCES.values()),
+            set(report.deployments))
+
+    def test_distribute_from_host_to_host(self):
+        private_ips = dict(("10.0.0.{}".format(n), "172.16.0.{}".format(n)) for n in range(1, 8))
+        peers = PeerHosts(self.pool, private_ips)
+        with self._bundle() as bundle:
+            report = distribute(self.pool, bundle, private_ips, "/opt/test")
+            # uploaded once to the seed, then passed on by 1, 2 and 4 hosts having it.
+            eq_(1, len(peers.uploads))
+            eq_(bundle.size, report.uploaded)
+            eq_(7 * bundle.size, report.bytes_sent)
+            eq_(4, report.rounds)
+            eq_({}, report.failed)
+            ok_(all(deployment.source in private_ips
+                    for deployment in report.deployments.itervalues()
+                    if deployment.host not in peers.uploads))
+            eq_(set(), peers.serving)
+            staging = "/tmp/wolphin-distribute-{}".format(bundle.file_sha256)
+            eq_(sorted((host, "test -f {staging}.pid && kill $(cat {staging}.pid); "
+                              "rm -rf {staging} {staging}.pid".format(staging=staging))
+                       for host in private_ips),
+                sorted(peers.stops))
+
+            # everything is up to date the next time.
+            report = distribute(self.pool, bundle, private_ips, "/opt/test")
+            eq_(sorted(private_ips), report.skipped)
+            eq_(0, report.rounds)
+
+    def test_distribute_retries_hosts_that_received_a_corrupted_bundle(self):
+        private_ips = dict(("10.0.0.{}".format(n), "172.16.0.{}".format(n)) for n in range(1, 5))
+        peers = PeerHosts(self.pool, private_ips)
+        peers.corrupted.add("10.0.0.4")
+        with self._bundle() as bundle:
+            report = distribute(self.pool, bundle, private_ips, "/opt/test")
+        eq_(["10.0.0.4"], report.failed.keys())
+        ok_("checksum did not match" in str(report.failed["10.0.0.4"]))
+        eq_(3, len(report.deployments) - len(report.failed))
+        eq_(set(), peers.serving)
+        # the host that failed is cleaned up too.
+        ok_("10.0.0.4" in set(host for host, _ in peers.stops))
+
+    def test_server_pid_is_recorded_for_cleanup(self):
+        command = serve_command("/tmp/wolphin-distribute-abc", 8700, "172.16.0.1")
+        # the server is stopped by its pid, not by a pattern the stopping command would match too.
+        ok_("echo $$ > /tmp/wolphin-distribute-abc.pid" in command)
+        ok_("exec python3 -m http.server 8700 --bind 172.16.0.1" in command)
+        ok_("pkill" not in command)
+        # the command fails when the server does not come up.
+        ok_(command.endswith("done && curl -sf -o /dev/null http://172.16.0.1:8700/"))
@@ -0,0 +1,91 @@
+import random
+from StringIO import StringIO
+
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from wolphin.exceptions import WolphinException
+from wolphin.histogram import (BUCKET_COUNT, FleetLatency, Histogram, bucket_index, bucket_value,
+                               pull)
+from wolphin.ssh import SSHPool
+
+
+class TestHistogram(object):
+    """Tests for latency histograms"""
+
+    def test_buckets(self):
+        for value in range(128):
+            eq_(value, bucket_value(bucket_index(value)))
+        eq_(bucket_index(128), bucket_index(129))
+        ok_(bucket_index(129) < bucket_index(130))
+
+        # every value is within 1/64th of the value its bucket reports.
+        for value in (1000, 12345, 999999, 3600 * 10 ** 6):
+            reported = bucket_value(bucket_index(value))
+            ok_(value <= reported <= value * (1 + 1 / 64.0), (value, reported))
+        ok_(bucket_index(10 ** 20) == BUCKET_COUNT - 1)
+
+    def test_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 1001):
+            histogram.record(value)
+        eq_(1000, histogram.count)
+        percentiles = histogram.percentiles([50, 99, 100])
+        ok_(abs(percentiles[50] - 500) <= 500 / 64.0, percentiles)
+        ok_(abs(percentiles[99] - 990) <= 990 / 64.0, percentiles)
+        eq_(histogram.max, percentiles[100])
+        eq_(None, Histogram().percentile(50))
+
+    def test_memory_is_bounded_by_buckets(self):
+        histogram = Histogram()
+        for _ in range(100000):
+            histogram.record(random.randint(1, 10 ** 7))
+        ok_(len(histogram.counts) < 1100)
+
+    def test_line_round_trip(self):
+        histogram = Histogram()
+        for value in (1, 5, 5, 1000):
+            histogram.record(value)
+        start, parsed = Histogram.from_line(histogram.to_line(1500000000.5))
+        eq_(1500000000, start)
+        eq_(histogram.counts, parsed.counts)
+        eq_(4, parsed.count)
+
+    def test_fleet_merges_hosts_into_totals_and_time_series(self):
+        fleet = FleetLatency(interval=10)
+        for host in range(3):
+            log = ["# latencies in microseconds"]
+            for second in range(20):
+                histogram = Histogram()
+                histogram.record(100 * (host + 1))
+                log.append(histogram.to_line(1000 + second))
+            fleet.add_log(log)
+
+        eq_(3, fleet.hosts)
+        eq_(60, fleet.total.count)
+        eq_([(1000, 30), (1010, 30)], [(start, count) for start, count, _ in fleet.time_series()])
+        ok_(300 <= fleet.total.max <= 300 * (1 + 1 / 64.0))
+        ok_("3 hosts, 60 values" in str(fleet))
+
+    def test_pull(self):
+        logs = {"10.0.0.1": "1000 100:2\n", "10.0.0.2": "1000 100:3\n1001 101:1\n",
+                "10.0.0.4": "1000 100:5\n1001 101:"}
+        pool = SSHPool("ubuntu", "key.pem")
+
+        def open_sftp(host):
+            if host not in logs:
+                raise IOError("No such file")
+            return Mock(open=lambda path, mode: StringIO(logs[host]))
+
+        pool.open_sftp = Mock(side_effect=open_sftp)
+        fleet = pull(pool, ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"],
+                     "/var/log/latency.hist")
+        eq_(2, fleet.hosts)
+        # none of the histograms of the host whose log is broken half way through are merged.
+        eq_(6, fleet.total.count)
+        eq_(5, fleet.intervals[1000].count)
+        eq_(["10.0.0.3", "10.0.0.4"], sorted(fleet.errors))
+
+    @raises(WolphinException)
+    def test_interval_must_be_positive(self):
+        FleetLatency(interval=0)
@@ -0,0 +1,100 @@
+import re
+
+from nose.tools import eq_, ok_, raises
+
+from wolphin.exceptions import ClockSkewError
+from wolphin.launch import MIN_LEAD, launch
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.tests.mock_ssh import MockHosts
+
+
+class Clock(object):
+    """A clock that only moves when slept on"""
+
+    def __init__(self, now=1400000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class LaunchedHosts(MockHosts):
+    """
+    Hosts with clocks ``offsets`` off the local one, which start what they are armed with
+    ``jitters`` late.
+    """
+
+    def __init__(self, pool, clock, offsets, jitters):
+        self.clock = clock
+        self.offsets = offsets
+        self.jitters = jitters
+        self.armed = dict()
+        MockHosts.__init__(self, pool)
+
+    def run(self, host, command):
+        if command == "date +%s.%N":
+            return CommandResult(host, 0, "{:.6f}\n".format(self.clock() + self.offsets[host]), "")
+        armed = re.search(r"start = ([\d.]+)", command)
+        if armed:
+            ok_(command.startswith("nohup sh -c "))
+            ok_("./load-test --rate 100" in command)
+            self.armed[host] = float(armed.group(1))
+            return CommandResult(host, 0, "", "")
+        if command.startswith("cat ") and host in self.armed:
+            return CommandResult(host, 0, "{:.6f}\n".format(self.armed[host] +
+                                                            self.jitters[host]), "")
+        return CommandResult(host, 1, "", "No such file or directory")
+
+
+class TestLaunch(object):
+    """Tests for launching a command on all the hosts at the same time"""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=8)
+        self.hosts = ["10.0.0.{}".format(n) for n in range(1, 31)]
+        self.offsets = dict((host, (n - 15) * 0.01) for n, host in enumerate(self.hosts))
+        self.jitters = dict((host, n * 0.0001) for n, host in enumerate(self.hosts))
+        self.remote = LaunchedHosts(self.pool, self.clock, self.offsets, self.jitters)
+
+    def _launch(self, hosts=None, **kwargs):
+        return launch(self.pool, hosts or self.hosts, "./load-test --rate 100", clock=self.clock,
+                      sleep=self.clock.sleep, **kwargs)
+
+    def test_hosts_are_released_at_the_start_by_their_own_clocks(self):
+        report = self._launch()
+        eq_({}, report.failed)
+        ok_(report.start >= 1400000000.0 + MIN_LEAD)
+        for host in self.hosts:
+            # the shared start, translated to the host's clock.
+            ok_(abs(self.remote.armed[host] - (report.start + self.offsets[host])) < 1e-5)
+            ok_(abs(report.launches[host].offset - self.offsets[host]) < 1e-5)
+            ok_(abs(report.launches[host].jitter - self.jitters[host]) < 1e-5)
+        ok_(abs(report.jitters[-1] - 0.0029) < 1e-5)
+        ok_(abs(report.max_skew - 0.15) < 1e-5)
+        ok_("30 hosts started at" in str(report))
+        ok_(report.log_path.endswith(".log"))
+
+    @raises(ClockSkewError)
+    def test_skewed_clocks_are_refused(self):
+        self.offsets[self.hosts[3]] = 2.5
+        try:
+            self._launch()
+        finally:
+            eq_({}, self.remote.armed)
+
+    def test_unreachable_hosts_are_reported(self):
+        unreachable = "10.0.0.99"
+        self.offsets[unreachable] = 0
+        self.jitters[unreachable] = 0
+        self.pool.run.side_effect = lambda host, command: (
+            CommandResult(host, 255, "", "Connection refused") if host == unreachable
+            else self.remote.run(host, command))
+        report = self._launch(hosts=self.hosts[:3] + [unreachable], lead=5)
+        eq_([unreachable], list(report.failed))
+        ok_("Connection refused" in str(report))
+        eq_(3, len(report.jitters))
+        eq_(1400000005.0, report.start)
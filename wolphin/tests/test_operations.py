@@ -0,0 +1,140 @@
+import threading
+
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import OperationCancelled, OperationTimeout
+from wolphin.operations import OperationHandle, OperationMonitor
+from wolphin.selector import InstanceNumberBasedSelector
+from wolphin.tests.mock_boto import MockEC2Connection, STATES
+from wolphin.tests.mock_project import mock_project
+
+
+class TestNonBlockingOperations(object):
+    """Tests for non-blocking lifecycle operations and their handles"""
+
+    def setUp(self):
+        config = Configuration(project="test_project", min_instance_count=3, max_instance_count=3,
+                               max_wait_duration=0)
+        self.conn = MockEC2Connection()
+        self.project = mock_project(config, self.conn)
+        self.project.create()
+
+        # the mock connection only transitions instances when updated, the tests do it instead.
+        self.project.config.max_wait_duration = 0.01
+        self.project.config.max_wait_tries = 1000
+
+    def tearDown(self):
+        thread = self.project.monitor.thread
+        if thread is not None:
+            thread.join(5)
+
+    def _transition_all(self, state):
+        for instance in self.conn.INSTANCES.itervalues():
+            instance.state = state
+
+    def test_terminate_returns_a_handle(self):
+        handle = self.project.terminate(wait=False)
+        ok_(isinstance(handle, OperationHandle))
+        ok_(not handle.done())
+        eq_(3, handle.remaining)
+        eq_(set(['shutting-down']), set(i.state for i in self.conn.INSTANCES.itervalues()))
+
+        self._transition_all('terminated')
+        statuses = handle.result(timeout=5)
+        eq_([STATES['terminated']] * 3, [status.state_code for status in statuses])
+        ok_(handle.done())
+        eq_(0, handle.remaining)
+        eq_(None, handle.exception())
+
+    def test_stop_and_start_return_handles(self):
+        stopping = self.project.stop(wait=False)
+        self._transition_all('stopped')
+        eq_(3, len(stopping.result(timeout=5)))
+
+        starting = self.project.start(wait=False)
+        ok_(not starting.done())
+        self._transition_all('running')
+        eq_([STATES['running']] * 3, [status.state_code for status in starting.result(timeout=5)])
+
+    def test_report_is_finished_by_the_handle(self):
+        handle = self.project.terminate(wait=False)
+        report = self.project.last_report
+        ok_(report is handle.report)
+        self._transition_all('terminated')
+        handle.result(timeout=5)
+        eq_(3, report.fleet('terminated')['count'])
+
+    def test_callbacks(self):
+        called = threading.Event()
+        done = []
+        handle = self.project.terminate(wait=False)
+        handle.add_done_callback(lambda h: done.append(h) or called.set())
+        self._transition_all('terminated')
+        ok_(called.wait(5))
+        eq_([handle], done)
+
+        # callbacks added to a done handle are called right away.
+        handle.add_done_callback(done.append)
+        eq_([handle, handle], done)
+
+    @raises(OperationCancelled)
+    def test_cancel(self):
+        handle = self.project.terminate(wait=False)
+        ok_(handle.cancel())
+        ok_(handle.cancelled())
+        ok_(not handle.cancel())
+        handle.result()
+
+    def test_result_timeout(self):
+        handle = self.project.terminate(wait=False)
+        try:
+            handle.result(timeout=0.05)
+        except OperationTimeout:
+            ok_(not handle.done())
+        else:
+            ok_(False, "result() did not time out")
+        handle.cancel()
+
+    def test_transition_deadline(self):
+        self.project.config.max_wait_tries = 2
+        handle = self.project.terminate(wait=False)
+        ok_(isinstance(handle.exception(timeout=5), OperationTimeout))
+        eq_(3, handle.remaining)
+
+    def test_one_monitor_and_describe_per_tick_for_all_handles(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 6
+        self.project.create()
+        instances = sorted(self.project._get_healthy_instances(),
+                           key=self.project._get_instance_number)
+
+        describe = Mock(wraps=self.project._describe_instances)
+        monitor = self.project.monitor
+        monitor.describe = describe
+        first = self.project.terminate(instances=instances[:3], wait=False)
+        # only the other instances are listed, and updated, so that the first ones stay as they are.
+        second = self.project.stop(selector=InstanceNumberBasedSelector(instance_numbers=[4, 5, 6]),
+                                   wait=False)
+        eq_(2, len(monitor.outstanding))
+        ok_(monitor.thread is not None)
+
+        for instance in instances[:3]:
+            instance.state = 'terminated'
+        for instance in instances[3:]:
+            instance.state = 'stopped'
+        first.result(timeout=5)
+        second.result(timeout=5)
+        ok_(all(len(call[0][0]) <= 6 for call in describe.call_args_list))
+
+        # the monitor's thread ends once there is nothing to track.
+        thread = monitor.thread
+        if thread is not None:
+            thread.join(5)
+        eq_(None, monitor.thread)
+
+    def test_nothing_to_do(self):
+        monitor = OperationMonitor(Mock(), interval=0)
+        handle = monitor.track(OperationHandle('stop', [], None, 80, 0, status=Mock()))
+        eq_([], handle.result())
+        eq_(None, monitor.thread)
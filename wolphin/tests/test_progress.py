@@ -0,0 +1,39 @@
+from nose.tools import eq_, ok_
+
+from wolphin.progress import Progress, StatusTable
+
+
+class TestProgress(object):
+    """Tests for Progress and StatusTable"""
+
+    def test_progress(self):
+        progress = Progress('running')
+        for number in range(1, 101):
+            straggler = "wolphin.p.{}".format(number) if number > 92 else None
+            progress.add('pending' if straggler else 'running', straggler)
+
+        eq_(100, progress.total)
+        eq_(92, progress.done)
+        eq_(dict(pending=8, running=92), progress.counts)
+        eq_("running: 92/100 (pending 8, running 92), waiting for wolphin.p.93, wolphin.p.94, "
+            "wolphin.p.95, wolphin.p.96, wolphin.p.97 and 3 more", str(progress))
+
+    def test_progress_keeps_the_first_stragglers_only(self):
+        progress = Progress('running')
+        for number in range(10000):
+            progress.add('pending', "wolphin.p.{}".format(number))
+        eq_(Progress.NAMED_STRAGGLERS, len(progress.stragglers))
+        eq_(10000, progress.straggler_count)
+        eq_(0, progress.done)
+        ok_(str(progress).endswith("wolphin.p.4 and 9995 more"))
+
+    def test_progress_without_stragglers(self):
+        progress = Progress('ssh_ready')
+        progress.add('ssh_ready')
+        eq_("ssh_ready: 1/1 (ssh_ready 1)", str(progress))
+
+    def test_status_table_is_rendered_when_printed(self):
+        table = StatusTable('instance', 'state')
+        table.add(instance="i-1|wolphin.p.1", state="16|running")
+        eq_([dict(instance="i-1|wolphin.p.1", state="16|running")], table.rows)
+        ok_("wolphin.p.1" in str(table))
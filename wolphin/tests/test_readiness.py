@@ -0,0 +1,131 @@
+import urllib2
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import InvalidWolphinConfiguration, ReadinessTimeoutError
+from wolphin.readiness import HTTPReadiness, TagReadiness, signal_ready_command
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.user_data import render_user_data
+
+
+class TestReadiness(object):
+    """Tests for readiness signalled by the instances themselves"""
+
+    def setUp(self):
+        self.config = Configuration(project="test_project",
+                                    email="a@a.com",
+                                    min_instance_count=3,
+                                    max_instance_count=3,
+                                    max_wait_duration=0,
+                                    readiness='tag')
+        self.conn = MockEC2Connection()
+        self.project = mock_project(self.config, self.conn, wait_for_ssh=True)
+        self.project._check_if_ssh_ready = Mock(side_effect=AssertionError("polled over ssh"))
+
+    def tearDown(self):
+        if isinstance(self.project._readiness, HTTPReadiness):
+            self.project._readiness.close()
+
+    def _signal_with_tags(self, *args):
+        for instance in self.conn.INSTANCES.itervalues():
+            if instance.state == 'running':
+                self.conn.create_tags(instance.id, {TagReadiness.TAG: "1"})
+
+    def test_tag_readiness(self):
+        describe = Mock(wraps=self.project._describe_instances)
+        with patch.object(self.project, '_describe_instances', describe), \
+                patch('wolphin.project.sleep', Mock(side_effect=self._signal_with_tags)):
+            self.project.create()
+        # one describe call per round, whatever the number of instances.
+        eq_(2, describe.call_count)
+        eq_(3, self.project.last_report.fleet('ready')['count'])
+
+    def test_tags_are_reset_when_started_again(self):
+        with patch('wolphin.project.sleep', Mock(side_effect=self._signal_with_tags)):
+            self.project.create()
+            self.project.stop()
+            sleep = Mock(side_effect=self._signal_with_tags)
+            with patch('wolphin.project.sleep', sleep):
+                self.project.start()
+        # the instances were not taken as ready from the tags of their previous boot.
+        ok_(sleep.called)
+        ok_(all(instance.tags.get(TagReadiness.TAG) for instance in self.conn.INSTANCES.values()))
+
+    @raises(ReadinessTimeoutError)
+    def test_timeout(self):
+        self.project.create()
+
+    def test_http_readiness(self):
+        self.config.readiness = 'http'
+        self.config.readiness_url = "http://localhost:0"
+        port = self.project.readiness.port
+
+        def signal(*args):
+            for instance in self.conn.INSTANCES.itervalues():
+                urllib2.urlopen(urllib2.Request("http://localhost:{}/ready/{}"
+                                                .format(port, instance.id), data="")).read()
+
+        describe = Mock(wraps=self.project._describe_instances)
+        with patch.object(self.project, '_describe_instances', describe), \
+                patch('wolphin.project.sleep', Mock(side_effect=signal)):
+            self.project.create()
+        # the collector is told, ec2 is not asked.
+        eq_(0, describe.call_count)
+        eq_(3, self.project.last_report.fleet('ready')['count'])
+        # the collector is closed once the operation is done, its port can be bound again.
+        eq_(None, self.project._readiness)
+        HTTPReadiness("http://localhost:{}".format(port)).close()
+
+    def test_http_collector(self):
+        collector = HTTPReadiness("http://localhost:0")
+        try:
+            instances = [Mock(id="i-1"), Mock(id="i-2")]
+            collector.reset(instances)
+            # only on the host of the readiness url.
+            eq_("127.0.0.1", collector.server.server_address[0])
+            response = urllib2.urlopen("http://localhost:{}/ready/i-1".format(collector.port),
+                                       data="")
+            eq_("ok\n", response.read())
+            eq_(set(["i-1"]), collector.ready(instances))
+            # a GET, e.g. a health check, is not a signal.
+            for path, code, data in (("unknown", 404, ""), ("ready/i-3", 403, ""),
+                                     ("ready/i-2", 501, None)):
+                try:
+                    urllib2.urlopen("http://localhost:{}/{}".format(collector.port, path),
+                                    data=data)
+                except urllib2.HTTPError as error:
+                    eq_(code, error.code)
+                else:
+                    ok_(False, "{} is accepted".format(path))
+            eq_(set(["i-1"]), collector.signalled)
+            collector.reset(instances)
+            eq_(set(), collector.ready(instances))
+        finally:
+            collector.close()
+
+    def test_signal_ready_command(self):
+        ok_("create-tags --region us-west-1" in signal_ready_command(self.config))
+        ok_("Key=WolphinReady" in signal_ready_command(self.config))
+        self.config.readiness = 'http'
+        self.config.readiness_url = "http://10.0.0.1:8642/"
+        eq_("curl -s -X POST http://10.0.0.1:8642/ready/$(curl -s "
+            "http://169.254.169.254/latest/meta-data/instance-id)",
+            signal_ready_command(self.config))
+        ok_(render_user_data("#!/bin/sh\n$wolphin_signal_ready\n", self.config, 1)
+            .endswith("/instance-id)\n"))
+
+    def test_invalid_readiness(self):
+        config = Configuration(email="a@a.com")
+        config.update(**dict((k, v or "test") for k, v in config.__dict__.iteritems()
+                             if k not in Configuration.OPTIONAL_ATTRIBUTES))
+        for readiness, readiness_url in (('carrier-pigeon', None), ('http', None)):
+            config.update(readiness=readiness, readiness_url=readiness_url)
+            try:
+                config.validate()
+            except InvalidWolphinConfiguration as error:
+                ok_("readiness" in str(error))
+            else:
+                ok_(False, "readiness {} is valid".format(readiness))
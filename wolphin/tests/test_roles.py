@@ -0,0 +1,158 @@
+import os
+import shutil
+import tempfile
+
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import InvalidWolphinConfiguration
+from wolphin.project import WolphinProject
+from wolphin.selector import RoleSelector
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+
+
+class TestRoles(object):
+    """Tests for the role groups of a project"""
+
+    def setUp(self):
+        self.config = Configuration(project="test_project",
+                                    email="a@a.com",
+                                    instance_type="t1.micro",
+                                    max_wait_tries=30,
+                                    max_wait_duration=0,
+                                    roles=dict(generator=dict(instance_type="c3.large",
+                                                              min_instance_count=3,
+                                                              max_instance_count=3),
+                                               coordinator=dict()))
+        self.conn = MockEC2Connection()
+        self.project = mock_project(self.config, self.conn, wait_for_ssh=True)
+        self.project._check_if_ssh_ready = Mock(return_value=True)
+        for role in self.project.roles:
+            self.project.role(role)._check_if_ssh_ready = Mock(return_value=True)
+
+    def _instances(self, role=None):
+        return sorted((instance for instance in self.conn.INSTANCES.itervalues()
+                       if role is None or instance.tags.get("WolphinRole") == role),
+                      key=lambda instance: instance.tags["Name"])
+
+    def test_create(self):
+        self.project.create()
+        eq_(4, len(self._instances()))
+        eq_(["wolphin.test_project.generator.1",
+             "wolphin.test_project.generator.2",
+             "wolphin.test_project.generator.3"],
+            [instance.tags["Name"] for instance in self._instances("generator")])
+        eq_(["c3.large"] * 3,
+            [instance.instance_type for instance in self._instances("generator")])
+        eq_(["wolphin.test_project.coordinator.1"],
+            [instance.tags["Name"] for instance in self._instances("coordinator")])
+        eq_("t1.micro", self._instances("coordinator")[0].instance_type)
+        ok_(all(instance.state == 'running' for instance in self._instances()))
+        eq_(4, len(self.project.last_report.timings))
+
+    def test_role_operations(self):
+        self.project.create()
+        eq_(3, len(self.project.role("generator").status()))
+        self.project.role("generator").stop()
+        eq_(["stopped"] * 3, [instance.state for instance in self._instances("generator")])
+        eq_("running", self._instances("coordinator")[0].state)
+        eq_(4, len(self.project.status()))
+
+    def test_start_replacing_stragglers(self):
+        self.project.create()
+        self.project.stop()
+        self.config.straggler_factor = 3
+        checked = set()
+        self.project._check_if_ssh_ready = Mock(side_effect=lambda instance:
+                                                checked.add(instance.id) or True)
+        self.project.start()
+        # the instances of the roles have the same numbers, e.g. 1, all of them are waited for.
+        eq_(set(instance.id for instance in self._instances()), checked)
+        ok_(all(instance.state == 'running' for instance in self._instances()))
+
+    def test_role_selector(self):
+        self.project.create()
+        eq_(["wolphin.test_project.coordinator.1"],
+            [status.name for status in self.project.status(RoleSelector(["coordinator"]))])
+        eq_(4, len(RoleSelector().select(self._instances())))
+
+    def test_revert_as_configured(self):
+        self.project.create()
+        generator = self._instances("generator")[1]
+        self.project.revert(selector=RoleSelector(["generator"]), sequential=True)
+        eq_('terminated', generator.state)
+        live = [instance for instance in self._instances("generator")
+                if instance.state == 'running']
+        eq_(3, len(live))
+        ok_(all(instance.instance_type == "c3.large" for instance in live))
+        eq_("wolphin.test_project.generator.2", live[1].tags["Name"])
+
+    def test_cached_status(self):
+        snapshot_dir = tempfile.mkdtemp()
+        try:
+            self.config.snapshot_dir = snapshot_dir
+            project = mock_project(self.config, self.conn, wait_for_ssh=True)
+            for role in project.roles:
+                project.role(role)._check_if_ssh_ready = Mock(return_value=True)
+            project.create()
+
+            restarted = WolphinProject(self.config, conn=self.conn)
+            restarted.conn.get_all_instances = Mock(side_effect=AssertionError("asked ec2"))
+            eq_(["wolphin.test_project.coordinator.1",
+                 "wolphin.test_project.generator.1",
+                 "wolphin.test_project.generator.2",
+                 "wolphin.test_project.generator.3"],
+                [status.name for status in restarted.status(cached=True)])
+            eq_(["wolphin.test_project.generator.1",
+                 "wolphin.test_project.generator.2",
+                 "wolphin.test_project.generator.3"],
+                [status.name for status in restarted.status(RoleSelector(["generator"]),
+                                                            cached=True)])
+            eq_(["wolphin.test_project.coordinator.1"],
+                [status.name for status in restarted.role("coordinator").status(cached=True)])
+            eq_("wolphin.test_project", restarted.status(cached=True)[0].project_name)
+        finally:
+            shutil.rmtree(snapshot_dir)
+
+    @raises(InvalidWolphinConfiguration)
+    def test_unknown_role(self):
+        self.project.role("unknown")
+
+
+class TestRoleConfiguration(object):
+    """Tests for configuring the role groups of a project"""
+
+    def _config(self, **kwargs):
+        config = Configuration(email='a@a.com', **kwargs)
+        config.update(**dict([k, v or "test"] for k, v in config.__dict__.iteritems()
+                             if k not in Configuration.OPTIONAL_ATTRIBUTES))
+        config.pem_path, config.pem_file = os.path.split(os.path.abspath(__file__))
+        return config
+
+    def test_parser(self):
+        config = Configuration()
+        config.parse_config_file(["instance_type = t1.micro",
+                                  "role.generator.instance_type = c3.large",
+                                  "role.generator.max_instance_count = 20",
+                                  "role.coordinator.ami_id = ami-123"])
+        eq_(dict(generator=dict(instance_type="c3.large", max_instance_count=20),
+                 coordinator=dict(ami_id="ami-123")),
+            config.roles)
+        generator = config.for_role("generator")
+        eq_("generator", generator.role)
+        eq_("c3.large", generator.instance_type)
+        eq_(20, generator.max_instance_count)
+        eq_(None, generator.roles)
+        eq_("t1.micro", config.for_role("coordinator").instance_type)
+        eq_("t1.micro", config.instance_type)
+
+    def test_valid_roles(self):
+        self._config(roles=dict(generator=dict(instance_type="c3.large"))).validate()
+
+    def test_invalid_roles(self):
+        for roles in [dict(generator=dict(email="b@b.com")),
+                      {"load generator": dict()},
+                      dict(generator=dict(min_instance_count=2, max_instance_count=1))]:
+            yield raises(InvalidWolphinConfiguration)(self._config(roles=roles).validate)
@@ -0,0 +1,124 @@
+from mock import Mock, patch
+from nose.tools import eq_, ok_, raises
+
+from boto.exception import EC2ResponseError
+
+from wolphin.config import Configuration
+from wolphin.project import WolphinProject
+from wolphin.simulator import SimulatedEC2Connection, VirtualClock, constant, uniform
+
+
+class TestSimulatedEC2Connection(object):
+    """Tests for the ec2 simulator"""
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.conn = SimulatedEC2Connection(clock=self.clock,
+                                           latency={'run_instances': constant(2)},
+                                           transition_delays={'pending': uniform(10, 20),
+                                                              'shutting-down': constant(5)},
+                                           seed=1)
+
+    def _launch(self, count, project="test"):
+        instances = self.conn.run_instances("ami", count, count, security_groups=["default"],
+                                            instance_type="t1.micro", placement="zone").instances
+        for instance in instances:
+            self.conn.create_tags(instance.id, {"ProjectName": project})
+        return instances
+
+    def test_state_transitions_take_time(self):
+        instance = self._launch(1)[0]
+        eq_(2, self.clock.time())
+        eq_('pending', instance.update())
+        eq_(None, instance.ip_address)
+
+        self.clock.sleep(20)
+        # snapshots are only refreshed by update, like with boto.
+        eq_('pending', instance.state)
+        eq_('running', instance.update())
+        ok_(instance.ip_address)
+
+        instance.terminate()
+        eq_('shutting-down', instance.update())
+        self.clock.sleep(5)
+        eq_('terminated', instance.update())
+
+    def test_latency_is_spent_on_the_clock(self):
+        self._launch(1)
+        self._launch(1)
+        eq_(4, self.clock.time())
+        eq_(2, self.conn.calls['run_instances'])
+        eq_(2, self.conn.calls['create_tags'])
+
+    @raises(EC2ResponseError)
+    def test_capacity(self):
+        self.conn.capacity[("zone", "t1.micro")] = 5
+        eq_(5, len(self.conn.run_instances("ami", 1, 10, instance_type="t1.micro",
+                                           placement="zone").instances))
+        self.conn.run_instances("ami", 1, 1, instance_type="t1.micro", placement="zone")
+
+    def test_capacity_is_freed_by_termination(self):
+        self.conn.capacity[("zone", "t1.micro")] = 1
+        instance = self._launch(1)[0]
+        instance.terminate()
+        self.clock.sleep(5)
+        eq_(1, len(self._launch(1)))
+
+    def test_throttling(self):
+        conn = SimulatedEC2Connection(clock=self.clock, describe_throttle=(1, 3))
+        for _ in range(3):
+            conn.get_all_instances()
+        try:
+            conn.get_all_instances()
+            ok_(False, "describe call should have been throttled")
+        except EC2ResponseError as error:
+            ok_("RequestLimitExceeded" in str(error))
+        self.clock.sleep(1)
+        conn.get_all_instances()
+        eq_(1, conn.throttled['get_all_instances'])
+
+    def test_paginated_tag_lookup(self):
+        self._launch(10000, project="other")
+        mine = set(instance.id for instance in self._launch(25, project="mine"))
+
+        seen = []
+        next_token = None
+        while True:
+            page = self.conn.get_all_reservations(filters={"tag:ProjectName": "mine"},
+                                                  max_results=10,
+                                                  next_token=next_token)
+            seen.extend(instance.id
+                        for reservation in page
+                        for instance in reservation.instances)
+            next_token = page.next_token
+            if not next_token:
+                break
+        eq_(25, len(seen))
+        eq_(mine, set(seen))
+
+        self.clock.sleep(20)
+        running = self.conn.get_only_instances(filters={"tag:ProjectName": "mine",
+                                                        "instance-state-name": "running"})
+        eq_(25, len(running))
+
+
+class TestWolphinOnSimulator(object):
+    """Tests that a WolphinProject works on the ec2 simulator"""
+
+    def setUp(self):
+        self.clock = VirtualClock()
+        self.conn = SimulatedEC2Connection.realistic(clock=self.clock, seed=1)
+        config = Configuration(project="sim", email="a@a.com", min_instance_count=30,
+                               max_instance_count=30, max_wait_tries=30)
+        config.validate = Mock()
+        self.project = WolphinProject(config, self.conn)
+        self.project._wait_for_ssh = Mock()
+
+    def test_create_and_terminate(self):
+        with patch('wolphin.project.sleep', self.clock.sleep):
+            eq_(30, len(self.project.create()))
+            eq_(set(['running']), set(info.state for info in self.project.status()))
+
+            self.project.terminate()
+            eq_(set(['terminated']), set(info.state for info in self.project.status()))
+        ok_(self.clock.time() > 40)
@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+from os.path import exists
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import WolphinException
+from wolphin.project import WolphinProject
+from wolphin.snapshot import InventorySnapshot
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+
+
+class TestInventorySnapshot(object):
+    """Tests for InventorySnapshot and WolphinProject's use of it"""
+
+    def setUp(self):
+        self.snapshot_dir = tempfile.mkdtemp()
+        self.conn = MockEC2Connection()
+        self.project = self._project()
+
+    def tearDown(self):
+        shutil.rmtree(self.snapshot_dir)
+
+    def _project(self, **config):
+        config = Configuration(project="test_project",
+                               snapshot_dir=self.snapshot_dir,
+                               max_wait_duration=0,
+                               **config)
+        return mock_project(config, self.conn)
+
+    def test_no_snapshot_by_default(self):
+        config = Configuration(project="test_project")
+        eq_(None, WolphinProject(config, conn=self.conn).snapshot)
+
+    @raises(WolphinException)
+    def test_cached_status_needs_a_snapshot(self):
+        WolphinProject(Configuration(project="test_project"), conn=self.conn).status(cached=True)
+
+    def test_snapshot_is_saved_and_loaded(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 3
+        self.project.create()
+        ok_(exists(self.project.snapshot.path))
+
+        snapshot = InventorySnapshot(self.project.snapshot.path)
+        snapshot.load()
+        eq_(sorted(self.conn.INSTANCES), snapshot.known_ids())
+        eq_([1, 2, 3], sorted(record.number for record in snapshot.records.itervalues()))
+        eq_(set(['running']), set(record.state for record in snapshot.records.itervalues()))
+        eq_(3, snapshot.max_number())
+
+    def test_cached_status_does_not_ask_ec2(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 2
+        self.project.create()
+
+        restarted = self._project()
+        restarted.conn.get_all_instances = Mock(side_effect=AssertionError("asked ec2"))
+        statuses = restarted.status(cached=True)
+        eq_(["wolphin.test_project.1", "wolphin.test_project.2"],
+            [status.name for status in statuses])
+        eq_([16, 16], [status.state_code for status in statuses])
+        eq_([False, False], [status.stale for status in statuses])
+
+        restarted.snapshot.clock = lambda: statuses[0].last_seen + InventorySnapshot.STALE_AFTER + 1
+        ok_(all(status.stale for status in restarted.status(cached=True)))
+
+    def test_known_instances_are_described_by_id(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 2
+        self.project.create()
+
+        restarted = self._project()
+        get_all_instances = Mock(wraps=self.conn.get_all_instances)
+        with patch.object(self.conn, 'get_all_instances', get_all_instances):
+            restarted.stop()
+            restarted.start()
+
+        # reconciled by listing once, then only described by id.
+        calls = get_all_instances.call_args_list
+        ok_("filters" in calls[0][1])
+        ok_(all(call[1].keys() == ["instance_ids"] for call in calls[1:]))
+        eq_(set(['running']), set(instance.state for instance in self.conn.INSTANCES.values()))
+
+    def test_reconciling_marks_vanished_instances_terminated(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 2
+        self.project.create()
+        gone = self.conn.INSTANCES.keys()[0]
+        del self.conn.INSTANCES[gone]
+
+        restarted = self._project()
+        eq_(1, len(restarted.status()))
+        eq_('terminated', restarted.snapshot.records[gone].state)
+
+        # a vanished instance known to a reconciled snapshot leads to reconciling again.
+        survivor = self.conn.INSTANCES.keys()[0]
+        del self.conn.INSTANCES[survivor]
+        eq_([], restarted.status())
+        eq_('terminated', restarted.snapshot.records[survivor].state)
+
+    def test_numbers_of_terminated_instances_are_not_reused(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 2
+        self.project.create()
+        self.project.terminate()
+        self.project.status()
+        self.project.create()
+
+        names = set(status.name for status in self.project.status())
+        eq_(set(["wolphin.test_project.3", "wolphin.test_project.4"]), names)
@@ -0,0 +1,39 @@
+from mock import Mock, patch
+from nose.tools import eq_, ok_
+
+from wolphin.exceptions import SSHError
+from wolphin.ssh import SSHPool
+
+
+class TestSSHPool(object):
+    """Tests for SSHPool"""
+
+    def setUp(self):
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=4)
+
+    def test_map_collects_results_and_errors(self):
+        def _work(host):
+            if host == "bad":
+                raise ValueError("broken")
+            return host.upper()
+
+        results = self.pool.map(_work, ["a", "b", "bad"])
+        eq_("A", results["a"])
+        eq_("B", results["b"])
+        ok_(isinstance(results["bad"], SSHError))
+        ok_("broken" in str(results["bad"]))
+
+    def test_connections_are_reused(self):
+        with patch('wolphin.ssh.paramiko.SSHClient') as ssh_client:
+            client = ssh_client.return_value
+            client.get_transport.return_value = None
+
+            eq_(client, self.pool.client("a"))
+            client.get_transport.return_value = Mock(is_active=Mock(return_value=True))
+            eq_(client, self.pool.client("a"))
+            eq_(1, client.connect.call_count)
+
+            # a dropped connection is made again.
+            client.get_transport.return_value.is_active.return_value = False
+            self.pool.client("a")
+            eq_(2, client.connect.call_count)
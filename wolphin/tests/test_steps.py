@@ -0,0 +1,124 @@
+import os
+import re
+import shutil
+import tempfile
+from os.path import join
+
+from nose.tools import eq_, ok_, raises
+
+from wolphin.exceptions import StepError
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.steps import Step, fingerprints, in_order, provision
+from wolphin.tests.mock_ssh import MockHosts
+
+
+class StepHosts(MockHosts):
+    """Hosts whose steps are emulated"""
+
+    def __init__(self, pool, hosts):
+        self.fingerprints = dict((host, dict()) for host in hosts)
+        self.ran = dict((host, []) for host in hosts)
+        self.failing = set()
+        self.read_only = set()
+        MockHosts.__init__(self, pool)
+
+    def run(self, host, command):
+        if command.startswith("cat .wolphin/steps/*.fingerprint"):
+            return CommandResult(host, 0, "".join("{} {}\n".format(name, fingerprint)
+                                                  for name, fingerprint
+                                                  in self.fingerprints[host].iteritems()), "")
+        recorded = re.match(r"echo (\S+) (\w+) > ", command)
+        if recorded:
+            if host in self.read_only:
+                return CommandResult(host, 1, "", "Read-only file system")
+            self.fingerprints[host][recorded.group(1)] = recorded.group(2)
+            return CommandResult(host, 0, "", "")
+        step = re.match(r"mkdir -p \.wolphin/steps/(\S+) && cd", command)
+        if step:
+            self.ran[host].append(step.group(1))
+            if (host, step.group(1)) in self.failing:
+                return CommandResult(host, 1, "", "apt-get: command not found")
+        return MockHosts.run(self, host, command)
+
+
+class TestSteps(object):
+    """Tests for idempotent provisioning steps"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file = join(self.directory, "app.conf")
+        with open(self.config_file, "w") as config_file:
+            config_file.write("threads = 4\n")
+
+        self.hosts = ["10.0.0.{}".format(n) for n in range(1, 201)]
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=32)
+        self.remote = StepHosts(self.pool, self.hosts)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _steps(self, version="1.0"):
+        return [Step("app", "./install.sh", files=[self.config_file], requires=["packages"]),
+                Step("packages", "sudo apt-get install -y openjdk", inputs=[version]),
+                Step("limits", "sudo sysctl -w fs.file-max=100000")]
+
+    def test_order(self):
+        eq_(["packages", "app", "limits"], [step.name for step in in_order(self._steps())])
+
+    @raises(StepError)
+    def test_unknown_requirement(self):
+        in_order([Step("app", "true", requires=["nothing"])])
+
+    @raises(StepError)
+    def test_cycle(self):
+        in_order([Step("a", "true", requires=["b"]), Step("b", "true", requires=["a"])])
+
+    def test_changes_propagate_to_the_steps_requiring_them(self):
+        first = fingerprints(in_order(self._steps("1.0")), dict())
+        second = fingerprints(in_order(self._steps("1.1")), dict())
+        ok_(first["packages"] != second["packages"])
+        ok_(first["app"] != second["app"])
+        eq_(first["limits"], second["limits"])
+
+    def test_provision_then_skip_everything(self):
+        report = provision(self.pool, self.hosts, self._steps())
+        eq_(600, report.count('ran'))
+        eq_(["packages", "app", "limits"], self.remote.ran[self.hosts[0]])
+        eq_(200, len(self.remote.uploads))
+
+        del self.remote.commands[:]
+        report = provision(self.pool, self.hosts, self._steps())
+        eq_(600, report.count('skipped'))
+        # a single command per host.
+        eq_(200, len(self.remote.commands))
+        ok_("200 hosts, 0 steps ran, 600 skipped" in str(report))
+
+    def test_only_changed_steps_and_their_dependents_run(self):
+        provision(self.pool, self.hosts[:2], self._steps())
+        with open(self.config_file, "w") as config_file:
+            config_file.write("threads = 8\n")
+        report = provision(self.pool, self.hosts[:2], self._steps())
+        eq_(["packages", "app", "limits", "app"], self.remote.ran[self.hosts[0]])
+        eq_(dict(packages='skipped', app='ran', limits='skipped'),
+            report.provisionings[self.hosts[0]].outcomes)
+
+    def test_failed_steps_block_the_following_ones(self):
+        self.remote.failing.add((self.hosts[1], "packages"))
+        report = provision(self.pool, self.hosts[:2], self._steps())
+        eq_(dict(packages='failed', app='blocked', limits='blocked'),
+            report.provisionings[self.hosts[1]].outcomes)
+        ok_("apt-get: command not found" in str(report.failed[self.hosts[1]]))
+        eq_(3, report.count('ran'))
+        # the failed step is run again next time.
+        self.remote.failing.clear()
+        report = provision(self.pool, self.hosts[:2], self._steps())
+        eq_(3, report.count('ran'))
+        eq_(3, report.count('skipped'))
+
+    def test_steps_whose_fingerprint_is_not_recorded_fail(self):
+        self.remote.read_only.add(self.hosts[0])
+        report = provision(self.pool, self.hosts[:1], self._steps())
+        eq_(dict(packages='failed', app='blocked', limits='blocked'),
+            report.provisionings[self.hosts[0]].outcomes)
+        ok_("fingerprint could not be recorded: Read-only file system"
+            in str(report.failed[self.hosts[0]]))
@@ -0,0 +1,142 @@
+from itertools import count
+
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import InvalidWolphinConfiguration, SSHTimeoutError
+from wolphin.stragglers import StragglerDetector
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+
+
+class TestStragglers(object):
+    """Tests for replacing the instances much slower than the others to be ready"""
+
+    def setUp(self):
+        self.config = Configuration(project="test_project",
+                                    email="a@a.com",
+                                    min_instance_count=10,
+                                    max_instance_count=10,
+                                    max_wait_tries=30,
+                                    max_wait_duration=0,
+                                    straggler_factor=3)
+        self.conn = MockEC2Connection()
+        self.project = mock_project(self.config, self.conn, wait_for_ssh=True)
+        # every call of the clock takes a second.
+        clock = count().next
+        self.project._straggler_detector = lambda: StragglerDetector(3, clock=clock)
+        self.project._check_if_ssh_ready = Mock(side_effect=lambda instance:
+                                                instance.state == 'running')
+
+        self.stuck = []
+        run_instances = self.conn.run_instances
+
+        def _run_instances(*args, **kwargs):
+            reservation = run_instances(*args, **kwargs)
+            if not self.stuck:
+                # the 4th instance stays pending.
+                self.stuck.append(reservation.instances[3])
+                reservation.instances[3].update_disabled = True
+            return reservation
+
+        self.conn.run_instances = _run_instances
+
+    def _live(self, number):
+        return [instance for instance in self.conn.INSTANCES.itervalues()
+                if instance.tags["Name"] == "wolphin.test_project.{}".format(number) and
+                instance.state not in ('shutting-down', 'terminated')]
+
+    def test_detector(self):
+        now = [0]
+        detector = StragglerDetector(2, clock=lambda: now[0])
+        for key in range(10):
+            detector.request(key)
+        now[0] = 10
+        for key in range(8):
+            detector.done(key)
+        # the time the fastest 90% took is not known yet.
+        eq_(None, detector.threshold)
+        now[0] = 15
+        detector.done(8)
+        eq_(30, detector.threshold)
+        eq_([], detector.stragglers())
+        now[0] = 31
+        eq_([9], detector.stragglers())
+
+    def test_stuck_instance_is_replaced(self):
+        self.project.create()
+        stuck = self.stuck[0]
+        eq_('shutting-down', stuck.state)
+        eq_(11, len(self.conn.INSTANCES))
+        for number in range(1, 11):
+            eq_(1, len(self._live(number)))
+            eq_('running', self._live(number)[0].state)
+        ok_('straggler' in self.project.last_report.timings[stuck.id].milestones)
+
+    def test_straggler_ready_first_is_kept(self):
+        # nothing stays pending, but the 4th instance answers ssh late, and its replacement never.
+        self.stuck.append(None)
+        slow = []
+
+        def _ssh_ready(instance):
+            if instance.tags["Name"] != "wolphin.test_project.4":
+                return True
+            if not slow:
+                slow.append(instance)
+            return instance.id == slow[0].id and len(self.conn.INSTANCES) > 10
+
+        self.project._check_if_ssh_ready = Mock(side_effect=_ssh_ready)
+        self.project.create()
+        eq_(11, len(self.conn.INSTANCES))
+        eq_([slow[0].id], [instance.id for instance in self._live(4)])
+
+    def test_straggler_is_waited_for_if_it_cannot_be_replaced(self):
+        # the fleet is at the instance limit, the 4th instance answers ssh late.
+        self.stuck.append(None)
+        self.conn.instance_limit = 10
+        clock = count().next
+        self.project._straggler_detector = lambda: StragglerDetector(1.5, clock=clock)
+        checks = []
+
+        def _ssh_ready(instance):
+            if instance.tags["Name"] != "wolphin.test_project.4":
+                return True
+            checks.append(instance)
+            return len(checks) > 20
+
+        self.project._check_if_ssh_ready = Mock(side_effect=_ssh_ready)
+        self.project.create()
+        eq_(10, len(self.conn.INSTANCES))
+        eq_(1, len(self._live(4)))
+
+    def test_replacements_are_terminated_on_timeout(self):
+        # the 4th instance stays pending, and its replacement never answers ssh.
+        self.project._check_if_ssh_ready = Mock(side_effect=lambda instance:
+                                                instance.state == 'running' and
+                                                instance.tags["Name"] != "wolphin.test_project.4")
+        try:
+            self.project.create()
+        except SSHTimeoutError:
+            pass
+        else:
+            ok_(False, "the 4th instance is ready")
+        eq_(11, len(self.conn.INSTANCES))
+        eq_([self.stuck[0].id], [instance.id for instance in self._live(4)])
+
+    @raises(SSHTimeoutError)
+    def test_stragglers_are_waited_for_if_not_replaced(self):
+        self.config.straggler_factor = None
+        self.project.create()
+
+    def test_factor_must_be_more_than_one(self):
+        config = Configuration(email="a@a.com")
+        config.update(**dict((k, v or "test") for k, v in config.__dict__.iteritems()
+                             if k not in Configuration.OPTIONAL_ATTRIBUTES))
+        config.update(straggler_factor=0.5)
+        try:
+            config.validate()
+        except InvalidWolphinConfiguration as error:
+            ok_("straggler_factor" in str(error))
+        else:
+            ok_(False, "straggler_factor 0.5 is valid")
@@ -0,0 +1,116 @@
+from time import sleep
+
+from nose.tools import eq_, ok_
+
+from wolphin.ssh import CommandResult, SSHPool
+from wolphin.telemetry import FleetTelemetry, parse_counters
+from wolphin.tests.mock_ssh import MockHosts
+
+
+PROC = """{uptime:.2f} 2207.58
+cpu  {busy} 0 0 {idle} 0 0 0 0 0 0
+cpu0 {busy} 0 0 {idle} 0 0 0 0 0 0
+cpu1 0 0 0 0 0 0 0 0 0 0
+intr 292822 0 0 0
+ctxt 874913
+{load:.2f} 0.50 0.25 2/180 4242
+MemTotal:        4000000 kB
+MemFree:          100000 kB
+MemAvailable:    {available} kB
+Buffers:           20000 kB
+Inter-|   Receive                                 |  Transmit
+ face |bytes packets errs drop fifo frame compressed multicast|bytes packets errs drop fifo
+    lo: 85060990 16213 0 0 0 0 0 0 85060990 16213 0 0 0 0 0 0
+  eth0: {rx} 619 0 0 0 0 0 0 {tx} 612 0 0 0 0 0 0
+"""
+
+
+class BusyHosts(MockHosts):
+    """Hosts whose counters advance every poll, by ``busy`` CPU ticks out of 100 per second"""
+
+    def __init__(self, pool, busy):
+        self.busy = busy
+        self.polls = dict((host, 0) for host in busy)
+        MockHosts.__init__(self, pool)
+
+    def run(self, host, command):
+        ok_(command.startswith("cat /proc/uptime"))
+        polls = self.polls[host] = self.polls[host] + 1
+        busy = self.busy[host]
+        return CommandResult(host, 0, PROC.format(uptime=100.0 + 5 * polls,
+                                                  busy=busy * 5 * polls,
+                                                  idle=(100 - busy) * 5 * polls,
+                                                  load=busy / 50.0,
+                                                  available=3000000,
+                                                  rx=10240 * 5 * polls,
+                                                  tx=1024 * 5 * polls), "")
+
+
+class TestTelemetry(object):
+    """Tests for sampling the resources of the hosts of a fleet"""
+
+    def setUp(self):
+        self.pool = SSHPool("ubuntu", "key.pem", max_workers=4)
+        self.busy = dict(("10.0.0.{}".format(n), 10) for n in range(1, 9))
+        self.busy["10.0.0.3"] = 99
+        self.remote = BusyHosts(self.pool, self.busy)
+
+    def test_counters_are_parsed(self):
+        counters = parse_counters(PROC.format(uptime=10, busy=300, idle=700, load=1.5,
+                                              available=1000000, rx=2000, tx=3000))
+        eq_(10, counters.uptime)
+        eq_(1000, counters.cpu_total)
+        eq_(700, counters.cpu_idle)
+        eq_(2, counters.cpus)
+        eq_(1.5, counters.load)
+        eq_((4000000, 1000000), (counters.memory_total, counters.memory_available))
+        # not loopback.
+        eq_((2000, 3000), (counters.rx_bytes, counters.tx_bytes))
+
+    def test_samples_are_rates_between_polls(self):
+        telemetry = FleetTelemetry(self.pool, self.busy)
+        telemetry.poll()
+        eq_(0, len(telemetry.hosts["10.0.0.1"].samples))
+        telemetry.poll()
+        last = telemetry.hosts["10.0.0.1"].samples[-1]
+        ok_(abs(last.cpu - 0.1) < 1e-9)
+        ok_(abs(last.load - 0.1) < 1e-9)
+        ok_(abs(last.memory - 0.25) < 1e-9)
+        eq_((10240, 1024), (last.rx, last.tx))
+
+    def test_saturated_hosts_are_flagged_once(self):
+        saturations = []
+        telemetry = FleetTelemetry(self.pool, self.busy,
+                                   on_saturated=lambda host, resources:
+                                   saturations.append((host, resources)))
+        # a host is saturated once its last 3 samples are all over a threshold.
+        results = list(telemetry.watch(0, ticks=6))
+        eq_([{}, {}, {}, {"10.0.0.3": ["cpu"]}, {}, {}], results)
+        eq_([("10.0.0.3", ["cpu"])], saturations)
+        eq_({"10.0.0.3": ["cpu"]}, telemetry.saturated)
+        ok_("8 hosts, 1 saturated" in str(telemetry))
+
+    def test_samples_are_bounded(self):
+        telemetry = FleetTelemetry(self.pool, ["10.0.0.1"], capacity=4)
+        for _ in telemetry.watch(0, ticks=10):
+            pass
+        eq_(4, len(telemetry.hosts["10.0.0.1"].samples))
+
+    def test_errors_are_kept_per_host(self):
+        self.pool.run.side_effect = lambda host, command: CommandResult(host, 255, "",
+                                                                        "Connection refused")
+        telemetry = FleetTelemetry(self.pool, ["10.0.0.1"])
+        telemetry.poll()
+        eq_("Connection refused", telemetry.hosts["10.0.0.1"].error)
+        ok_("Connection refused" in str(telemetry))
+
+    def test_background_polling(self):
+        telemetry = FleetTelemetry(self.pool, self.busy)
+        telemetry.start(interval=0.01)
+        try:
+            while telemetry.polls < 4:
+                sleep(0.01)
+        finally:
+            telemetry.stop()
+        eq_({"10.0.0.3": ["cpu"]}, telemetry.saturated)
+        eq_(8, len(telemetry.as_dict()["hosts"]))
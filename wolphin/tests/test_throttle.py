@@ -0,0 +1,92 @@
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from boto.exception import EC2ResponseError
+
+from wolphin.throttle import RateLimiter, TokenBucket, is_throttling_error
+
+
+class FakeClock(object):
+    """A clock that only moves when slept on"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _throttled():
+    return EC2ResponseError(503, "RequestLimitExceeded", "RequestLimitExceeded: too many requests")
+
+
+class TestTokenBucket(object):
+    """Tests for TokenBucket"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(10, 5, clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_burst_then_rate(self):
+        for _ in range(5):
+            eq_(0, self.bucket.acquire())
+        eq_(0, self.clock.now)
+
+        # past the burst, calls are spread at the refill rate.
+        for _ in range(10):
+            self.bucket.acquire()
+        ok_(abs(self.clock.now - 1.0) < 1e-9)
+
+    def test_try_acquire(self):
+        for _ in range(5):
+            ok_(self.bucket.try_acquire())
+        ok_(not self.bucket.try_acquire())
+        self.clock.sleep(0.1)
+        ok_(self.bucket.try_acquire())
+
+
+class TestRateLimiter(object):
+    """Tests for RateLimiter"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(20, 100, 5, 2, 3, clock=self.clock.time, sleep=self.clock.sleep)
+
+    def test_throttling_errors(self):
+        ok_(is_throttling_error(_throttled()))
+        ok_(not is_throttling_error(EC2ResponseError(400, "InstanceLimitExceeded")))
+        ok_(not is_throttling_error(ValueError("RequestLimitExceeded")))
+
+    def test_mutating_calls_use_their_own_budget(self):
+        func = Mock(return_value="ok")
+        for _ in range(4):
+            eq_("ok", self.limiter("create_tags", ["i-1"], func, (), {}))
+        # 2 in a burst, and then at 5 per second.
+        ok_(abs(self.clock.now - 0.4) < 1e-9)
+        self.limiter("Instance.update", ["i-1"], func, (), {})
+        ok_(abs(self.clock.now - 0.4) < 1e-9)
+
+    def test_throttled_calls_are_retried(self):
+        func = Mock(side_effect=[_throttled(), _throttled(), "ok"])
+        eq_("ok", self.limiter("get_all_instances", [], func, (), {}))
+        eq_(3, func.call_count)
+        eq_(2, self.limiter.throttled)
+
+    @raises(EC2ResponseError)
+    def test_gives_up_after_max_retries(self):
+        func = Mock(side_effect=_throttled())
+        try:
+            self.limiter("run_instances", [], func, (), {})
+        finally:
+            eq_(4, func.call_count)
+
+    @raises(EC2ResponseError)
+    def test_other_errors_are_not_retried(self):
+        func = Mock(side_effect=EC2ResponseError(400, "InvalidParameters"))
+        try:
+            self.limiter("run_instances", [], func, (), {})
+        finally:
+            eq_(1, func.call_count)
@@ -0,0 +1,67 @@
+import json
+
+from nose.tools import eq_, ok_
+
+from wolphin.tests.mock_boto import Instance
+from wolphin.timing import LifecycleReport
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLifecycleReport(object):
+    """Tests for LifecycleReport"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.report = LifecycleReport("create", clock=self.clock)
+        self.instances = [Instance("tst", "tst", ["tst"], "tst", "tst") for _ in range(20)]
+        for number, instance in enumerate(self.instances, start=1):
+            instance.tags['Name'] = "wolphin.test.{}".format(number)
+            self.report.record(instance, 'requested')
+
+    def test_milestones_are_recorded_once(self):
+        instance = self.instances[0]
+        self.clock.now = 3
+        self.report.record(instance, 'running')
+        self.clock.now = 7
+        self.report.record(instance, 'running')
+        eq_(3, self.report.timings[instance.id].elapsed('running'))
+        eq_(None, self.report.timings[instance.id].elapsed('ssh_ready'))
+
+    def test_unregistered_instances_are_ignored(self):
+        stranger = Instance("tst", "tst", ["tst"], "tst", "tst")
+        self.report.record(stranger, 'running')
+        ok_(stranger.id not in self.report.timings)
+
+    def test_fleet_and_slowest(self):
+        for seconds, instance in enumerate(self.instances, start=1):
+            self.report.record(instance, 'running', seconds)
+        for instance in self.instances[:-1]:
+            self.report.record(instance, 'ssh_ready', 100)
+
+        eq_(dict(count=20, p50=10, p95=19, max=20), self.report.fleet('running'))
+        eq_(['running', 'ssh_ready'], self.report.milestones)
+
+        # the instance that never became ssh ready is the slowest one.
+        slowest = self.report.slowest()
+        eq_(LifecycleReport.SLOWEST_COUNT, len(slowest))
+        eq_(self.instances[-1].id, slowest[0]['id'])
+        eq_(None, slowest[0]['elapsed'])
+        eq_(self.instances[-1].id, self.report.slowest('running', count=1)[0]['id'])
+
+    def test_to_json(self):
+        self.report.record(self.instances[0], 'running', 5)
+        self.clock.now = 10
+        self.report.finish()
+        report = json.loads(self.report.to_json())
+        eq_("create", report['operation'])
+        eq_(10, report['duration'])
+        eq_(20, len(report['instances']))
+        eq_(dict(count=1, p50=5, p95=5, max=5), report['fleet']['running'])
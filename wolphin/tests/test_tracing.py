@@ -0,0 +1,90 @@
+from StringIO import StringIO
+import json
+import threading
+
+from mock import Mock
+from nose.tools import eq_, ok_, raises
+
+from boto.exception import EC2ResponseError
+
+from wolphin.config import Configuration
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.tracing import Tracer
+
+
+class TestTracer(object):
+    """Tests for tracing the ec2 calls of a WolphinProject"""
+
+    def setUp(self):
+        config = Configuration(project="test_project", min_instance_count=3, max_instance_count=3,
+                               max_wait_duration=0)
+        self.tracer = Tracer()
+        self.conn = MockEC2Connection()
+        self.project = mock_project(config, self.conn, tracer=self.tracer)
+
+    def _calls(self, operation):
+        return dict((record.call, record) for record in self.tracer.summary()
+                    if record.operation == operation)
+
+    def test_operations_are_traced(self):
+        self.project.create()
+        self.project.status()
+
+        create_calls = self._calls('create')
+        eq_(1, create_calls['run_instances'].count)
+        eq_(3, create_calls['create_tags'].count)
+        ok_(create_calls['Instance.update'].count >= 3)
+        ok_('get_all_reservations' in self._calls('status'))
+
+        run_instances = [span for span in self.tracer.spans if span.call == 'run_instances'][0]
+        eq_(set(self.project.conn.INSTANCES), set(run_instances.instance_ids))
+
+    def test_nested_operations_are_attributed_to_the_outermost_one(self):
+        self.project.create()
+        self.tracer.clear()
+        self.project.reboot()
+        eq_(set(['reboot']), set(span.operation for span in self.tracer.spans))
+        eq_(3, self._calls('reboot')['Instance.stop'].count)
+
+    def test_concurrent_operations_are_attributed_per_thread(self):
+        started, stopped = threading.Event(), threading.Event()
+
+        def _stop():
+            with self.tracer.operation('stop'):
+                started.set()
+                stopped.wait(5)
+                self.tracer('stop_instances', ['i-1'], lambda: None, (), {})
+
+        thread = threading.Thread(target=_stop)
+        thread.start()
+        started.wait(5)
+        # 'start' begins while 'stop' is in progress in the other thread, and ends before it.
+        with self.tracer.operation('start'):
+            self.tracer('start_instances', ['i-2'], lambda: None, (), {})
+        stopped.set()
+        thread.join()
+        self.tracer('get_all_instances', [], lambda: None, (), {})
+
+        eq_([('start', 'start_instances'), ('stop', 'stop_instances'), (None, 'get_all_instances')],
+            [(span.operation, span.call) for span in self.tracer.spans])
+
+    @raises(EC2ResponseError)
+    def test_errors_are_traced(self):
+        self.conn.get_all_reservations = Mock(side_effect=EC2ResponseError(400, "Broken"))
+        try:
+            self.project.status()
+        finally:
+            eq_(1, self.tracer.summary()[0].errors)
+            ok_("Broken" in self.tracer.spans[-1].error)
+
+    def test_chrome_trace(self):
+        self.project.create()
+        trace_file = StringIO()
+        self.tracer.write_chrome_trace(trace_file)
+        events = json.loads(trace_file.getvalue())['traceEvents']
+        eq_(len(self.tracer.spans), len(events))
+        for event in events:
+            eq_('X', event['ph'])
+            eq_('create', event['cat'])
+            ok_(event['dur'] >= 0)
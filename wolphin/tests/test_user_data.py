@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from os.path import join
+
+from mock import Mock, patch
+from nose.tools import eq_, ok_, raises
+
+from wolphin.config import Configuration
+from wolphin.exceptions import BootTimeoutError, InvalidWolphinConfiguration
+from wolphin.selector import InstanceNumberBasedSelector
+from wolphin.ssh import CommandResult
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.user_data import LAUNCH_INDEX_URL, contiguous_runs, render_user_data
+
+USER_DATA = """#!/bin/bash
+echo $wolphin_project ${wolphin_instance_number} > /etc/wolphin
+echo $HOME $$$$
+"""
+
+
+class TestUserData(object):
+    """Tests for provisioning instances with user data"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.user_data_file = join(self.directory, "user-data.sh")
+        with open(self.user_data_file, "w") as user_data_file:
+            user_data_file.write(USER_DATA)
+
+        config = Configuration(project="test_project",
+                               email="a@a.com",
+                               min_instance_count=3,
+                               max_instance_count=3,
+                               max_wait_duration=0,
+                               user_data_file=self.user_data_file)
+        self.conn = MockEC2Connection()
+        self.project = mock_project(config, self.conn)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _instance(self, number):
+        return [instance for instance in self.conn.INSTANCES.itervalues()
+                if instance.tags["Name"] == "wolphin.test_project.{}".format(number) and
+                instance.state != 'terminated'][0]
+
+    def test_render(self):
+        user_data = render_user_data(USER_DATA, self.project.config, 4)
+        ok_("echo test_project $(( 4 + $(curl -s {}) )) > /etc/wolphin".format(LAUNCH_INDEX_URL)
+            in user_data)
+        ok_("echo $HOME $$\n" in user_data)
+
+    @raises(InvalidWolphinConfiguration)
+    def test_render_too_large(self):
+        render_user_data("x" * (16 * 1024 + 1), self.project.config, 1)
+
+    def test_contiguous_runs(self):
+        eq_([[1, 2, 3], [5], [7, 8]], contiguous_runs([8, 1, 3, 2, 7, 5]))
+        eq_([], contiguous_runs([]))
+
+    def test_user_data_is_sent_with_the_reservation(self):
+        self.project.create()
+        first = self._instance(1)
+        ok_("$(( 1 + $(curl" in first.user_data)
+        # instances are numbered in launch order, as the user data expects.
+        for number in (1, 2, 3):
+            eq_(str(number - 1), self._instance(number).ami_launch_index)
+
+    def test_revert_reserves_runs_of_consecutive_numbers(self):
+        self.project.create()
+        run_instances = Mock(wraps=self.conn.run_instances)
+        with patch.object(self.conn, 'run_instances', run_instances):
+            self.project.revert(selector=InstanceNumberBasedSelector(instance_numbers=[1, 3]))
+        eq_(2, run_instances.call_count)
+        ok_("$(( 3 + $(curl" in self._instance(3).user_data)
+        ok_("$(( 1 + $(curl" in self._instance(1).user_data)
+
+    def test_invalid_user_data_file(self):
+        config = Configuration(email="a@a.com")
+        config.update(**dict((k, v or "test") for k, v in config.__dict__.iteritems()
+                             if k not in Configuration.OPTIONAL_ATTRIBUTES))
+        config.user_data_file = join(self.directory, "missing.sh")
+        try:
+            config.validate()
+        except InvalidWolphinConfiguration as error:
+            ok_("user_data_file" in str(error))
+        else:
+            ok_(False, "a missing user data file is valid")
+
+    def test_wait_for_boot_marker(self):
+        self.project.config.boot_marker = "/var/lib/cloud/instance/boot-finished"
+        rounds = []
+
+        def run_all(hosts, command):
+            rounds.append(len(hosts))
+            eq_("test -e /var/lib/cloud/instance/boot-finished", command)
+            return dict((host, CommandResult(host, 0 if len(rounds) > 1 else 1, "", ""))
+                        for host in hosts)
+
+        self.project._ssh = Mock(run_all=Mock(side_effect=run_all))
+        self.project.create()
+        eq_([3, 3], rounds)
+        eq_(3, self.project.last_report.fleet('booted')['count'])
+
+    @raises(BootTimeoutError)
+    def test_boot_timeout(self):
+        self.project.config.boot_marker = "/var/lib/cloud/instance/boot-finished"
+        self.project._ssh = Mock(run_all=Mock(return_value=dict()))
+        self.project.create()
@@ -0,0 +1,71 @@
+from mock import Mock, patch
+from nose.tools import eq_, ok_
+
+from wolphin.config import Configuration
+from wolphin.selector import InstanceNumberBasedSelector
+from wolphin.tests.mock_boto import MockEC2Connection
+from wolphin.tests.mock_project import mock_project
+from wolphin.watch import StatusChange, StatusWatcher
+
+
+class TestStatusWatcher(object):
+    """Tests for StatusWatcher"""
+
+    def setUp(self):
+        config = Configuration(project="test_project", min_instance_count=3, max_instance_count=3,
+                               max_wait_duration=0)
+        self.conn = MockEC2Connection()
+        self.project = mock_project(config, self.conn)
+        self.project.create()
+        self.instances = sorted(self.conn.INSTANCES.values(), key=lambda i: i.tags["Name"])
+        self.watcher = StatusWatcher(self.project)
+
+    def test_first_poll_adds_everything(self):
+        changes = self.watcher.poll()
+        eq_(["added"] * 3, [change.kind for change in changes])
+        eq_(["wolphin.test_project.{}".format(n) for n in (1, 2, 3)],
+            [change.name for change in changes])
+        eq_("3 running", self.watcher.summary())
+
+    def test_only_changes_are_reported(self):
+        self.watcher.poll()
+        eq_([], self.watcher.poll())
+
+        self.instances[0].state = 'stopping'
+        self.instances[1].ip_address = "200.200.200.200"
+        changes = self.watcher.poll()
+        eq_([StatusChange('state', self.instances[0].id, "wolphin.test_project.1",
+                          'running', 'stopping'),
+             StatusChange('public_ip', self.instances[1].id, "wolphin.test_project.2",
+                          "100.100.100.100", "200.200.200.200")],
+            changes)
+        eq_("2 running, 1 stopping", self.watcher.summary())
+
+        del self.conn.INSTANCES[self.instances[2].id]
+        eq_([StatusChange('removed', self.instances[2].id, "wolphin.test_project.3",
+                          'running', None)],
+            self.watcher.poll())
+
+    def test_one_describe_call_per_poll(self):
+        get_all_reservations = Mock(wraps=self.conn.get_all_reservations)
+        with patch.object(self.conn, 'get_all_reservations', get_all_reservations):
+            self.watcher.poll()
+            self.watcher.poll()
+        eq_(2, get_all_reservations.call_count)
+        # and the instances are not updated one by one either.
+        ok_(all(instance.state == 'running' for instance in self.instances))
+
+    def test_watch_yields_ticks_with_changes(self):
+        with patch('wolphin.watch.sleep') as sleep:
+            ticks = list(self.watcher.watch(5, ticks=3))
+        eq_(1, len(ticks))
+        eq_(3, len(ticks[0]))
+        eq_(2, sleep.call_count)
+
+    def test_selector(self):
+        watcher = StatusWatcher(self.project, InstanceNumberBasedSelector(instance_numbers=[2]))
+        eq_([self.instances[1].id], [change.id for change in watcher.poll()])
+
+    def test_str(self):
+        change = StatusChange('state', 'i-1', 'wolphin.p.1', 'pending', 'running')
+        eq_("wolphin.p.1 i-1 state: pending -> running", str(change))
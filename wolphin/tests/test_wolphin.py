@@ -1,9 +1,11 @@
 from mock import Mock, patch
-from nose.tools import eq_, ok_
+from nose.tools import eq_, ok_, raises
 
 from wolphin.project import WolphinProject
 from wolphin.config import Configuration
+from wolphin.exceptions import WolphinException
 from wolphin.tests.mock_boto import MockEC2Connection, STATES
+from wolphin.tests.mock_project import mock_project
 
 
 class TestWolphin(object):
@@ -14,10 +16,7 @@ class TestWolphin(object):
         # a config object with defaults and project name override.
         config = Configuration(project="test_project")
         config.max_wait_duration = 0
-        config.validate = Mock()
-        with patch('wolphin.project.connect_to_region', Mock(return_value=MockEC2Connection())):
-            self.project = WolphinProject.new(config)
-            self.project._wait_for_ssh = Mock()
+        self.project = mock_project(config, MockEC2Connection())
 
     def _multi_state_setup(self):
         """Sets up an initial project state with instances in varied states"""
@@ -84,6 +83,44 @@ class TestWolphin(object):
         for k, v in self.project.conn.INSTANCES.iteritems():
             eq_('running', v.state)
 
+    def test_create_report(self):
+        """Test that create records the timing of every instance it reserves"""
+
+        self.project.config.min_instance_count = 3
+        self.project.config.max_instance_count = 3
+        self.project.create()
+
+        report = self.project.last_report
+        eq_('create', report.operation)
+        ok_(report.finished is not None)
+        eq_(set(self.project.conn.INSTANCES), set(report.timings))
+        eq_(3, report.fleet('running')['count'])
+
+    def test_reports_only_time_the_instances_transitioned(self):
+        """Test that instances already in the target state are left out of the reports"""
+
+        self.project.config.min_instance_count = 3
+        self.project.config.max_instance_count = 3
+        self.project.create()
+        instances = sorted(self.project.conn.INSTANCES.values(),
+                           key=lambda instance: instance.tags["Name"])
+
+        self.project.create()
+        eq_({}, self.project.last_report.timings)
+
+        instances[0].stop()
+        self.project.start()
+        eq_([instances[0].id], self.project.last_report.timings.keys())
+        self.project.stop()
+        eq_(3, len(self.project.last_report.timings))
+        self.project.stop()
+        eq_({}, self.project.last_report.timings)
+
+        instances[0].terminate()
+        self.project.terminate(instances=instances)
+        eq_(set(instance.id for instance in instances[1:]),
+            set(self.project.last_report.timings))
+
     def test_create_multi_initial_state(self):
         """Testing create with multiple already existing instances having varied initial states"""
 
@@ -233,6 +270,99 @@ class TestWolphin(object):
         for k, v in result_instance_id_dict.iteritems():
             eq_(self.project.conn.INSTANCES[k].state, v)
 
+    def test_status_fields(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 3
+        self.project.create()
+
+        full = dict((status.id, status) for status in self.project.status())
+        records = self.project.status(fields=['id', 'public_ip_address'])
+        eq_(3, len(records))
+        for record in records:
+            eq_(('id', 'public_ip_address'), record._fields)
+            ok_(isinstance(record, tuple))
+            eq_(full[record.id].public_ip_address, record.public_ip_address)
+
+        # the record types are shared.
+        eq_(type(records[0]), type(self.project.status(fields=('id', 'public_ip_address'))[0]))
+
+    def test_iter_status_makes_one_describe_call(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 3
+        self.project.create()
+        get_all_reservations = Mock(wraps=self.project.conn.get_all_reservations)
+        with patch.object(self.project.conn, 'get_all_reservations', get_all_reservations):
+            names = [status.name for status in self.project.iter_status(fields=['name'])]
+        eq_(1, get_all_reservations.call_count)
+        eq_(["wolphin.test_project.{}".format(n) for n in (1, 2, 3)], sorted(names))
+
+    def test_iter_instances_streams_pages(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 5
+        self.project.create()
+        self.project.PAGE_SIZE = 2
+        get_all_reservations = Mock(wraps=self.project.conn.get_all_reservations)
+        with patch.object(self.project.conn, 'get_all_reservations', get_all_reservations):
+            instances = self.project.iter_instances()
+            instances.next()
+            eq_(1, get_all_reservations.call_count)
+            eq_(4, len(list(instances)))
+        eq_(3, get_all_reservations.call_count)
+        eq_([None, "2", "4"],
+            [call[1]["next_token"] for call in get_all_reservations.call_args_list])
+
+    def test_iter_instances_in_states(self):
+        stopping, stopped, _, terminated, _, _ = self._multi_state_setup()
+        instances = self.project.iter_instances(states=[STATES['stopped'], STATES['terminated']])
+        eq_(set(stopped) | set(terminated), set(instance.id for instance in instances))
+        eq_([], list(self.project.iter_instances(states=[])))
+
+    def test_instances_in_states_are_filtered_by_ec2(self):
+        stopping, stopped, _, terminated, _, _ = self._multi_state_setup()
+        get_all_reservations = Mock(wraps=self.project.conn.get_all_reservations)
+        with patch.object(self.project.conn, 'get_all_reservations', get_all_reservations):
+            instances = self.project.get_instances_in_states([STATES['stopped']])
+            eq_(set(stopped), set(instance.id for instance in instances))
+            eq_(["stopped"], get_all_reservations.call_args[1]["filters"]["instance-state-name"])
+
+            instances = self.project.get_instances_in_states([STATES['stopped']],
+                                                             inverse_select=True)
+            ok_(not set(stopped) & set(instance.id for instance in instances))
+            ok_("stopped" not in
+                get_all_reservations.call_args[1]["filters"]["instance-state-name"])
+
+    def test_iter_instances_with_a_selector_of_all_instances(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 5
+        self.project.create()
+        self.project.PAGE_SIZE = 2
+
+        selector = Mock(per_instance=False, select=lambda instances: instances[-1:])
+        eq_(1, len(list(self.project.iter_instances(selector=selector))))
+
+    def test_progress_sink(self):
+        progress = []
+        self.project.progress_sink = progress.append
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 3
+        self.project.create()
+        ok_(progress)
+        eq_('running', progress[-1].phase)
+        eq_(3, progress[-1].done)
+
+    def test_status_tables_are_only_made_when_debugging(self):
+        self.project.config.min_instance_count = self.project.config.max_instance_count = 3
+        self.project.create()
+        instances = self.project._get_healthy_instances()
+
+        with patch.object(self.project.logger, 'isEnabledFor', return_value=False):
+            _, progress, table = self.project._check_instances_for_transition(instances, None, 16)
+        eq_(None, table)
+        eq_(3, progress.done)
+
+        with patch.object(self.project.logger, 'isEnabledFor', return_value=True):
+            _, _, table = self.project._check_instances_for_transition(instances, None, 16)
+        eq_(3, len(table.rows))
+
+    @raises(WolphinException)
+    def test_status_unknown_fields(self):
+        self.project.status(fields=['id', 'color'])
+
     def test_get_healthy_instances(self):
         for x in range(1):
             if x == 0:
@@ -0,0 +1,145 @@
+"""Client side rate limiting of the ec2 calls made by wolphin"""
+
+import logging
+import random
+import threading
+from time import sleep, time
+
+from boto.exception import EC2ResponseError
+
+
+# errors returned by ec2 when the account's request rate limit is exceeded.
+THROTTLING_ERRORS = ('RequestLimitExceeded', 'Throttling')
+
+# ec2 calls that change anything are accounted separately from describe calls, like ec2 does.
+MUTATING_CALLS = frozenset(['run_instances',
+                            'create_tags',
+                            'delete_tags',
+                            'start_instances',
+                            'stop_instances',
+                            'reboot_instances',
+                            'terminate_instances',
+                            'Instance.start',
+                            'Instance.stop',
+                            'Instance.reboot',
+                            'Instance.terminate',
+                            'Instance.add_tag',
+                            'Instance.remove_tag'])
+
+
+def is_throttling_error(error):
+    """Returns True if the ``error`` raised by an ec2 call is due to request throttling"""
+    return (isinstance(error, EC2ResponseError) and
+            (getattr(error, 'error_code', None) in THROTTLING_ERRORS or
+             any(code in str(error) for code in THROTTLING_ERRORS)))
+
+
+class TokenBucket(object):
+    """
+    A thread safe token bucket, refilled with ``rate`` tokens per second up to ``capacity``.
+    """
+
+    def __init__(self, rate, capacity, clock=time, sleep=sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Takes ``tokens`` if available right now; returns True if it did, False otherwise."""
+
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1):
+        """
+        Takes ``tokens``, waiting for the bucket to refill if needed; returns the seconds waited.
+        """
+
+        with self.lock:
+            self._refill()
+            # take the tokens right away, going into debt if needed, so that concurrent callers
+            # queue up behind each other instead of competing for every refill.
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+class RateLimiter(object):
+    """
+    An interceptor (see `class:wolphin.connection.InterceptedConnection`) limiting the rate of ec2
+    calls with one token bucket for mutating calls and another one for describe calls. Calls that
+    are throttled by ec2 anyway are retried with exponential backoff and full jitter.
+    """
+
+    def __init__(self,
+                 describe_rate,
+                 describe_burst,
+                 mutate_rate,
+                 mutate_burst,
+                 max_retries,
+                 base_delay=0.5,
+                 max_delay=30,
+                 clock=time,
+                 sleep=sleep):
+        """
+        :param describe_rate: describe calls allowed per second.
+        :param describe_burst: describe calls allowed in a burst.
+        :param mutate_rate: mutating calls allowed per second.
+        :param mutate_burst: mutating calls allowed in a burst.
+        :param max_retries: maximum number of times to retry a throttled call.
+        :param base_delay: seconds to back off for, at most, after the first throttled attempt.
+        :param max_delay: maximum seconds to back off for.
+        """
+
+        self.describe = TokenBucket(describe_rate, describe_burst, clock=clock, sleep=sleep)
+        self.mutate = TokenBucket(mutate_rate, mutate_burst, clock=clock, sleep=sleep)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.throttled = 0
+        self.logger = logging.getLogger('wolphin.throttle')
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Factory method to create a rate limiter from a `class:wolphin.config.Configuration`.
+        """
+
+        return cls(config.ec2_describe_rate,
+                   config.ec2_describe_burst,
+                   config.ec2_mutate_rate,
+                   config.ec2_mutate_burst,
+                   config.ec2_max_retries)
+
+    def __call__(self, call, instance_ids, func, args, kwargs):
+        bucket = self.mutate if call in MUTATING_CALLS else self.describe
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                return func(*args, **kwargs)
+            except EC2ResponseError as ec2_error:
+                if not is_throttling_error(ec2_error) or attempt >= self.max_retries:
+                    raise
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            attempt += 1
+            self.throttled += 1
+            self.logger.debug("{} throttled by ec2, retry {} of {} in {:.2f} secs."
+                              .format(call, attempt, self.max_retries, delay))
+            self.sleep(delay)
@@ -0,0 +1,142 @@
+"""Timing reports for wolphin project lifecycle operations"""
+
+import json
+from math import ceil
+from time import time
+
+
+class InstanceTiming(object):
+    """
+    The milestones reached by one ec2 instance during a lifecycle operation, as timestamps.
+    """
+
+    def __init__(self, instance, requested):
+        self.instance = instance
+        self.milestones = dict(requested=requested)
+
+    def mark(self, milestone, timestamp):
+        """Records ``milestone`` at ``timestamp`` unless it has already been reached."""
+        self.milestones.setdefault(milestone, timestamp)
+
+    def elapsed(self, milestone):
+        """Returns the seconds taken from the request to ``milestone``, None if not reached."""
+        if milestone not in self.milestones:
+            return None
+        return self.milestones[milestone] - self.milestones['requested']
+
+    def as_dict(self):
+        return dict(id=self.instance.id,
+                    name=self.instance.tags.get("Name"),
+                    ami_id=self.instance.image_id,
+                    instance_type=self.instance.instance_type,
+                    placement=self.instance.placement,
+                    milestones=dict((milestone, self.elapsed(milestone))
+                                    for milestone in self.milestones
+                                    if milestone != 'requested'))
+
+
+class LifecycleReport(object):
+    """
+    Structured timing report of a lifecycle operation (create, start, stop, etc.).
+
+    Every instance the operation transitions is registered once it is requested (reserved, started,
+    stopped or terminated), after which the first time it is seen in any state and the first time
+    its ssh port is open (``tcp_open``) and it is ssh-ready (``ssh_ready``), or it signalled that it
+    is ready (``ready``), are recorded, as is the time it was replaced as a straggler
+    (``straggler``).
+    """
+
+    SLOWEST_COUNT = 5
+
+    def __init__(self, operation, clock=time):
+        self.operation = operation
+        self.clock = clock
+        self.started = clock()
+        self.finished = None
+        self.timings = dict()
+
+    def record(self, instance, milestone, timestamp=None):
+        """
+        Records that ``instance`` reached ``milestone``. The 'requested' milestone registers the
+        instance with the report, all other milestones of unregistered instances are ignored.
+        """
+
+        timestamp = self.clock() if timestamp is None else timestamp
+        if milestone == 'requested':
+            self.timings.setdefault(instance.id, InstanceTiming(instance, timestamp))
+        elif instance.id in self.timings:
+            self.timings[instance.id].mark(milestone, timestamp)
+
+    def finish(self):
+        self.finished = self.clock()
+
+    @property
+    def duration(self):
+        return (self.finished if self.finished is not None else self.clock()) - self.started
+
+    @property
+    def milestones(self):
+        """All milestones reached by at least one instance, in the order they were first reached"""
+        first_reached = dict()
+        for timing in self.timings.itervalues():
+            for milestone, timestamp in timing.milestones.iteritems():
+                if milestone != 'requested':
+                    first_reached[milestone] = min(timestamp,
+                                                   first_reached.get(milestone, timestamp))
+        return sorted(first_reached, key=first_reached.get)
+
+    def fleet(self, milestone):
+        """
+        Returns the fleet-wide count, p50, p95 and max of the time taken to reach ``milestone``
+        """
+
+        elapsed = sorted(timing.elapsed(milestone)
+                         for timing in self.timings.itervalues()
+                         if timing.elapsed(milestone) is not None)
+        return dict(count=len(elapsed),
+                    p50=_percentile(elapsed, 50),
+                    p95=_percentile(elapsed, 95),
+                    max=elapsed[-1] if elapsed else None)
+
+    def slowest(self, milestone=None, count=SLOWEST_COUNT):
+        """
+        Returns the ``count`` slowest instances to reach ``milestone``, which defaults to the last
+        milestone reached by the fleet. Instances that never reached it are considered slowest.
+        """
+
+        milestones = self.milestones
+        milestone = milestone or (milestones[-1] if milestones else None)
+        if milestone is None:
+            return []
+
+        def _elapsed(timing):
+            elapsed = timing.elapsed(milestone)
+            return float('inf') if elapsed is None else elapsed
+
+        timings = sorted(self.timings.itervalues(), key=_elapsed, reverse=True)[:count]
+        return [dict(id=timing.instance.id,
+                     name=timing.instance.tags.get("Name"),
+                     milestone=milestone,
+                     elapsed=timing.elapsed(milestone))
+                for timing in timings]
+
+    def as_dict(self):
+        return dict(operation=self.operation,
+                    started=self.started,
+                    finished=self.finished,
+                    duration=self.duration,
+                    instances=[timing.as_dict() for timing in self.timings.itervalues()],
+                    fleet=dict((milestone, self.fleet(milestone))
+                               for milestone in self.milestones),
+                    slowest=self.slowest())
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.as_dict(), **kwargs)
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of already sorted values, None if there are none."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(ceil(percent / 100.0 * len(sorted_values))))
+    return sorted_values[rank - 1]
@@ -0,0 +1,144 @@
+"""Tracing of the ec2 calls made by wolphin"""
+
+import json
+import threading
+from contextlib import contextmanager
+from time import time
+
+from gusset.colortable import ColorTable
+
+from wolphin.attribute_dict import AttributeDict
+
+
+class Span(object):
+    """A single ec2 call made during a wolphin operation"""
+
+    __slots__ = ('operation', 'call', 'instance_ids', 'start', 'duration', 'error', 'thread_id')
+
+    def __init__(self, operation, call, instance_ids, start, duration, error, thread_id):
+        self.operation = operation
+        self.call = call
+        self.instance_ids = instance_ids
+        self.start = start
+        self.duration = duration
+        self.error = error
+        self.thread_id = thread_id
+
+
+class Tracer(object):
+    """
+    Records a `class:wolphin.tracing.Span` for every ec2 call it intercepts, see
+    `class:wolphin.connection.InterceptedConnection`. Spans are attributed to the outermost
+    operation (e.g. 'create' or 'status') in progress in the thread the call was made from.
+    """
+
+    def __init__(self, clock=time):
+        self.clock = clock
+        self.spans = []
+        # the operations in progress, per thread: operations run concurrently, e.g. by a daemon.
+        self._local = threading.local()
+
+    @property
+    def _operations(self):
+        if not hasattr(self._local, 'operations'):
+            self._local.operations = []
+        return self._local.operations
+
+    @property
+    def current_operation(self):
+        operations = self._operations
+        return operations[0] if operations else None
+
+    @contextmanager
+    def operation(self, name):
+        """Attributes the ec2 calls made within the context, by this thread, to ``name``"""
+
+        operations = self._operations
+        operations.append(name)
+        try:
+            yield
+        finally:
+            operations.pop()
+
+    def __call__(self, call, instance_ids, func, args, kwargs):
+        start = self.clock()
+        error = None
+        try:
+            result = func(*args, **kwargs)
+            instance_ids = instance_ids or [instance.id
+                                            for instance in getattr(result, 'instances', [])]
+            return result
+        except Exception as exception:
+            error = "{}: {}".format(type(exception).__name__, exception)
+            raise
+        finally:
+            self.spans.append(Span(self.current_operation,
+                                   call,
+                                   instance_ids,
+                                   start,
+                                   self.clock() - start,
+                                   error,
+                                   threading.current_thread().ident))
+
+    def clear(self):
+        self.spans = []
+
+    def to_chrome_trace(self):
+        """Returns the spans in the Chrome trace-event format, e.g. to load in chrome://tracing"""
+
+        return dict(traceEvents=[dict(name=span.call,
+                                      cat=span.operation or "",
+                                      ph="X",
+                                      ts=span.start * 1e6,
+                                      dur=span.duration * 1e6,
+                                      pid=1,
+                                      tid=span.thread_id,
+                                      args=dict(instance_ids=span.instance_ids,
+                                                error=span.error))
+                                 for span in self.spans],
+                    displayTimeUnit="ms")
+
+    def write_chrome_trace(self, trace_file):
+        """Writes the Chrome trace-event JSON of the spans to the open ``trace_file``"""
+        json.dump(self.to_chrome_trace(), trace_file)
+
+    def summary(self):
+        """
+        Returns one record per operation and call with the number of calls, errors, the total,
+        mean and max latency in seconds; ordered by operation and then by total latency.
+        """
+
+        calls = dict()
+        for span in self.spans:
+            key = (span.operation, span.call)
+            if key not in calls:
+                calls[key] = AttributeDict(operation=span.operation,
+                                           call=span.call,
+                                           count=0,
+                                           errors=0,
+                                           total=0.0,
+                                           max=0.0)
+            record = calls[key]
+            record.count += 1
+            record.errors += 1 if span.error else 0
+            record.total += span.duration
+            record.max = max(record.max, span.duration)
+
+        for record in calls.itervalues():
+            record.mean = record.total / record.count
+        return sorted(calls.itervalues(), key=lambda record: (record.operation, -record.total))
+
+
+def print_trace_summary(summary):
+
+    color_table = ColorTable('Operation', 'Call', 'Count', 'Errors', 'Total', 'Mean', 'Max')
+    for record in summary:
+        color_table.add(Operation=record.operation,
+                        Call=record.call,
+                        Count=str(record.count),
+                        Errors=str(record.errors),
+                        Total="{:.3f}".format(record.total),
+                        Mean="{:.3f}".format(record.mean),
+                        Max="{:.3f}".format(record.max))
+
+    print color_table
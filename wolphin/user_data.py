@@ -0,0 +1,77 @@
+"""
+User data sent with the reservation of a wolphin project's instances, to provision them while they
+boot instead of over ssh once they are up.
+
+The user data is a script or cloud-init file, read from ``config.user_data_file`` and templated
+with `string.Template`:
+
+ - ``$wolphin_project``: the project's name.
+ - ``$wolphin_owner_email``: the project owner's email.
+ - ``$wolphin_first_instance_number``: the number of the first instance of the reservation.
+ - ``$wolphin_instance_number``: a shell expression of the number of the instance running it,
+   from the reservation's first instance number and the instance's launch index.
+ - ``$wolphin_signal_ready``: the command signalling that the instance running it is ready, with
+   the configured ``readiness``, see `mod:wolphin.readiness`.
+
+Other ``$`` variables, e.g. those of a shell script, are left alone; a literal ``$$`` must be
+written ``$$$$``.
+"""
+
+from os.path import expanduser
+from string import Template
+
+from wolphin.exceptions import InvalidWolphinConfiguration
+from wolphin.readiness import signal_ready_command
+
+
+# ec2 accepts at most this many bytes of user data.
+MAX_USER_DATA_SIZE = 16 * 1024
+
+LAUNCH_INDEX_URL = "http://169.254.169.254/latest/meta-data/ami-launch-index"
+
+
+def load_user_data(config):
+    """Returns the user data template configured by ``config``, None if there is none"""
+
+    if not config.user_data_file:
+        return None
+    try:
+        with open(expanduser(config.user_data_file)) as user_data_file:
+            return user_data_file.read()
+    except IOError as error:
+        raise InvalidWolphinConfiguration("user_data_file {} could not be read: {}"
+                                          .format(config.user_data_file, error))
+
+
+def render_user_data(template, config, first_instance_number):
+    """
+    Renders the user data ``template`` for a reservation of ``config``'s project whose first
+    instance is numbered ``first_instance_number``.
+    """
+
+    instance_number = "$(( {} + $(curl -s {}) ))".format(first_instance_number, LAUNCH_INDEX_URL)
+    user_data = Template(template).safe_substitute(wolphin_project=config.project,
+                                                   wolphin_owner_email=config.email,
+                                                   wolphin_first_instance_number=
+                                                   first_instance_number,
+                                                   wolphin_instance_number=instance_number,
+                                                   wolphin_signal_ready=
+                                                   signal_ready_command(config))
+    if len(user_data) > MAX_USER_DATA_SIZE:
+        raise InvalidWolphinConfiguration("The user data of {} is {} bytes long, ec2 accepts at "
+                                          "most {}.".format(config.user_data_file,
+                                                            len(user_data),
+                                                            MAX_USER_DATA_SIZE))
+    return user_data
+
+
+def contiguous_runs(numbers):
+    """Splits the sorted ``numbers`` into runs of consecutive numbers, e.g. [[1, 2], [4]]"""
+
+    runs = []
+    for number in sorted(numbers):
+        if runs and runs[-1][-1] == number - 1:
+            runs[-1].append(number)
+        else:
+            runs.append([number])
+    return runs
@@ -0,0 +1,99 @@
+"""Watching a wolphin project's instances for changes"""
+
+from collections import namedtuple
+from itertools import count
+from time import sleep, strftime
+
+from wolphin.selector import DefaultSelector
+
+
+class StatusChange(namedtuple('StatusChange', ['kind', 'id', 'name', 'old', 'new'])):
+    """
+    A change to one of a project's instances: ``kind`` is 'added', 'removed', 'state',
+    'public_ip' or 'private_ip' and ``old`` and ``new`` are the values before and after it, e.g.
+    the old and new state. Added instances have no ``old`` and removed ones no ``new`` state.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.kind == 'added':
+            return "{} {} added ({})".format(self.name, self.id, self.new)
+        if self.kind == 'removed':
+            return "{} {} removed (was {})".format(self.name, self.id, self.old)
+        return "{} {} {}: {} -> {}".format(self.name, self.id, self.kind, self.old, self.new)
+
+
+# what is watched of each instance.
+_View = namedtuple('_View', ['name', 'state', 'public_ip', 'private_ip'])
+
+
+class StatusWatcher(object):
+    """
+    Polls a `class:wolphin.project.WolphinProject` with a single describe call per poll and
+    reports only what changed since the previous poll, as `class:wolphin.watch.StatusChange`\\ s.
+    """
+
+    def __init__(self, project, selector=None):
+        self.project = project
+        self.selector = selector or DefaultSelector()
+        self.views = dict()
+
+    def poll(self):
+        """Returns the changes since the previous poll; all the instances are added by the first"""
+
+        views = dict((instance.id, _View(instance.tags.get("Name"),
+                                         instance.state,
+                                         instance.ip_address,
+                                         instance.private_ip_address))
+                     for instance in self.project.iter_instances(self.selector))
+
+        changes = []
+        for instance_id, view in views.iteritems():
+            previous = self.views.get(instance_id)
+            if previous is None:
+                changes.append(StatusChange('added', instance_id, view.name, None, view.state))
+                continue
+            for kind in ('state', 'public_ip', 'private_ip'):
+                if getattr(previous, kind) != getattr(view, kind):
+                    changes.append(StatusChange(kind, instance_id, view.name,
+                                                getattr(previous, kind), getattr(view, kind)))
+        for instance_id, previous in self.views.iteritems():
+            if instance_id not in views:
+                changes.append(StatusChange('removed', instance_id, previous.name,
+                                            previous.state, None))
+
+        self.views = views
+        return sorted(changes, key=lambda change: (change.name, change.kind))
+
+    def watch(self, interval, ticks=None):
+        """
+        Polls every ``interval`` seconds, ``ticks`` times or forever; yields the changes of every
+        poll that found any.
+        """
+
+        for tick in (count() if ticks is None else xrange(ticks)):
+            if tick:
+                sleep(interval)
+            changes = self.poll()
+            if changes:
+                yield changes
+
+    def summary(self):
+        """Returns the number of instances per state, e.g. '3 running, 1 pending'"""
+
+        states = dict()
+        for view in self.views.itervalues():
+            states[view.state] = states.get(view.state, 0) + 1
+        return ", ".join("{} {}".format(number, state)
+                         for state, number in sorted(states.iteritems()))
+
+
+def print_changes(changes, summary=None):
+    """Prints ``changes`` one per line, followed by the ``summary`` if any"""
+
+    timestamp = strftime("%H:%M:%S")
+    for change in changes:
+        print "{} {}".format(timestamp, change)
+    if summary:
+        print "{} -- {}".format(timestamp, summary)